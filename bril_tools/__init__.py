@@ -0,0 +1,31 @@
+import os
+import sys
+
+# Lesson directories whose modules import each other by bare name
+# (`from bril_cfg import ...`), as (installed name, source tree path).
+LESSON_DIRS = [
+    ("l2", "l2"),
+    ("l2_debug", os.path.join("l2", "debug_jumps_in_bril!")),
+    ("l3", "l3"),
+    ("l4", "l4"),
+    ("l5", "l5"),
+    ("l6", "l6"),
+    ("l8", "l8"),
+    ("tools", "tools"),
+]
+
+def lesson_paths():
+    """Installed copies live inside this package; in a checkout they sit next to it."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = []
+    for installed, source in LESSON_DIRS:
+        path = os.path.join(here, installed)
+        if not os.path.isdir(path):
+            path = os.path.join(os.path.dirname(here), source)
+        paths.append(path)
+    return paths
+
+def add_lesson_paths():
+    for path in lesson_paths():
+        if path not in sys.path:
+            sys.path.append(path)
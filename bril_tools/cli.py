@@ -0,0 +1,68 @@
+import sys
+
+from bril_tools import add_lesson_paths
+
+# subcommand -> (module, description). Modules are imported only when their
+# subcommand runs, so `bril-tools tdce` never pays for the interpreter or SSA.
+COMMANDS = {
+    "json": ("bril_text", "parse Bril text to JSON (bril2json)"),
+    "txt": ("bril_text", "print a program as Bril text (bril2txt)"),
+    "index": ("bril_index", "list a program's functions, or print some without loading the rest"),
+    "cfg": ("bril_cfg", "print basic blocks and the CFG of a JSON program"),
+    "trace-jumps": ("trace_jumps", "insert prints before jumps, or edge-profile a program"),
+    "edge-profile": ("edge_profile", "instrument a program / read back edge counts"),
+    "simplify-cfg": ("simplify_cfg", "remove unreachable blocks, thread jumps, merge blocks"),
+    "layout": ("block_layout", "profile-guided block layout"),
+    "interp": ("bril_interp", "run a program with the in-process interpreter"),
+    "tdce": ("tdce", "trivial dead code elimination (--global: over def-use chains)"),
+    "lvn-og": ("lvn_og", "original local value numbering"),
+    "lvn": ("lvn_opt", "local value numbering with copy and constant propagation"),
+    "df": ("df", "data flow analyses (reaching-definitions, live, constant, def-use)"),
+    "copy-prop": ("copy_prop", "global copy propagation, then dead code elimination"),
+    "compact-vars": ("var_slots", "share variable names by live range; --stats for max live"),
+    "mem": ("mem_opt", "redundant load and dead store elimination"),
+    "dom": ("dom_utils", "dominators, dominator tree and dominance frontiers"),
+    "ssa": ("ssa", "convert into / out of SSA"),
+    "licm": ("loop_opt", "loop invariant code motion"),
+    "opt": ("pass_manager", "run a pass pipeline in one process"),
+    "server": ("opt_server", "persistent optimizer server"),
+    "client": ("opt_client", "send a program to the optimizer server"),
+    "batch": ("batch", "run pass pipelines over a benchmark corpus and collect metrics"),
+    "gen": ("bril_gen", "generate a synthetic program of a given size and shape"),
+    "bench-passes": ("bench_passes", "time passes on generated programs and flag super-linear scaling"),
+    "brench": ("brench_async", "run a brench task file with timeouts and bounded concurrency"),
+    "regress": ("regress", "record / check a baseline of dyn_inst and pass time per brench run"),
+}
+# Arguments put in front of the user's for commands that share a module.
+COMMAND_ARGS = {"json": ["json"], "txt": ["txt"]}
+
+def usage(out):
+    print("Usage: bril-tools [--trace trace.json] [--trace-memory] <command> [args...]", file=out)
+    print("\nCommands:", file=out)
+    for name, (_, description) in COMMANDS.items():
+        print(f"  {name:<14}{description}", file=out)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if "--trace" in argv or "--trace-memory" in argv:
+        # Tracing applies to whichever command runs, so the flags may come anywhere.
+        add_lesson_paths()
+        from bril_trace import parse_trace_flags
+        parse_trace_flags(argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        usage(sys.stdout if argv else sys.stderr)
+        sys.exit(0 if argv else 1)
+    if argv[0] not in COMMANDS:
+        print(f"bril-tools: unknown command {argv[0]!r}", file=sys.stderr)
+        usage(sys.stderr)
+        sys.exit(1)
+
+    add_lesson_paths()
+    import importlib
+    module = importlib.import_module(COMMANDS[argv[0]][0])
+    # Each lesson script reads its own sys.argv.
+    sys.argv = [f"bril-tools {argv[0]}"] + COMMAND_ARGS.get(argv[0], []) + argv[1:]
+    module.main()
+
+if __name__ == "__main__":
+    main()
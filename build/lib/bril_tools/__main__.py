@@ -0,0 +1,3 @@
+from bril_tools.cli import main
+
+main()
@@ -0,0 +1,153 @@
+import json
+import sys
+from collections import defaultdict
+
+def form_basic_blocks(instrs):
+    """Splits a Bril program into basic blocks."""
+    blocks = []
+    current_block = []
+
+    for instr in instrs:
+        if "label" in instr or (current_block and instr.get("op") in ["jmp", "br", "ret"]):
+            if current_block:
+                blocks.append(current_block)
+                current_block = []
+
+        current_block.append(instr)
+
+    if current_block:
+        blocks.append(current_block)
+
+    return blocks
+
+def build_cfg(blocks):
+    """Constructs a control flow graph (CFG) from a list of basic blocks."""
+    cfg = defaultdict(set) 
+    labels = {}
+
+    for idx, block in enumerate(blocks):
+        if "label" in block[0]:  
+            labels[block[0]["label"]] = idx  
+
+    for i, block in enumerate(blocks):
+        last_instr = block[-1]
+
+        if last_instr.get("op") == "jmp":
+            dest = last_instr["labels"][0]
+            cfg[i].add(labels[dest])
+
+        elif last_instr.get("op") == "br":
+            true_dest, false_dest = last_instr["labels"]
+            cfg[i].add(labels[true_dest])
+            cfg[i].add(labels[false_dest])
+
+        elif last_instr.get("op") != "ret":  
+            if i + 1 < len(blocks):
+                cfg[i].add(i + 1)
+
+    return cfg
+
+TERMINATORS = {"jmp", "br", "ret"}
+
+def share_program(program):
+    """
+    A copy of program whose functions are new dicts sharing the original's
+    instruction lists and instruction dicts. It is safe to hand to passes that
+    copy on write, replacing func["instrs"] and the instructions they change
+    rather than editing them in place; variants made this way cost memory only
+    for what differs.
+    """
+    shared = dict(program)
+    shared["functions"] = [dict(func) for func in program.get("functions", [])]
+    return shared
+
+def fresh_label(base, taken):
+    """Returns a label derived from `base` that is not in `taken`, and reserves it."""
+    label = base
+    n = 1
+    while label in taken:
+        label = f"{base}.{n}"
+        n += 1
+    taken.add(label)
+    return label
+
+def form_explicit_blocks(instrs):
+    """
+    Splits instructions into blocks that each start with a label and end with a
+    jmp, br or ret, making every fallthrough an explicit jmp.
+    """
+    taken = {instr["label"] for instr in instrs if "label" in instr}
+    blocks = []
+    current_block = None
+
+    for instr in instrs:
+        if "label" in instr:
+            if current_block is not None:
+                blocks.append(current_block)
+            current_block = [instr]
+            continue
+        if current_block is None:
+            current_block = [{"label": fresh_label(f"blk{len(blocks)}", taken)}]
+        current_block.append(instr)
+        if instr.get("op") in TERMINATORS:
+            blocks.append(current_block)
+            current_block = None
+
+    if current_block is not None:
+        blocks.append(current_block)
+    if not blocks:
+        blocks.append([{"label": fresh_label("blk0", taken)}])
+
+    for i, block in enumerate(blocks):
+        if block[-1].get("op") not in TERMINATORS:
+            if i + 1 < len(blocks):
+                block.append({"op": "jmp", "labels": [blocks[i + 1][0]["label"]]})
+            else:
+                block.append({"op": "ret"})
+    return blocks
+
+def flatten_blocks(blocks):
+    """
+    Linearizes explicit blocks back into an instruction list, dropping jumps to
+    the next block, a trailing bare ret and labels that nothing jumps to.
+    """
+    targets = {label for block in blocks for label in block[-1].get("labels", [])}
+    instrs = []
+    for i, block in enumerate(blocks):
+        label = block[0]["label"]
+        if label in targets:
+            instrs.append(block[0])
+        instrs.extend(block[1:-1])
+        term = block[-1]
+        next_label = blocks[i + 1][0]["label"] if i + 1 < len(blocks) else None
+        if term.get("op") == "jmp" and term["labels"][0] == next_label:
+            continue
+        if term.get("op") == "ret" and not term.get("args") and next_label is None:
+            continue
+        instrs.append(term)
+    return instrs
+
+def main():
+    from bril_index import load_functions, parse_function_flags
+    only = parse_function_flags(sys.argv)
+    if len(sys.argv) < 2:
+        print("Usage: python bril_cfg.py <bril_json_file> [--function <name>]...")
+        sys.exit(1)
+
+    for function in load_functions(sys.argv[1], only):
+        print(f"\nFunction: {function['name']}")
+
+        # Form basic blocks
+        blocks = form_basic_blocks(function["instrs"])
+        print("\nBasic Blocks:")
+        for idx, block in enumerate(blocks):
+            print(f"Block {idx}: {block}")
+
+        # Build CFG
+        cfg = build_cfg(blocks)
+        print("\nControl Flow Graph:")
+        for src, dests in cfg.items():
+            print(f"Block {src} -> {list(dests)}")
+
+if __name__ == "__main__":
+    main()
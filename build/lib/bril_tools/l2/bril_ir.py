@@ -0,0 +1,270 @@
+import sys
+from enum import IntEnum
+from collections import defaultdict
+from bril_cfg import fresh_label
+
+OP_NAMES = [
+    "label", "const", "id", "nop",
+    "add", "sub", "mul", "div",
+    "eq", "lt", "gt", "le", "ge",
+    "and", "or", "not",
+    "jmp", "br", "call", "ret", "print",
+    "fadd", "fsub", "fmul", "fdiv", "feq", "flt", "fgt", "fle", "fge",
+    "alloc", "free", "store", "load", "ptradd",
+    "ceq", "clt", "cgt", "cle", "cge", "char2int", "int2char",
+    "set", "get", "undef",
+    "speculate", "commit", "guard",
+    "unknown",
+]
+
+# Interned opcodes: Op.ADD, Op.BR, ... compare as small ints.
+Op = IntEnum("Op", [(name.upper(), i) for i, name in enumerate(OP_NAMES)])
+OP_BY_NAME = {name: Op(i) for i, name in enumerate(OP_NAMES)}
+
+TERMINATORS = frozenset([Op.JMP, Op.BR, Op.RET])
+SIDE_EFFECT_OPS = frozenset([Op.PRINT, Op.STORE, Op.CALL, Op.RET, Op.JMP, Op.BR])
+COMMUTATIVE_OPS = frozenset([Op.ADD, Op.MUL, Op.EQ, Op.AND, Op.OR])
+
+NO_VAR = -1
+INSTR_KEYS = frozenset(["op", "dest", "type", "args", "labels", "funcs", "value"])
+_type_cache = {}
+
+def intern_type(typ):
+    """Shares one object per distinct Bril type, including parameterized ones."""
+    if typ is None:
+        return None
+    if isinstance(typ, str):
+        return sys.intern(typ)
+    key = repr(typ)
+    if key not in _type_cache:
+        _type_cache[key] = typ
+    return _type_cache[key]
+
+class Instr:
+    """
+    One Bril instruction or label. Variables and labels are integer ids into the
+    owning Function's tables; `args`, `labels` and `funcs` are tuples, or None
+    when the JSON had no such key.
+    """
+    __slots__ = ("op", "dest", "type", "args", "labels", "funcs", "value", "extra")
+
+    def __init__(self, op, dest=NO_VAR, type=None, args=None, labels=None, funcs=None, value=None, extra=None):
+        self.op = op
+        self.dest = dest
+        self.type = type
+        self.args = args
+        self.labels = labels
+        self.funcs = funcs
+        self.value = value
+        self.extra = extra
+
+    def copy(self, **changes):
+        new = Instr(self.op, self.dest, self.type, self.args, self.labels, self.funcs, self.value, self.extra)
+        for key, value in changes.items():
+            setattr(new, key, value)
+        return new
+
+    @property
+    def is_label(self):
+        return self.op == Op.LABEL
+
+class Function:
+    """A Bril function whose variable and label names are interned to integer ids."""
+    __slots__ = ("name", "params", "ret_type", "instrs", "var_names", "var_ids",
+                 "label_names", "label_ids", "extra")
+
+    def __init__(self, name):
+        self.name = name
+        self.params = []          # [(var id, type)]
+        self.ret_type = None
+        self.instrs = []
+        self.var_names = []
+        self.var_ids = {}
+        self.label_names = []
+        self.label_ids = {}
+        self.extra = None
+
+    def var(self, name):
+        vid = self.var_ids.get(name)
+        if vid is None:
+            vid = self.var_ids[name] = len(self.var_names)
+            self.var_names.append(name)
+        return vid
+
+    def label(self, name):
+        lid = self.label_ids.get(name)
+        if lid is None:
+            lid = self.label_ids[name] = len(self.label_names)
+            self.label_names.append(name)
+        return lid
+
+    @classmethod
+    def from_json(cls, func):
+        fn = cls(func["name"])
+        fn.params = [(fn.var(arg["name"]), intern_type(arg["type"])) for arg in func.get("args", [])]
+        fn.ret_type = intern_type(func.get("type"))
+        fn.extra = {k: v for k, v in func.items() if k not in ("name", "args", "type", "instrs")} or None
+        if "args" in func and not func["args"]:
+            fn.extra = dict(fn.extra or {}, _empty_args=True)
+        fn.instrs = [fn.instr_from_json(instr) for instr in func["instrs"]]
+        return fn
+
+    def instr_from_json(self, instr):
+        if "label" in instr:
+            extra = {k: v for k, v in instr.items() if k != "label"} or None
+            return Instr(Op.LABEL, labels=(self.label(instr["label"]),), extra=extra)
+        op = OP_BY_NAME.get(instr.get("op"), Op.UNKNOWN)
+        if op != Op.UNKNOWN and instr.keys() <= INSTR_KEYS:
+            extra = None  # the common case, checked without building a dict
+        else:
+            extra = {k: v for k, v in instr.items()
+                     if k not in INSTR_KEYS or (k == "op" and op == Op.UNKNOWN)} or None
+        value = instr.get("value")
+        if value is None and "value" in instr:
+            extra = dict(extra or {}, _has_value=True)
+        typ = instr.get("type")
+        # Called once per instruction of every converted function: positional
+        # arguments and map() keep the per-instruction overhead down.
+        return Instr(
+            op,
+            self.var(instr["dest"]) if "dest" in instr else NO_VAR,
+            sys.intern(typ) if typ.__class__ is str else intern_type(typ),
+            tuple(map(self.var, instr["args"])) if "args" in instr else None,
+            tuple(map(self.label, instr["labels"])) if "labels" in instr else None,
+            tuple(map(sys.intern, instr["funcs"])) if "funcs" in instr else None,
+            value,
+            extra,
+        )
+
+    def instr_to_json(self, instr):
+        op = instr.op
+        extra = instr.extra
+        if op == Op.LABEL:
+            out = {"label": self.label_names[instr.labels[0]]}
+            if extra:
+                out.update(extra)
+            return out
+        out = {} if op == Op.UNKNOWN else {"op": OP_NAMES[op]}
+        if instr.dest != NO_VAR:
+            out["dest"] = self.var_names[instr.dest]
+        if instr.type is not None:
+            out["type"] = instr.type
+        if instr.args is not None:
+            out["args"] = list(map(self.var_names.__getitem__, instr.args))
+        if instr.funcs is not None:
+            out["funcs"] = list(instr.funcs)
+        if instr.labels is not None:
+            out["labels"] = list(map(self.label_names.__getitem__, instr.labels))
+        if extra is None:
+            if instr.value is not None:
+                out["value"] = instr.value
+            return out
+        if instr.value is not None or extra.get("_has_value"):
+            out["value"] = instr.value
+        for key, value in extra.items():
+            if key != "_has_value":
+                out[key] = value
+        return out
+
+    def instrs_to_json(self):
+        return [self.instr_to_json(instr) for instr in self.instrs]
+
+    def to_json(self):
+        out = {"name": self.name}
+        extra = dict(self.extra or {})
+        if self.params or extra.pop("_empty_args", False):
+            out["args"] = [{"name": self.var_names[v], "type": t} for v, t in self.params]
+        if self.ret_type is not None:
+            out["type"] = self.ret_type
+        out["instrs"] = self.instrs_to_json()
+        out.update(extra)
+        return out
+
+def program_from_json(program):
+    return [Function.from_json(func) for func in program["functions"]]
+
+def program_to_json(functions, program=None):
+    """Rebuilds a program dict, keeping any top-level keys of the original `program`."""
+    out = {k: v for k, v in (program or {}).items() if k != "functions"}
+    out["functions"] = [fn.to_json() for fn in functions]
+    return out
+
+def form_basic_blocks(instrs):
+    """Splits IR instructions into basic blocks, exactly like bril_cfg.form_basic_blocks."""
+    blocks = []
+    current_block = []
+
+    for instr in instrs:
+        if instr.op == Op.LABEL or (current_block and instr.op in TERMINATORS):
+            if current_block:
+                blocks.append(current_block)
+                current_block = []
+
+        current_block.append(instr)
+
+    if current_block:
+        blocks.append(current_block)
+
+    return blocks
+
+def build_cfg(blocks):
+    """Constructs the successor map of IR blocks, exactly like bril_cfg.build_cfg."""
+    cfg = defaultdict(set)
+    labels = {}
+
+    for idx, block in enumerate(blocks):
+        if block[0].op == Op.LABEL:
+            labels[block[0].labels[0]] = idx
+
+    for i, block in enumerate(blocks):
+        last_instr = block[-1]
+
+        if last_instr.op == Op.JMP:
+            cfg[i].add(labels[last_instr.labels[0]])
+
+        elif last_instr.op == Op.BR:
+            true_dest, false_dest = last_instr.labels
+            cfg[i].add(labels[true_dest])
+            cfg[i].add(labels[false_dest])
+
+        elif last_instr.op != Op.RET:
+            if i + 1 < len(blocks):
+                cfg[i].add(i + 1)
+
+    return cfg
+
+def form_explicit_blocks(fn):
+    """
+    Splits fn's instructions into blocks that each start with a label and end
+    with a jmp, br or ret, exactly like bril_cfg.form_explicit_blocks. Labels
+    it makes up are interned in `fn`.
+    """
+    taken = set(fn.label_names)
+    blocks = []
+    current_block = None
+
+    for instr in fn.instrs:
+        if instr.op == Op.LABEL:
+            if current_block is not None:
+                blocks.append(current_block)
+            current_block = [instr]
+            continue
+        if current_block is None:
+            current_block = [Instr(Op.LABEL, labels=(fn.label(fresh_label(f"blk{len(blocks)}", taken)),))]
+        current_block.append(instr)
+        if instr.op in TERMINATORS:
+            blocks.append(current_block)
+            current_block = None
+
+    if current_block is not None:
+        blocks.append(current_block)
+    if not blocks:
+        blocks.append([Instr(Op.LABEL, labels=(fn.label(fresh_label("blk0", taken)),))])
+
+    for i, block in enumerate(blocks):
+        if block[-1].op not in TERMINATORS:
+            if i + 1 < len(blocks):
+                block.append(Instr(Op.JMP, labels=(blocks[i + 1][0].labels[0],)))
+            else:
+                block.append(Instr(Op.RET))
+    return blocks
@@ -0,0 +1,81 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+def parse_jobs(argv):
+    """
+    Removes `--jobs N` (or `-j N`) from argv in place and returns N. The
+    default is 1 (serial); 0 means one process per core.
+    """
+    for flag in ("--jobs", "-j"):
+        if flag in argv:
+            i = argv.index(flag)
+            jobs = int(argv[i + 1])
+            del argv[i:i + 2]
+            return jobs or os.cpu_count() or 1
+    return 1
+
+def split_chunks(functions, count):
+    """Cuts the function list into `count` contiguous runs of similar instruction counts."""
+    sizes = [len(func.get("instrs", [])) + 1 for func in functions]
+    target = sum(sizes) / count
+    chunks, current, weight = [], [], 0
+    for func, size in zip(functions, sizes):
+        current.append(func)
+        weight += size
+        if weight >= target and len(chunks) < count - 1:
+            chunks.append(current)
+            current, weight = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+# Functions of the program being optimized, inherited by forked workers so
+# only chunk bounds have to be sent to them.
+_shared_functions = None
+
+def _run_chunk(worker, chunk):
+    if isinstance(chunk, tuple):
+        start, end = chunk
+        functions = _shared_functions[start:end]
+    else:
+        functions = json.loads(chunk)
+    for func in functions:
+        worker(func)
+    return json.dumps(functions, separators=(",", ":"))
+
+def run_per_function(worker, program, jobs=1):
+    """
+    Calls worker(func), which rewrites func in place, on every function of the
+    program. With jobs > 1 the functions are split into contiguous chunks for a
+    process pool and the compact-JSON results are put back in their original
+    order, so the output does not depend on scheduling.
+    """
+    global _shared_functions
+    functions = program.get("functions", [])
+    if jobs <= 1 or len(functions) < 2:
+        for func in functions:
+            worker(func)
+        return program
+
+    jobs = min(jobs, len(functions))
+    # A few chunks per process evens out load without paying IPC per function.
+    chunks = split_chunks(functions, min(len(functions), jobs * 4))
+    if multiprocessing.get_start_method() == "fork":
+        bounds, start = [], 0
+        for chunk in chunks:
+            bounds.append((start, start + len(chunk)))
+            start += len(chunk)
+        payloads = bounds
+        _shared_functions = functions
+    else:
+        payloads = [json.dumps(chunk, separators=(",", ":")) for chunk in chunks]
+    try:
+        with ProcessPoolExecutor(jobs) as pool:
+            results = pool.map(partial(_run_chunk, worker), payloads)
+            program["functions"] = [func for result in results for func in json.loads(result)]
+    finally:
+        _shared_functions = None
+    return program
@@ -0,0 +1,187 @@
+import json
+
+from bril_binary import LEADING_SPACE, BinaryProgram, Encoder, is_binary
+
+CHUNK_SIZE = 1 << 16
+WHITESPACE = " \t\n\r"
+DELIMITERS = WHITESPACE + ",:]}"
+
+class ProgramReader:
+    """
+    Reads a Bril JSON program from a text stream one function at a time.
+    Iterating yields each entry of "functions" as soon as it has been read;
+    any other top-level keys end up in `extra`. Only the function being
+    decoded is held in memory, never the whole document.
+    """
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.base = 0             # input characters dropped from the front of buf
+        self.value_start = 0      # input offset where the last value() began
+        self.eof = False
+        self.extra = {}
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        """Reads more input; at least as much as is buffered, so big values take O(log n) retries."""
+        if self.eof:
+            return False
+        self.base += self.pos
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+        chunk = self.stream.read(max(self.chunk_size, len(self.buf)))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def peek(self):
+        """Skips whitespace and returns the next character, or "" at end of input."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def offset(self):
+        """Characters of input consumed so far."""
+        return self.base + self.pos
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} in Bril JSON, found {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete JSON value, reading more input until it parses."""
+        self.peek()
+        self.value_start = self.offset()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A scalar cut by the end of the buffer ("1." of "1.5") may parse as a
+            # shorter value; it is complete only once a delimiter follows it.
+            if (not isinstance(value, (dict, list)) and
+                    (end == len(self.buf) or self.buf[end] not in DELIMITERS) and self.fill()):
+                continue
+            self.pos = end
+            return value
+
+    def __iter__(self):
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            if key == "functions":
+                self.expect("[")
+                if self.peek() == "]":
+                    self.pos += 1
+                else:
+                    while True:
+                        yield self.value()
+                        if self.peek() == ",":
+                            self.pos += 1
+                            continue
+                        self.expect("]")
+                        break
+            else:
+                self.extra[key] = self.value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+class ProgramWriter:
+    """Writes a program incrementally in compact JSON: open, one function at a time, close."""
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+        self.stream.write('{"functions":[')
+
+    def write(self, func):
+        if self.count:
+            self.stream.write(",")
+        self.stream.write(json.dumps(func, separators=(",", ":")))
+        self.count += 1
+
+    def close(self, extra=None):
+        self.stream.write("]")
+        for key, value in (extra or {}).items():
+            self.stream.write(f",{json.dumps(key)}:{json.dumps(value, separators=(',', ':'))}")
+        self.stream.write("}\n")
+        self.stream.flush()
+
+class BinaryWriter:
+    """
+    ProgramWriter for the binary format. Its index and string table come last,
+    so the encoded functions (a fraction of their JSON size) are held until
+    close() writes everything.
+    """
+    def __init__(self, stream):
+        self.stream = getattr(stream, "buffer", stream)
+        self.encoder = Encoder()
+
+    def write(self, func):
+        self.encoder.function(func)
+
+    def close(self, extra=None):
+        self.stream.write(self.encoder.finish(extra))
+        self.stream.flush()
+
+def input_format(inp):
+    """
+    "binary", "json" or "text", from the start of `inp`. Only the byte buffer
+    under a text stream is peeked, so nothing is consumed; a stream that
+    cannot be peeked is taken to be JSON.
+    """
+    peek = getattr(getattr(inp, "buffer", None), "peek", None)
+    if peek is None:
+        return "json"
+    head = peek(CHUNK_SIZE)
+    if is_binary(head):
+        return "binary"
+    start = LEADING_SPACE.match(head).end()
+    return "text" if head[start:start + 1] not in (b"{", b"") else "json"
+
+def read_functions(inp):
+    """
+    (functions, extra) for a program in any input format. JSON is read one
+    function at a time, binary input is decoded one function at a time from
+    its bytes, and Bril text is parsed whole. `extra`, the other top-level
+    keys, is complete once `functions` is exhausted.
+    """
+    fmt = input_format(inp)
+    if fmt == "binary":
+        program = BinaryProgram(inp.buffer.read())
+        return program.functions(), program.extra
+    if fmt == "text":
+        from bril_text import parse_program
+        program = parse_program(inp.read())
+        return program.pop("functions"), program
+    reader = ProgramReader(inp)
+    return reader, reader.extra
+
+def stream_program(worker, inp, out, binary=False):
+    """
+    Applies worker(func), which rewrites func in place, while streaming from
+    `inp` to `out`, written as binary with `binary`.
+    """
+    functions, extra = read_functions(inp)
+    writer = BinaryWriter(out) if binary else ProgramWriter(out)
+    for func in functions:
+        worker(func)
+        writer.write(func)
+    writer.close(extra)
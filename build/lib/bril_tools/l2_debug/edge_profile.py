@@ -0,0 +1,282 @@
+import json
+import os
+import sys
+from collections import defaultdict
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from bril_cfg import form_explicit_blocks, flatten_blocks, fresh_label
+from bril_binary import parse_binary_flag, read_program, write_program
+
+EXIT = None
+
+def function_edges(blocks):
+    """Lists the CFG edges of explicit blocks, with EXIT as the target of every ret."""
+    edges = []
+    for block in blocks:
+        label = block[0]["label"]
+        term = block[-1]
+        if term.get("op") == "ret":
+            edges.append((label, EXIT))
+        else:
+            for succ in dict.fromkeys(term["labels"]):
+                edges.append((label, succ))
+    return edges
+
+def find(parent, x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+def spanning_tree(labels, edges, entry):
+    """
+    Picks a spanning tree of the undirected CFG plus the virtual EXIT -> entry
+    edge. Only edges outside the tree need counters; the virtual edge and edges
+    that would need a split block are put in the tree first.
+    """
+    succ_count = defaultdict(int)
+    pred_count = defaultdict(int)
+    for src, dst in edges:
+        succ_count[src] += 1
+        pred_count[dst] += 1
+    pred_count[entry] += 1
+
+    def cost(edge):
+        src, dst = edge
+        if src is EXIT:
+            return 0
+        critical = succ_count[src] > 1 and dst is not EXIT and pred_count[dst] > 1
+        return 1 if critical else 2
+
+    parent = {label: label for label in labels}
+    parent[EXIT] = EXIT
+    tree = set()
+    all_edges = [(EXIT, entry)] + edges
+    for i in sorted(range(len(all_edges)), key=lambda i: cost(all_edges[i])):
+        src, dst = all_edges[i]
+        a, b = find(parent, src), find(parent, dst)
+        if a != b:
+            parent[a] = b
+            tree.add(i)
+    return {i - 1 for i in tree if i > 0}
+
+def free_prefix(program, base):
+    """Returns a variable prefix that no variable in the program starts with."""
+    names = set()
+    for func in program["functions"]:
+        names.update(arg["name"] for arg in func.get("args", []))
+        for instr in func["instrs"]:
+            names.update(instr.get("args", []))
+            if "dest" in instr:
+                names.add(instr["dest"])
+    while any(name.startswith(base) for name in names):
+        base = "_" + base
+    return base
+
+def increment(prefix, counter):
+    ptr = f"{prefix}_q"
+    val = f"{prefix}_v"
+    idx = f"{prefix}_i"
+    return [
+        {"op": "const", "dest": idx, "type": "int", "value": counter},
+        {"op": "ptradd", "dest": ptr, "type": {"ptr": "int"}, "args": [prefix, idx]},
+        {"op": "load", "dest": val, "type": "int", "args": [ptr]},
+        {"op": "add", "dest": val, "type": "int", "args": [val, f"{prefix}_one"]},
+        {"op": "store", "args": [ptr, val]},
+    ]
+
+def dump_counters(prefix, num_counters):
+    instrs = []
+    names = []
+    for counter in range(num_counters):
+        name = f"{prefix}_c{counter}"
+        instrs.append({"op": "const", "dest": f"{prefix}_i", "type": "int", "value": counter})
+        instrs.append({"op": "ptradd", "dest": f"{prefix}_q", "type": {"ptr": "int"}, "args": [prefix, f"{prefix}_i"]})
+        instrs.append({"op": "load", "dest": name, "type": "int", "args": [f"{prefix}_q"]})
+        names.append(name)
+    instrs.append({"op": "print", "args": names})
+    instrs.append({"op": "free", "args": [prefix]})
+    return instrs
+
+def alloc_counters(prefix, num_counters, entry, taken):
+    """Blocks that allocate and zero the counter array before jumping to `entry`."""
+    cond = fresh_label("prof.init", taken)
+    body = fresh_label("prof.zero", taken)
+    ptr_t = {"ptr": "int"}
+    return [
+        [{"label": fresh_label("prof.alloc", taken)},
+         {"op": "const", "dest": f"{prefix}_n", "type": "int", "value": num_counters},
+         {"op": "alloc", "dest": prefix, "type": ptr_t, "args": [f"{prefix}_n"]},
+         {"op": "const", "dest": f"{prefix}_one", "type": "int", "value": 1},
+         {"op": "const", "dest": f"{prefix}_zero", "type": "int", "value": 0},
+         {"op": "const", "dest": f"{prefix}_i", "type": "int", "value": 0},
+         {"op": "jmp", "labels": [cond]}],
+        [{"label": cond},
+         {"op": "lt", "dest": f"{prefix}_b", "type": "bool", "args": [f"{prefix}_i", f"{prefix}_n"]},
+         {"op": "br", "args": [f"{prefix}_b"], "labels": [body, entry]}],
+        [{"label": body},
+         {"op": "ptradd", "dest": f"{prefix}_q", "type": ptr_t, "args": [prefix, f"{prefix}_i"]},
+         {"op": "store", "args": [f"{prefix}_q", f"{prefix}_zero"]},
+         {"op": "add", "dest": f"{prefix}_i", "type": "int", "args": [f"{prefix}_i", f"{prefix}_one"]},
+         {"op": "jmp", "labels": [cond]}],
+    ]
+
+def instrument_function(func, prefix, first_counter):
+    """
+    Adds a counter increment on every edge outside the spanning tree. Returns
+    the instrumented blocks, the labels in use and the function's profile map.
+    """
+    blocks = form_explicit_blocks(func["instrs"])
+    labels = [block[0]["label"] for block in blocks]
+    entry = labels[0]
+    edges = function_edges(blocks)
+    tree = spanning_tree(labels, edges, entry)
+
+    pred_count = defaultdict(int)
+    for _, dst in edges:
+        pred_count[dst] += 1
+    by_label = {block[0]["label"]: block for block in blocks}
+    taken = set(labels)
+
+    counters = {}
+    split_blocks = []
+    for i, (src, dst) in enumerate(edges):
+        if i in tree:
+            continue
+        counter = first_counter + len(counters)
+        counters[i] = counter
+        code = increment(prefix, counter)
+        src_block = by_label[src]
+        if dst is EXIT or len(set(src_block[-1].get("labels", []))) <= 1:
+            src_block[-1:-1] = code
+        elif pred_count[dst] == 1 and dst != entry:
+            by_label[dst][1:1] = code
+        else:
+            split = fresh_label(f"prof.edge{counter}", taken)
+            split_blocks.append([{"label": split}] + code + [{"op": "jmp", "labels": [dst]}])
+            term = dict(src_block[-1])
+            term["labels"] = [split if label == dst else label for label in term["labels"]]
+            src_block[-1] = term
+
+    blocks.extend(split_blocks)
+    if func["name"] != "main":
+        blocks.insert(0, [
+            {"label": fresh_label("prof.entry", taken)},
+            {"op": "const", "dest": f"{prefix}_one", "type": "int", "value": 1},
+            {"op": "jmp", "labels": [entry]},
+        ])
+        func["args"] = func.get("args", []) + [{"name": prefix, "type": {"ptr": "int"}}]
+
+    return blocks, taken, {
+        "entry": entry,
+        "blocks": labels,
+        "edges": [list(edge) for edge in edges],
+        "counters": {str(i): c for i, c in counters.items()},
+    }
+
+def instrument_program(program):
+    """
+    Instruments every function for edge profiling. The program prints one line
+    of counter values when main returns; the returned map is what
+    `read_profile` needs to turn that line into block and edge frequencies.
+    """
+    prefix = free_prefix(program, "prof")
+    profile_map = {"functions": {}}
+    num_counters = 0
+    instrumented = []
+    for func in program["functions"]:
+        blocks, taken, info = instrument_function(func, prefix, num_counters)
+        num_counters += len(info["counters"])
+        profile_map["functions"][func["name"]] = info
+        instrumented.append((func, blocks, taken))
+    profile_map["num_counters"] = num_counters
+
+    for func, blocks, taken in instrumented:
+        for block in blocks:
+            for instr in block:
+                if instr.get("op") == "call":
+                    if instr["funcs"][0] == "main":
+                        raise ValueError("edge profiling does not support calls to main")
+                    instr["args"] = instr.get("args", []) + [prefix]
+        if func["name"] == "main":
+            for block in blocks:
+                if block[-1].get("op") == "ret":
+                    block[-1:-1] = dump_counters(prefix, num_counters)
+            entry = profile_map["functions"]["main"]["entry"]
+            blocks[:0] = alloc_counters(prefix, num_counters, entry, taken)
+        func["instrs"] = flatten_blocks(blocks)
+    return profile_map
+
+def read_counts(text):
+    """Parses the counter line printed last by an instrumented program."""
+    lines = [line for line in text.splitlines() if line.strip()]
+    return [int(tok) for tok in lines[-1].split()] if lines else []
+
+def solve_edges(info, counts):
+    """Recovers every edge count from the counted edges by flow conservation."""
+    edges = [tuple(edge) for edge in info["edges"]] + [(EXIT, info["entry"])]
+    known = {}
+    for i, counter in info["counters"].items():
+        known[int(i)] = counts[counter]
+
+    incident = defaultdict(list)
+    for i, (src, dst) in enumerate(edges):
+        if src != dst:
+            incident[src].append((i, -1))
+            incident[dst].append((i, 1))
+
+    changed = True
+    while changed and len(known) < len(edges):
+        changed = False
+        for node, node_edges in incident.items():
+            unknown = [(i, sign) for i, sign in node_edges if i not in known]
+            if len(unknown) != 1:
+                continue
+            i, sign = unknown[0]
+            # Inflow equals outflow at every node, so the missing edge balances the rest.
+            balance = sum(s * known[j] for j, s in node_edges if j in known)
+            known[i] = -balance * sign
+            changed = True
+    for i, (src, dst) in enumerate(edges):
+        if src == dst and i not in known:
+            known[i] = 0
+    return {edges[i]: known.get(i, 0) for i in range(len(edges))}
+
+def read_profile(profile_map, counts):
+    """Turns raw counters into per-function block and edge frequencies."""
+    profile = {}
+    for name, info in profile_map["functions"].items():
+        edge_counts = solve_edges(info, counts)
+        block_counts = {label: 0 for label in info["blocks"]}
+        for (src, dst), count in edge_counts.items():
+            if dst is not EXIT:
+                block_counts[dst] += count
+        profile[name] = {
+            "blocks": block_counts,
+            "edges": [[src, dst, count] for (src, dst), count in edge_counts.items() if src is not EXIT],
+            "calls": edge_counts[(EXIT, info["entry"])],
+        }
+    return profile
+
+def main():
+    binary = parse_binary_flag(sys.argv)
+    if len(sys.argv) < 3 or sys.argv[1] not in ("instrument", "read"):
+        print("Usage: python edge_profile.py instrument <map_file> < prog.json > instrumented.json")
+        print("       python edge_profile.py read <map_file> <profile_file>")
+        sys.exit(1)
+
+    if sys.argv[1] == "instrument":
+        program = read_program(sys.stdin)
+        profile_map = instrument_program(program)
+        with open(sys.argv[2], "w") as f:
+            json.dump(profile_map, f)
+        write_program(program, sys.stdout, binary, indent=2)
+    else:
+        with open(sys.argv[2], "r") as f:
+            profile_map = json.load(f)
+        with open(sys.argv[3], "r") as f:
+            counts = read_counts(f.read())
+        json.dump(read_profile(profile_map, counts), sys.stdout, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from bril_binary import parse_binary_flag, read_program, write_program
+
+def trace_jumps(bril_program):
+    """Modifies a Bril program to insert a print instruction before each jmp or br."""
+    for function in bril_program.get("functions", []):
+        new_instrs = []
+        for instr in function.get("instrs", []):
+            if instr.get("op") in ["jmp", "br"]:
+                # Insert print instruction before jump
+                print_instr = {
+                    "op": "print",
+                    "args": [],
+                    "funcs": [],
+                    "labels": [],
+                    "type": None,
+                    "value": f"Jumping to {instr['labels']}"
+                }
+                new_instrs.append(print_instr)
+
+            new_instrs.append(instr)  # Add original instruction
+        function["instrs"] = new_instrs  # Replace instructions with modified version
+
+    return bril_program
+
+def main():
+    binary = parse_binary_flag(sys.argv)
+    if len(sys.argv) < 2:
+        print("Usage: python trace_jumps.py [--edge-profile <map_file>] <bril_json_file>")
+        sys.exit(1)
+
+    # Load Bril JSON file
+    with open(sys.argv[-1], "r") as f:
+        bril_program = read_program(f)
+
+    if len(sys.argv) == 4 and sys.argv[1] == "--edge-profile":
+        # Count edges instead of printing at every jump
+        from edge_profile import instrument_program
+        profile_map = instrument_program(bril_program)
+        with open(sys.argv[2], "w") as f:
+            json.dump(profile_map, f)
+        modified_program = bril_program
+    else:
+        # Transform Bril program
+        modified_program = trace_jumps(bril_program)
+
+    # Print the modified Bril program (as JSON)
+    write_program(modified_program, sys.stdout, binary, indent=2)
+
+if __name__ == "__main__":
+    main()
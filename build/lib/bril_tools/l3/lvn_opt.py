@@ -0,0 +1,176 @@
+import json
+import sys
+import os
+
+from tdce import trivial_dce_ir
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "l2"))
+from bril_ir import Function, Instr, Op, SIDE_EFFECT_OPS, COMMUTATIVE_OPS, NO_VAR, form_basic_blocks
+from bril_parallel import parse_jobs, run_per_function
+from bril_stream import stream_program
+from bril_binary import parse_binary_flag, read_program, write_program
+from bril_trace import traced
+
+MEMORY_WRITE_OPS = {Op.STORE, Op.CALL, Op.FREE}
+
+def canonicalize(value):
+    """Sort arguments for commutative operations like add and mul."""
+    if value[0] in COMMUTATIVE_OPS:
+        return (value[0],) + tuple(sorted(value[1:]))
+    return value
+
+def resolve_variable(var, var2num, num2var):
+    """Recursively resolve variable chains to their canonical form."""
+    seen_vars = set()
+    while var in var2num and var2num[var] in num2var:
+        if var in seen_vars:  # Prevent infinite loops
+            break
+        seen_vars.add(var)
+        var = num2var[var2num[var]]
+    return var
+
+def lvn_block(block):
+    """
+    Perform Local Value Numbering (LVN) on a single basic block.
+    Eliminates common subexpressions, performs copy propagation, and simplifies redundant assignments.
+    """
+    val_table = {}  # (op, arg1, arg2, ...) -> (value_number, var_id)
+    var2num = {}    # var_id -> value_number
+    num2var = {}    # value_number -> canonical variable id
+    next_value_number = 0
+    new_block = []
+    computed_values = set()  # Track variables that have valid definitions
+
+    for instr in block:
+        op = instr.op
+
+        # **Fix: Loads are only reusable until memory may have changed**
+        if op in MEMORY_WRITE_OPS:
+            val_table = {k: v for k, v in val_table.items() if k[0] != Op.LOAD}
+
+        if op == Op.LABEL or op in SIDE_EFFECT_OPS:
+            # **Fix: Ensure print statements & function calls get correct variable replacements**
+            if instr.args is not None:
+                instr.args = tuple(resolve_variable(arg, var2num, num2var) for arg in instr.args)
+            new_block.append(instr)
+            continue
+
+        dest = instr.dest
+        args = instr.args or ()
+
+        # **Preserve function parameters (fix for quadratic.bril)**
+        if op == Op.CALL:
+            instr.args = tuple(resolve_variable(arg, var2num, num2var) for arg in args)
+            new_block.append(instr)
+            computed_values.update(args)
+            continue
+
+        # **Constant Tracking**
+        if op == Op.CONST and instr.value is not None:
+            value_repr = (Op.CONST, instr.value)
+
+            if value_repr in val_table:
+                existing_num, existing_var = val_table[value_repr]
+                var2num[dest] = existing_num
+                new_block.append(Instr(Op.ID, dest=dest, type=instr.type, args=(existing_var,)))
+            else:
+                val_table[value_repr] = (next_value_number, dest)
+                var2num[dest] = next_value_number
+                num2var[next_value_number] = dest
+                next_value_number += 1
+                new_block.append(instr)
+
+            computed_values.add(dest)
+            continue
+
+        # **Resolve arguments to their canonical forms**
+        new_args = tuple(resolve_variable(arg, var2num, num2var) for arg in args)
+
+        # **Fix: Avoid overly aggressive `id` removal**
+        if op == Op.ID and len(args) == 1:
+            src = new_args[0]
+
+            # **Only propagate if the original variable is defined & distinct**
+            if src in computed_values and dest != src:
+                var2num[dest] = var2num.get(src, next_value_number)
+                num2var[var2num[dest]] = src
+                new_block.append(Instr(Op.ID, dest=dest, type=instr.type, args=(src,)))
+
+            computed_values.add(dest)
+            continue
+
+        # **Fix: Preserve branch conditions & jump targets**
+        if op in (Op.BR, Op.JMP):
+            new_block.append(instr)
+            computed_values.update(args)
+            continue
+
+        # **Fix: Preserve function parameters as initial assignments**
+        if not computed_values.intersection(args) and dest != NO_VAR:
+            computed_values.add(dest)
+            new_block.append(instr)
+            continue
+
+        # **Value Numbering & Optimization**
+        value_repr = canonicalize((op,) + new_args)
+
+        if value_repr in val_table:
+            existing_num, existing_var = val_table[value_repr]
+
+            # **Replace with `id` if an existing value is found**
+            if dest != NO_VAR and existing_var != dest:
+                var2num[dest] = existing_num
+                num2var[existing_num] = existing_var
+                new_block.append(Instr(Op.ID, dest=dest, type=instr.type, args=(existing_var,)))
+            computed_values.add(dest)
+        else:
+            curr_num = next_value_number
+            next_value_number += 1
+            val_table[value_repr] = (curr_num, dest)
+            var2num[dest] = curr_num
+            num2var[curr_num] = dest
+
+            instr.args = new_args
+            new_block.append(instr)
+            computed_values.add(dest)
+
+    return new_block
+
+@traced("local_value_numbering")
+def local_value_numbering(fn):
+    """
+    Apply LVN to all basic blocks of an IR function.
+    """
+    blocks = form_basic_blocks(fn.instrs)
+    new_instrs = []
+
+    for block in blocks:
+        optimized_block = lvn_block(block)
+        new_instrs.extend(optimized_block)
+
+    fn.instrs = new_instrs
+
+def optimize_function(func):
+    fn = Function.from_json(func)
+    local_value_numbering(fn)  # Apply LVN
+    trivial_dce_ir(fn)         # Apply TDCE to remove dead code
+    func["instrs"] = fn.instrs_to_json()
+
+def optimize_program(program, jobs=1):
+    """
+    Run Local Value Numbering (LVN) and Trivial Dead Code Elimination (TDCE).
+    """
+    return run_per_function(optimize_function, program, jobs)
+
+def main():
+    jobs = parse_jobs(sys.argv)
+    binary = parse_binary_flag(sys.argv)
+    if "--stream" in sys.argv:
+        stream_program(optimize_function, sys.stdin, sys.stdout, binary)
+        return
+    program = read_program(sys.stdin)
+    program = optimize_program(program, jobs)
+    write_program(program, sys.stdout, binary, indent=2)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,183 @@
+import json
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "l2"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "l4"))
+from bril_ir import Function, SIDE_EFFECT_OPS, NO_VAR, form_basic_blocks, build_cfg
+from bril_parallel import parse_jobs, run_per_function
+from bril_stream import stream_program
+from bril_binary import parse_binary_flag, read_program, write_program
+from bril_trace import traced, annotate
+
+def analyze_liveness(fn):
+    """Compute used variables in a function, including branch conditions."""
+    used_vars = set()
+
+    for instr in fn.instrs:
+        if instr.args:
+            used_vars.update(instr.args)
+
+    return used_vars
+
+def remove_unused_variables(fn):
+    """
+    Removes unused variables by working on basic blocks.
+    Uses global liveness information to avoid removing needed variables.
+    """
+    used_vars = analyze_liveness(fn)
+
+    blocks = form_basic_blocks(fn.instrs)
+    changed = False
+
+    for block in blocks:
+        new_block = []
+        for instr in block:
+            if instr.op in SIDE_EFFECT_OPS:
+                new_block.append(instr)
+                continue
+
+            if instr.dest != NO_VAR and instr.dest not in used_vars:
+                changed = True
+                continue
+
+            new_block.append(instr)
+
+        block[:] = new_block
+
+    fn.instrs = [instr for block in blocks for instr in block]
+    return changed
+
+def remove_shadowed_assignments(block, global_used_vars):
+    """
+    Removes assignments that are overwritten **before being used** in the same block.
+    Ensures globally needed variables are not removed.
+    """
+    last_def = {}
+    to_drop = set()
+
+    # First pass: Identify droppable assignments
+    for i, instr in enumerate(block):
+        for arg in instr.args or ():
+            if arg in last_def:
+                del last_def[arg]
+
+        dest = instr.dest
+        if dest != NO_VAR:
+            if dest in last_def and dest not in global_used_vars:
+                to_drop.add(last_def[dest])
+            last_def[dest] = i
+
+    # Second pass: Remove marked instructions
+    new_block = [instr for i, instr in enumerate(block) if i not in to_drop]
+    return new_block
+
+def trivial_dce_ir(fn):
+    """
+    Iteratively applies DCE and local optimizations until no further progress.
+    """
+    rounds = 0
+    while True:
+        rounds += 1
+        used_vars = analyze_liveness(fn)
+        changed1 = remove_unused_variables(fn)
+        changed2 = False
+
+        blocks = form_basic_blocks(fn.instrs)
+        new_instrs = []
+        for block in blocks:
+            optimized_block = remove_shadowed_assignments(block, used_vars)
+            if len(optimized_block) != len(block):
+                changed2 = True
+            new_instrs.extend(optimized_block)
+
+        if not (changed1 or changed2):
+            break
+
+        fn.instrs = new_instrs
+    annotate(rounds=rounds)
+
+@traced("trivial_dce_function")
+def trivial_dce_function(func):
+    """
+    Apply DCE to one Bril JSON function, working on the compact IR internally.
+    """
+    fn = Function.from_json(func)
+    trivial_dce_ir(fn)
+    func["instrs"] = fn.instrs_to_json()
+
+def dead_definitions(blocks, chains):
+    """
+    Positions of definitions whose values are never used, found with a
+    worklist over def-use chains: deleting a dead instruction removes its
+    uses, which may leave the definitions it read dead in turn.
+    """
+    uses = {d: set(u) for d, u in chains.def_use.items()}
+    worklist = [d for d in chains.var_of if d[0] >= 0 and not uses.get(d)]
+    dead = set()
+    while worklist:
+        pos = worklist.pop()
+        instr = blocks[pos[0]][pos[1]]
+        if pos in dead or uses.get(pos) or instr.op in SIDE_EFFECT_OPS:
+            continue
+        dead.add(pos)
+        for arg in instr.args or ():
+            for d in chains.defs_of(pos, arg):
+                if d in uses:
+                    uses[d].discard(pos)
+                    if not uses[d]:
+                        worklist.append(d)
+    return dead
+
+def global_dce_ir(fn, cfg=None, chains=None):
+    """
+    Removes every definition of IR function fn that reaches no use, across
+    blocks, and returns how many went. A precomputed block `cfg` and
+    analyzed def-use `chains` may be passed in.
+    """
+    from df import DefUseChains
+    blocks = form_basic_blocks(fn.instrs)
+    if chains is None:
+        if cfg is None:
+            cfg_raw = build_cfg(blocks)
+            cfg = {i: {"succs": list(cfg_raw.get(i, [])), "preds": []} for i in range(len(blocks))}
+            for b, succs in cfg_raw.items():
+                for s in succs:
+                    cfg[s]["preds"].append(b)
+        chains = DefUseChains(cfg, blocks, fn.params)
+        chains.analyze()
+    dead = dead_definitions(blocks, chains)
+    if dead:
+        fn.instrs = [instr for b, block in enumerate(blocks) for i, instr in enumerate(block)
+                     if (b, i) not in dead]
+    return len(dead)
+
+@traced("global_dce_function")
+def global_dce_function(func, cfg=None, chains=None):
+    """
+    Global DCE on one Bril JSON function, on the compact IR; `chains` is over
+    the variable ids Function.from_json(func) assigns.
+    """
+    fn = Function.from_json(func)
+    if global_dce_ir(fn, cfg, chains):
+        func["instrs"] = fn.instrs_to_json()
+
+def trivial_dce(program, jobs=1):
+    """
+    Apply DCE to all functions in the program, on `jobs` processes.
+    """
+    return run_per_function(trivial_dce_function, program, jobs)
+
+def main():
+    jobs = parse_jobs(sys.argv)
+    binary = parse_binary_flag(sys.argv)
+    dce_function = global_dce_function if "--global" in sys.argv else trivial_dce_function
+    if "--stream" in sys.argv:
+        stream_program(dce_function, sys.stdin, sys.stdout, binary)
+        return
+    program = read_program(sys.stdin)
+    program = run_per_function(dce_function, program, jobs)
+    write_program(program, sys.stdout, binary, indent=2, sort_keys=True)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
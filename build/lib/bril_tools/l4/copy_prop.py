@@ -0,0 +1,155 @@
+import sys
+from collections import defaultdict
+from bril_cfg import form_basic_blocks, build_cfg
+from bril_stream import stream_program
+from bril_binary import parse_binary_flag, read_program, write_program
+from df import DataFlowSolver, ARGS_BLOCK, with_virtual_entry
+from tdce import global_dce_function
+from bril_trace import traced
+
+def is_copy(instr):
+    args = instr.get("args")
+    return instr.get("op") == "id" and args and len(args) == 1 and args[0] != instr.get("dest")
+
+def value_args(instr):
+    """Indices of the arguments read as values: phi arguments belong to predecessors, `set` names a shadow."""
+    op = instr.get("op")
+    if op == "phi":
+        return range(0)
+    return range(1 if op == "set" else 0, len(instr.get("args", ())))
+
+class AvailableCopies:
+    """
+    Which `x = id y` copies hold on entry to each block: executed on every
+    path, with neither x nor y redefined since. Solved as the complement,
+    the copies that may not hold, which merges by union like the other
+    analyses; the virtual entry block makes every copy unavailable on entry.
+    """
+    def __init__(self, cfg, blocks, entry=0):
+        self.cfg = cfg
+        self.blocks = blocks
+        self.entry = entry
+        self.copies = {}
+        self.naming = defaultdict(set)    # var -> copies it is the dest or source of
+        for b in cfg:
+            for i, instr in enumerate(blocks[b] if b < len(blocks) else ()):
+                if is_copy(instr):
+                    self.copies[(b, i)] = (instr["dest"], instr["args"][0])
+                    self.naming[instr["dest"]].add((b, i))
+                    self.naming[instr["args"][0]].add((b, i))
+        self.killed = {ARGS_BLOCK: set(self.copies)}
+        self.made = {ARGS_BLOCK: set()}
+        for b in cfg:
+            killed, made = set(), set()
+            for i, instr in enumerate(blocks[b] if b < len(blocks) else ()):
+                if "dest" in instr:
+                    invalid = self.naming.get(instr["dest"], set())
+                    killed |= invalid
+                    made -= invalid
+                    if (b, i) in self.copies:
+                        killed.discard((b, i))
+                        made.add((b, i))
+            self.killed[b] = killed
+            self.made[b] = made
+
+    def merge(self, sets):
+        return set().union(*sets)
+
+    def transfer(self, block, in_set):
+        return (in_set - self.made[block]) | self.killed[block]
+
+    def analyze(self):
+        solver = DataFlowSolver(
+            cfg=with_virtual_entry(self.cfg, self.entry),
+            direction="forward",
+            merge=self.merge,
+            transfer=self.transfer,
+            initial=set(),
+            gen_sets=self.killed
+        )
+        return solver.solve()
+
+    def available_in(self, unavailable_in):
+        """dest -> source of the copies holding on entry to each block."""
+        return {b: dict(self.copies[c] for c in self.copies.keys() - unavailable_in[b]) for b in self.cfg}
+
+def resolve(copies, var):
+    """Follows a chain of available copies back to the original source."""
+    for _ in range(len(copies)):
+        if var not in copies:
+            break
+        var = copies[var]
+    return var
+
+def propagate_copies(blocks, copies_in):
+    """
+    Rewrites every use of a copy's destination to its source while the copy
+    holds, walking each block from the copies available on entry. Returns
+    the number of instructions changed.
+    """
+    changed = 0
+    for b, block in enumerate(blocks):
+        copies = dict(copies_in.get(b, {}))
+        sources = defaultdict(set)
+        for dest, src in copies.items():
+            sources[src].add(dest)
+        for instr in block:
+            args = instr.get("args")
+            if args:
+                new_args = list(args)
+                for i in value_args(instr):
+                    new_args[i] = resolve(copies, args[i])
+                if new_args != args:
+                    instr["args"] = new_args
+                    changed += 1
+            dest = instr.get("dest")
+            if dest is None:
+                continue
+            if dest in copies:
+                sources[copies.pop(dest)].discard(dest)
+            for other in sources.pop(dest, ()):
+                del copies[other]
+            if is_copy(instr):
+                copies[dest] = instr["args"][0]
+                sources[instr["args"][0]].add(dest)
+    return changed
+
+@traced("copy_prop_function")
+def copy_prop_function(func, dce=True):
+    """
+    Global copy propagation: uses of `x` after `x = id y` read `y` directly
+    wherever the copy is available, across blocks. The copies left without
+    uses are then removed by global DCE.
+    """
+    blocks = form_basic_blocks(func["instrs"])
+    if not blocks:
+        return
+    cfg_raw = build_cfg(blocks)
+    cfg = {i: {"succs": list(cfg_raw.get(i, [])), "preds": []} for i in range(len(blocks))}
+    for b, succs in cfg_raw.items():
+        for s in succs:
+            cfg[s]["preds"].append(b)
+    analysis = AvailableCopies(cfg, blocks)
+    if analysis.copies:
+        unavailable_in, _ = analysis.analyze()
+        propagate_copies(blocks, analysis.available_in(unavailable_in))
+        func["instrs"] = [instr for block in blocks for instr in block]
+    if dce:
+        global_dce_function(func)
+
+def copy_prop(program):
+    for func in program["functions"]:
+        copy_prop_function(func)
+    return program
+
+def main():
+    binary = parse_binary_flag(sys.argv)
+    if "--stream" in sys.argv:
+        stream_program(copy_prop_function, sys.stdin, sys.stdout, binary)
+        return
+    program = read_program(sys.stdin)
+    program = copy_prop(program)
+    write_program(program, sys.stdout, binary, indent=2)
+
+if __name__ == "__main__":
+    main()
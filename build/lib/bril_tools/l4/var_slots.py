@@ -0,0 +1,205 @@
+import json
+import sys
+from collections import defaultdict
+from bril_cfg import form_basic_blocks, build_cfg
+from bril_stream import stream_program
+from bril_binary import parse_binary_flag, read_program, write_program
+from df import DataFlowSolver
+from bril_trace import traced
+
+SHADOW_OPS = {"set", "get"}
+
+class LiveIntervals:
+    """
+    Instruction-level liveness over the function laid out in block order.
+    After analyze():
+      intervals[var]    (first, last) instruction index where var is live or defined
+      max_live          most variables live at once
+      interference[var] variables live where var is defined, copies excepted
+      copies            (dest, src) pairs of `id` instructions, for coalescing
+    """
+    def __init__(self, cfg, blocks, func_args=()):
+        self.cfg = cfg
+        self.blocks = blocks
+        self.func_args = [a["name"] for a in func_args]
+        self.uses = {}
+        self.defs = {}
+        for b in cfg:
+            block_use, block_def = set(), set()
+            for instr in blocks[b] if b < len(blocks) else ():
+                block_use.update(arg for arg in instr.get("args", ()) if arg not in block_def)
+                if "dest" in instr:
+                    block_def.add(instr["dest"])
+            self.uses[b] = block_use
+            self.defs[b] = block_def
+        self.intervals = {}
+        self.interference = defaultdict(set)
+        self.copies = []
+        self.max_live = 0
+
+    def merge(self, sets):
+        return set().union(*sets)
+
+    def transfer(self, block, out_set):
+        return self.uses[block] | (out_set - self.defs[block])
+
+    def extend(self, var, point):
+        first, last = self.intervals.get(var, (point, point))
+        self.intervals[var] = (min(first, point), max(last, point))
+
+    def interfere(self, var, live):
+        for other in live:
+            if other != var:
+                self.interference[var].add(other)
+                self.interference[other].add(var)
+
+    def analyze(self):
+        solver = DataFlowSolver(
+            cfg=self.cfg,
+            direction="backward",
+            merge=self.merge,
+            transfer=self.transfer,
+            initial=set(),
+            gen_sets=self.uses
+        )
+        live_in, live_out = solver.solve()
+        start = 0
+        for b, block in enumerate(self.blocks):
+            end = start + len(block)
+            live = set(live_out.get(b, ()))
+            for var in live:
+                self.extend(var, end)
+            self.max_live = max(self.max_live, len(live))
+            # Walk backwards: `live` is what is live just after each instruction.
+            for i in range(len(block) - 1, -1, -1):
+                instr = block[i]
+                point = start + i
+                dest = instr.get("dest")
+                if dest is not None:
+                    self.extend(dest, point)
+                    if instr.get("op") == "id" and len(instr.get("args", ())) == 1:
+                        # A copy does not make dest and src interfere: they hold the same value.
+                        self.copies.append((dest, instr["args"][0]))
+                        self.interfere(dest, live - {instr["args"][0]})
+                    else:
+                        self.interfere(dest, live)
+                    live.discard(dest)
+                for arg in instr.get("args", ()):
+                    live.add(arg)
+                    self.extend(arg, point)
+                self.max_live = max(self.max_live, len(live))
+            start = end
+        # Arguments are all defined on entry, before the first instruction.
+        entry_live = set(live_in.get(0, ())) | set(self.func_args)
+        for arg in self.func_args:
+            self.extend(arg, 0)
+            self.interfere(arg, entry_live)
+        self.max_live = max(self.max_live, len(entry_live))
+        return self.intervals
+
+def type_key(typ):
+    return json.dumps(typ, sort_keys=True)
+
+def variable_types(func):
+    """var -> type key, or None for variables defined with more than one type."""
+    types = {}
+    for arg in func.get("args", []):
+        types[arg["name"]] = type_key(arg["type"])
+    for instr in func["instrs"]:
+        if "dest" in instr:
+            key = type_key(instr.get("type"))
+            if types.setdefault(instr["dest"], key) != key:
+                types[instr["dest"]] = None
+    return types
+
+def color_variables(live, types):
+    """
+    Greedy coloring of the interference graph, visiting variables by interval
+    start as linear scan does. Each variable takes the color of a copy partner
+    when it can, else the lowest free color of its type. Returns var -> new name,
+    the first variable (in that order) given each color.
+    """
+    partners = defaultdict(list)
+    for dest, src in live.copies:
+        partners[dest].append(src)
+        partners[src].append(dest)
+    color = {}
+    names = []
+    by_type = defaultdict(list)         # type key -> colors of that type
+    order = sorted((v for v in live.intervals if types.get(v)), key=lambda v: live.intervals[v])
+    for var in order:
+        taken = {color[n] for n in live.interference.get(var, ()) if n in color}
+        choice = None
+        for partner in partners.get(var, ()):
+            c = color.get(partner)
+            if c is not None and c not in taken and types.get(partner) == types[var]:
+                choice = c
+                break
+        if choice is None:
+            choice = next((c for c in by_type[types[var]] if c not in taken), None)
+        if choice is None:
+            choice = len(names)
+            names.append(var)
+            by_type[types[var]].append(choice)
+        color[var] = choice
+    return {var: names[c] for var, c in color.items()}
+
+@traced("compact_variables_function")
+def compact_variables_function(func):
+    """
+    Renames variables so that ones never live at the same time share a name,
+    and drops the copies that become `x = id x`. Functions using set/get are
+    left alone: their shadow variables are bound by name. Returns (variables
+    before, variables after, max live).
+    """
+    blocks = form_basic_blocks(func["instrs"])
+    names_before = {i["dest"] for i in func["instrs"] if "dest" in i} | {a["name"] for a in func.get("args", [])}
+    if not blocks:
+        return len(names_before), len(names_before), 0
+    cfg_raw = build_cfg(blocks)
+    cfg = {i: {"succs": list(cfg_raw.get(i, [])), "preds": []} for i in range(len(blocks))}
+    for b, succs in cfg_raw.items():
+        for s in succs:
+            cfg[s]["preds"].append(b)
+    live = LiveIntervals(cfg, blocks, func.get("args", []))
+    live.analyze()
+    if any(instr.get("op") in SHADOW_OPS for instr in func["instrs"]):
+        return len(names_before), len(names_before), live.max_live
+
+    rename = color_variables(live, variable_types(func))
+    for arg in func.get("args", []):
+        arg["name"] = rename.get(arg["name"], arg["name"])
+    instrs = []
+    for instr in func["instrs"]:
+        if "dest" in instr:
+            instr["dest"] = rename.get(instr["dest"], instr["dest"])
+        if "args" in instr:
+            instr["args"] = [rename.get(arg, arg) for arg in instr["args"]]
+        if instr.get("op") == "id" and instr["args"] == [instr["dest"]]:
+            continue
+        instrs.append(instr)
+    func["instrs"] = instrs
+    names_after = {i["dest"] for i in instrs if "dest" in i} | {a["name"] for a in func.get("args", [])}
+    return len(names_before), len(names_after), live.max_live
+
+def compact_variables(program):
+    stats = {}
+    for func in program["functions"]:
+        before, after, max_live = compact_variables_function(func)
+        stats[func["name"]] = {"variables": before, "variables_after": after, "max_live": max_live}
+    return stats
+
+def main():
+    binary = parse_binary_flag(sys.argv)
+    if "--stream" in sys.argv:
+        stream_program(compact_variables_function, sys.stdin, sys.stdout, binary)
+        return
+    program = read_program(sys.stdin)
+    stats = compact_variables(program)
+    if "--stats" in sys.argv:
+        print(json.dumps(stats, indent=2))
+    else:
+        write_program(program, sys.stdout, binary, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+import json
+import sys
+from collections import defaultdict
+
+from bril_cfg import share_program
+from bril_ir import Function, Instr, Op, NO_VAR, form_basic_blocks, build_cfg
+from bril_parallel import parse_jobs, run_per_function
+from bril_binary import parse_binary_flag, read_program, write_program
+from dom_utils import Dominators, ensure_unique_entry
+from bril_trace import traced
+
+def compute_live_vars(blocks, cfg):
+    """Live-in and live-out variable ids of each IR block, keyed by block index."""
+    n = len(blocks)
+    live_in = {i: set() for i in range(n)}
+    live_out = {i: set() for i in range(n)}
+    block_use = {}
+    block_def = {}
+    for i, block in enumerate(blocks):
+        use = set()
+        defs = set()
+        for instr in block:
+            if instr.args:
+                for arg in instr.args:
+                    if arg not in defs:
+                        use.add(arg)
+            if instr.dest != NO_VAR:
+                defs.add(instr.dest)
+        block_use[i] = use
+        block_def[i] = defs
+    # Liveness flows backwards, so sweeping the blocks in reverse settles in fewer rounds.
+    changed = True
+    while changed:
+        changed = False
+        for i in reversed(range(n)):
+            new_out = set()
+            for succ in cfg.get(i, {}).get("succs", []):
+                new_out |= live_in[succ]
+            if new_out != live_out[i]:
+                live_out[i] = new_out
+                changed = True
+            new_in = block_use[i] | (live_out[i] - block_def[i])
+            if new_in != live_in[i]:
+                live_in[i] = new_in
+                changed = True
+    return live_in, live_out
+
+def get_types(fn):
+    types = {}
+    for var, typ in fn.params:
+        types[var] = typ
+    for instr in fn.instrs:
+        if instr.dest != NO_VAR and instr.type is not None:
+            if instr.dest not in types:
+                types[instr.dest] = instr.type
+    return types
+
+def to_ssa_ir(fn, cfg=None, doms=None, live=None):
+    """
+    Rewrites IR function fn into SSA form with set/get. Precomputed block
+    `cfg`, `doms` and `live` (over fn's variable ids) may be passed in.
+    """
+    blocks = form_basic_blocks(fn.instrs)
+    if cfg is None:
+        cfg_raw = build_cfg(blocks)
+        cfg = {}
+        for i in range(len(blocks)):
+            cfg[i] = {"succs": list(cfg_raw.get(i, [])), "preds": []}
+        for i, succs in cfg_raw.items():
+            for s in succs:
+                cfg[s]["preds"].append(i)
+    block_labels = {}
+    for i, block in enumerate(blocks):
+        if block and block[0].op == Op.LABEL:
+            block_labels[i] = fn.label_names[block[0].labels[0]]
+        else:
+            block_labels[i] = f"blk{i}"
+    live_in, live_out = live if live is not None else compute_live_vars(blocks, cfg)
+    names = list(fn.var_names)
+    by_name = lambda vars: sorted(vars, key=names.__getitem__)
+    types = get_types(fn)
+    arg_vars = {var for var, _ in fn.params}
+    prologue = []
+    entry_label = block_labels[0]
+    for v in by_name(live_in.get(0, set())):
+        if v not in arg_vars and v in types:
+            prologue.append(Instr(Op.UNDEF, dest=v, type=types[v]))
+    for v in by_name(live_in.get(0, set())):
+        prologue.append(Instr(Op.SET, args=(fn.var(f"{names[v]}.{entry_label}"), v)))
+    entry_block = 0
+    entry_block = ensure_unique_entry(cfg, entry_block, block_labels)
+    if doms is None:
+        doms = Dominators(cfg, entry_block)
+    dom_tree = doms.dom_tree
+    undef = fn.var("undef")
+    stack = defaultdict(list)
+    counters = defaultdict(int)
+    for v in arg_vars:
+        stack[v].append(v)
+    pre_instructions = defaultdict(list)
+    post_instructions = defaultdict(list)
+    def rename(b):
+        label = block_labels[b]
+        for v in by_name(live_in.get(b, set())):
+            new_var = fn.var(f"{names[v]}.{label}")
+            stack[v].append(new_var)
+            pre_instructions[b].append(Instr(Op.GET, dest=new_var, type=types.get(v, "unknown")))
+        block = blocks[b]
+        defined = []
+        for instr in block:
+            if instr.op == Op.LABEL:
+                continue
+            if instr.args:
+                instr.args = tuple(stack[arg][-1] if stack[arg] else undef for arg in instr.args)
+            if instr.dest != NO_VAR:
+                var = instr.dest
+                counters[(var, label)] += 1
+                new_name = f"{names[var]}.{label}"
+                if counters[(var, label)] > 1:
+                    new_name = f"{new_name}.{counters[(var, label)]}"
+                instr.dest = fn.var(new_name)
+                stack[var].append(instr.dest)
+                defined.append(var)
+        for succ in cfg.get(b, {}).get("succs", []):
+            succ_label = block_labels[succ]
+            for v in by_name(live_in.get(succ, set()) & live_out.get(b, set())):
+                current_ver = stack[v][-1] if stack[v] else undef
+                post_instructions[b].append(Instr(Op.SET, args=(fn.var(f"{names[v]}.{succ_label}"), current_ver)))
+        for child in sorted(dom_tree.get(b, [])):
+            rename(child)
+        for v in live_in.get(b, set()):
+            if stack[v]:
+                stack[v].pop()
+        for var in defined:
+            if stack[var]:
+                stack[var].pop()
+    rename(entry_block)
+    new_instrs = []
+    new_instrs.extend(prologue)
+    for i, block in enumerate(blocks):
+        if block and block[0].op == Op.LABEL:
+            new_instrs.append(block[0])
+        else:
+            new_instrs.append(Instr(Op.LABEL, labels=(fn.label(block_labels[i]),)))
+        new_instrs.extend(pre_instructions[i])
+        start_idx = 1 if block and block[0].op == Op.LABEL else 0
+        new_instrs.extend(block[start_idx:])
+        new_instrs.extend(post_instructions[i])
+    if not new_instrs or new_instrs[-1].op != Op.RET:
+        new_instrs.append(Instr(Op.RET))
+    fn.instrs = new_instrs
+
+@traced("to_ssa")
+def to_ssa(func, cfg=None, doms=None, live=None):
+    """
+    Rewrites Bril JSON function func into SSA form, on the compact IR. `live`
+    is over the variable ids Function.from_json(func) assigns.
+    """
+    fn = Function.from_json(func)
+    to_ssa_ir(fn, cfg, doms, live)
+    func["instrs"] = fn.instrs_to_json()
+    return func
+
+@traced("from_ssa")
+def from_ssa(func):
+    """
+    Drops set/get/undef and SSA suffixes; only renamed instructions are copied.
+    This stays on the JSON dicts: the pass is one filtering sweep, which costs
+    less than converting its (mostly set/get) input to the IR.
+    """
+    new_instrs = []
+    for instr in func["instrs"]:
+        op = instr.get("op")
+        if op in ("set", "get", "undef"):
+            continue
+        dest, args = instr.get("dest"), instr.get("args", ())
+        if (dest is not None and "." in dest) or any("." in arg for arg in args):
+            instr = instr.copy()
+            if "dest" in instr:
+                instr["dest"] = instr["dest"].split('.')[0]
+            if "args" in instr:
+                instr["args"] = [arg.split('.')[0] for arg in instr["args"]]
+        new_instrs.append(instr)
+    func["instrs"] = new_instrs
+    return func
+
+def count_insns(prog):
+    total = 0
+    for func in prog.get("functions", []):
+        total += len(func.get("instrs", []))
+    return total
+
+def transform_program(prog, mode, jobs=1):
+    if mode == "to_ssa":
+        return run_per_function(to_ssa, prog, jobs)
+    elif mode == "from_ssa":
+        return run_per_function(from_ssa, prog, jobs)
+    return prog
+
+def main():
+    jobs = parse_jobs(sys.argv)
+    binary = parse_binary_flag(sys.argv)
+    if len(sys.argv) < 3:
+        print("Usage: python ssa.py <to_ssa|from_ssa|stats> <bril_json_file> [--jobs N] [--binary]")
+        sys.exit(1)
+    mode = sys.argv[1]
+    filename = sys.argv[2]
+    with open(filename, "r") as f:
+        prog = read_program(f)
+    if mode == "stats":
+        # to_ssa leaves the original untouched, and the round trip shares
+        # every instruction from_ssa does not rewrite with the one SSA result.
+        prog_ssa = transform_program(share_program(prog), "to_ssa", jobs)
+        prog_rt = transform_program(share_program(prog_ssa), "from_ssa", jobs)
+        orig_count = count_insns(prog)
+        ssa_count = count_insns(prog_ssa)
+        rt_count = count_insns(prog_rt)
+        stats = {
+            "original_instruction_count": orig_count,
+            "ssa_instruction_count": ssa_count,
+            "roundtrip_instruction_count": rt_count,
+            "increase_from_to_ssa": ssa_count - orig_count,
+            "increase_from_roundtrip": rt_count - orig_count,
+        }
+        print(json.dumps(stats, indent=2))
+    else:
+        transformed = transform_program(prog, mode, jobs)
+        write_program(transformed, sys.stdout, binary, indent=2)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,267 @@
+import csv
+import gc
+import json
+import math
+import os
+import sys
+import time
+
+# Run as a script only tools/ is on sys.path; the passes live in the lesson directories.
+for lesson in ("l2", "l3", "l4", "l5", "l6", "l8"):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", lesson))
+
+from bril_cfg import form_basic_blocks, build_cfg
+from bril_gen import generate_function
+
+DEFAULT_SIZES = [100, 300, 1000, 3000, 10000, 30000, 100000, 300000, 1000000]
+MIN_FIT_SECONDS = 1e-3   # faster points are mostly timer noise and left out of the fit
+
+def clone(func):
+    return json.loads(json.dumps(func))
+
+def index_cfg(blocks):
+    cfg_raw = build_cfg(blocks)
+    cfg = {i: {"succs": list(cfg_raw.get(i, [])), "preds": []} for i in range(len(blocks))}
+    for b, succs in cfg_raw.items():
+        for s in succs:
+            cfg[s]["preds"].append(b)
+    return cfg
+
+def label_cfg(blocks):
+    """The label-keyed CFG the df.py analyses expect, over explicit IR blocks."""
+    cfg = {block[0].labels[0]: {"succs": list(block[-1].labels or ()), "preds": []} for block in blocks}
+    for label, node in cfg.items():
+        for succ in node["succs"]:
+            cfg[succ]["preds"].append(label)
+    return cfg
+
+# Each benchmark does its setup and returns the call to time; the call may
+# freely mutate what the setup made.
+
+def bench_cfg(func):
+    instrs = func["instrs"]
+    return lambda: build_cfg(form_basic_blocks(instrs))
+
+def bench_dominators(func):
+    from dom_utils import Dominators
+    cfg = index_cfg(form_basic_blocks(func["instrs"]))
+    return lambda: Dominators(cfg, 0)
+
+def df_bench(analysis):
+    def bench(func):
+        import df
+        from bril_ir import Function, form_explicit_blocks
+        blocks = form_explicit_blocks(Function.from_json(func))
+        cfg = label_cfg(blocks)
+        return lambda: getattr(df, analysis)(cfg, blocks).analyze()
+    return bench
+
+def bench_def_use(func):
+    from bril_ir import Function, form_basic_blocks as form_ir_blocks
+    from df import DefUseChains
+    fn = Function.from_json(func)
+    blocks = form_ir_blocks(fn.instrs)
+    cfg = index_cfg(form_basic_blocks(func["instrs"]))
+    return lambda: DefUseChains(cfg, blocks, fn.params).analyze()
+
+def bench_to_ssa(func):
+    from ssa import to_ssa
+    copy = clone(func)
+    return lambda: to_ssa(copy)
+
+def bench_from_ssa(func):
+    from ssa import from_ssa, to_ssa
+    copy = to_ssa(clone(func))
+    return lambda: from_ssa(copy)
+
+def bench_lvn_block(func):
+    from bril_ir import Function, form_basic_blocks as form_ir_blocks
+    from lvn_opt import lvn_block
+    blocks = form_ir_blocks(Function.from_json(func).instrs)
+    return lambda: [lvn_block(block) for block in blocks]
+
+def bench_tdce(func):
+    from tdce import trivial_dce_function
+    copy = clone(func)
+    return lambda: trivial_dce_function(copy)
+
+def bench_gdce(func):
+    from tdce import global_dce_function
+    copy = clone(func)
+    return lambda: global_dce_function(copy)
+
+def bench_licm(func):
+    from loop_opt import licm
+    copy = clone(func)
+    return lambda: licm(copy)
+
+def bench_copy_prop(func):
+    from copy_prop import copy_prop_function
+    copy = clone(func)
+    return lambda: copy_prop_function(copy, dce=False)
+
+def bench_compact_vars(func):
+    from var_slots import compact_variables_function
+    copy = clone(func)
+    return lambda: compact_variables_function(copy)
+
+BENCHMARKS = {
+    "cfg": bench_cfg,
+    "dominators": bench_dominators,
+    "reaching-definitions": df_bench("ReachingDefinitions"),
+    "live": df_bench("LiveVariables"),
+    "constant": df_bench("ConstantPropagation"),
+    "def-use": bench_def_use,
+    "to_ssa": bench_to_ssa,
+    "from_ssa": bench_from_ssa,
+    "lvn_block": bench_lvn_block,
+    "tdce": bench_tdce,
+    "gdce": bench_gdce,
+    "licm": bench_licm,
+    "copy-prop": bench_copy_prop,
+    "compact-vars": bench_compact_vars,
+}
+
+def measure(bench, func, min_time=0.2, max_repeats=5):
+    """Best of a few timed runs, each on a fresh setup. GC is off while timing, as in timeit."""
+    best = math.inf
+    total = 0.0
+    for _ in range(max_repeats):
+        run = bench(func)
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        best = min(best, elapsed)
+        total += elapsed
+        if total >= min_time:
+            break
+    return best
+
+def scaling_exponent(points):
+    """Least-squares slope of log(time) against log(size): 1 is linear, 2 quadratic."""
+    points = [(n, t) for n, t in points if t >= MIN_FIT_SECONDS]
+    if len(points) < 2:
+        return None
+    xs = [math.log(n) for n, _ in points]
+    ys = [math.log(t) for _, t in points]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - mean_x) ** 2 for x in xs)
+    if var == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var
+
+def run_suite(names, sizes, budget, gen_params, log=sys.stderr):
+    """
+    Times every benchmark on a generated function of each size. A benchmark
+    stops growing once one run exceeds `budget` seconds or fails. Returns
+    {name: {"points": [(instrs, seconds)], "error": str or None}}.
+    """
+    results = {name: {"points": [], "error": None} for name in names}
+    for size in sizes:
+        active = [name for name in names if results[name]["error"] is None
+                  and all(t <= budget for _, t in results[name]["points"])]
+        if not active:
+            break
+        func = generate_function(instrs=size, **gen_params)
+        count = len(func["instrs"])
+        for name in active:
+            try:
+                seconds = measure(BENCHMARKS[name], func)
+            except Exception as e:
+                results[name]["error"] = f"{type(e).__name__} at {count} instrs"
+                print(f"{name}: {results[name]['error']}", file=log)
+                continue
+            results[name]["points"].append((count, seconds))
+            print(f"{name:<22}{count:>9} instrs {seconds * 1000:>12.3f} ms", file=log)
+        del func
+    return results
+
+def format_ms(seconds):
+    return f"{seconds * 1000:.2f}" if seconds < 10 else f"{seconds:.1f}s"
+
+def report(results, sizes, threshold, out=sys.stdout):
+    """Scaling table, one row per benchmark; returns the names flagged super-linear."""
+    flagged = []
+    print(f"{'benchmark':<22}" + "".join(f"{size:>10}" for size in sizes) + f"{'exponent':>10}", file=out)
+    for name, result in results.items():
+        cells = [format_ms(t) for _, t in result["points"]]
+        cells += ["-"] * (len(sizes) - len(cells))
+        exponent = scaling_exponent(result["points"])
+        note = ""
+        if exponent is not None and exponent > threshold:
+            note = "  SUPER-LINEAR"
+            flagged.append(name)
+        if result["error"]:
+            note += f"  ({result['error']})"
+        shown = f"{exponent:.2f}" if exponent is not None else "?"
+        print(f"{name:<22}" + "".join(f"{c:>10}" for c in cells) + f"{shown:>10}{note}", file=out)
+    print(f"(times in ms for the target sizes; exponent fitted on runs over {MIN_FIT_SECONDS * 1000:g} ms)", file=out)
+    return flagged
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] in ("-h", "--help"):
+        print("Usage: python bench_passes.py [--only a,b] [--sizes 100,1000,...] [--budget S] "
+              "[--threshold X] [--depth N] [--branches P] [--irreducible P] [--seed N] "
+              "[--csv out.csv] [--json out.json] [--check]")
+        print(f"Benchmarks: {', '.join(BENCHMARKS)}")
+        sys.exit(1)
+
+    names, sizes, budget, threshold = list(BENCHMARKS), DEFAULT_SIZES, 10.0, 1.3
+    gen_params = {"loop_depth": 3, "branch_density": 0.2, "irreducible": 0.0, "seed": 0}
+    csv_file = json_file = None
+    check = False
+    while args:
+        arg = args.pop(0)
+        if arg == "--only":
+            names = args.pop(0).split(",")
+        elif arg == "--sizes":
+            sizes = [int(float(s)) for s in args.pop(0).split(",")]
+        elif arg == "--budget":
+            budget = float(args.pop(0))
+        elif arg == "--threshold":
+            threshold = float(args.pop(0))
+        elif arg == "--depth":
+            gen_params["loop_depth"] = int(args.pop(0))
+        elif arg == "--branches":
+            gen_params["branch_density"] = float(args.pop(0))
+        elif arg == "--irreducible":
+            gen_params["irreducible"] = float(args.pop(0))
+        elif arg == "--seed":
+            gen_params["seed"] = int(args.pop(0))
+        elif arg == "--csv":
+            csv_file = args.pop(0)
+        elif arg == "--json":
+            json_file = args.pop(0)
+        elif arg == "--check":
+            check = True
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"unknown benchmark(s) {', '.join(unknown)}; available: {', '.join(BENCHMARKS)}", file=sys.stderr)
+        sys.exit(1)
+
+    results = run_suite(names, sizes, budget, gen_params)
+    flagged = report(results, sizes, threshold)
+    if csv_file:
+        with open(csv_file, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["benchmark", "instrs", "seconds"])
+            for name, result in results.items():
+                for count, seconds in result["points"]:
+                    writer.writerow([name, count, f"{seconds:.6f}"])
+    if json_file:
+        curves = {name: {"points": result["points"], "exponent": scaling_exponent(result["points"]),
+                         "error": result["error"]} for name, result in results.items()}
+        with open(json_file, "w") as f:
+            json.dump(curves, f, indent=2)
+    if check and flagged:
+        print(f"super-linear: {', '.join(flagged)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
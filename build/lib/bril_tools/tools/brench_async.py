@@ -0,0 +1,190 @@
+import asyncio
+import csv
+import glob
+import os
+import re
+import shlex
+import signal
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "l2"))
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+def local_interp():
+    """Stand-in for `brili -p {args}`: the in-process interpreter, reading JSON on stdin."""
+    import bril_interp
+    return f"{shlex.quote(sys.executable)} {shlex.quote(bril_interp.__file__)} -p - {{args}}"
+
+def local_parser():
+    """Stand-in for `bril2json`: the in-process text parser."""
+    import bril_text
+    return f"{shlex.quote(sys.executable)} {shlex.quote(bril_text.__file__)} json"
+
+def load_config(path):
+    """Reads a brench-style task file: `extract`, `benchmarks` and `[runs.<name>] pipeline`."""
+    with open(path, "rb") as f:
+        config = tomllib.load(f)
+    runs = {name: run["pipeline"] for name, run in config["runs"].items()}
+    return config["extract"], config["benchmarks"], runs
+
+def read_args(path):
+    """Benchmark arguments from a `# ARGS:` line, as brench does."""
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip().startswith("# ARGS:"):
+                return line.split(":", 1)[1].strip()
+    return ""
+
+def build_command(pipeline, args, interp=None, parser=None):
+    stages = []
+    for stage in pipeline:
+        if interp and stage.split()[:1] == ["brili"]:
+            stage = interp
+        elif parser and stage.split() == ["bril2json"]:
+            stage = parser
+        stages.append(stage.format(args=args).strip())
+    return " | ".join(stages)
+
+async def stream_lines(stream, lines, on_line=None):
+    while True:
+        line = await stream.readline()
+        if not line:
+            return
+        text = line.decode(errors="replace")
+        lines.append(text)
+        if on_line:
+            on_line(text)
+
+async def run_once(command, bench_file, extract, timeout):
+    """
+    Runs one shell pipeline with the benchmark on stdin. stderr is scanned line
+    by line for `extract` as it arrives. Returns (result, stdout) where result
+    is the extracted count, "timeout" or "missing".
+    """
+    found = []
+    stdout, stderr = [], []
+
+    def on_stderr(line):
+        match = extract.search(line)
+        if match:
+            found.append(match.group(1))
+
+    with open(bench_file, "rb") as stdin:
+        # A new session lets a timeout kill every stage of the pipeline, not just the shell.
+        proc = await asyncio.create_subprocess_shell(
+            command, stdin=stdin, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE, start_new_session=True,
+        )
+        try:
+            await asyncio.wait_for(asyncio.gather(
+                stream_lines(proc.stdout, stdout),
+                stream_lines(proc.stderr, stderr, on_stderr),
+                proc.wait(),
+            ), timeout)
+        except asyncio.TimeoutError:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+            return "timeout", "".join(stdout)
+
+    if proc.returncode != 0 or not found:
+        return "missing", "".join(stdout)
+    return int(found[-1]), "".join(stdout)
+
+class Runner:
+    """
+    Runs every (benchmark, run) pipeline with at most `jobs` processes at once.
+    Failed attempts are retried up to `retries` times; a benchmark whose
+    attempts disagree is reported as flaky.
+    """
+    def __init__(self, extract, runs, jobs=4, timeout=60.0, retries=0, interp=None, parser=None):
+        self.extract = re.compile(extract)
+        self.runs = runs
+        self.timeout = timeout
+        self.retries = retries
+        self.interp = interp
+        self.parser = parser
+        self.jobs = jobs
+        self.semaphore = None
+
+    async def run_benchmark(self, bench_file, run):
+        command = build_command(self.runs[run], read_args(bench_file), self.interp, self.parser)
+        attempts = []
+        for _ in range(self.retries + 1):
+            async with self.semaphore:
+                attempts.append(await run_once(command, bench_file, self.extract, self.timeout))
+            if isinstance(attempts[-1][0], int):
+                break
+        results = {result for result, _ in attempts}
+        return {
+            "benchmark": os.path.splitext(os.path.basename(bench_file))[0],
+            "run": run,
+            "result": attempts[-1][0],
+            "output": attempts[-1][1],
+            "attempts": len(attempts),
+            "flaky": len(results) > 1,
+        }
+
+    async def run_all(self, bench_files):
+        # Made here, inside the running loop: before 3.10 a semaphore binds to
+        # the loop current at construction, which asyncio.run() replaces.
+        self.semaphore = asyncio.Semaphore(self.jobs)
+        tasks = [self.run_benchmark(f, run) for f in bench_files for run in self.runs]
+        rows = await asyncio.gather(*tasks)
+        # The first run is the reference output, as in brench.
+        baseline_run = next(iter(self.runs))
+        expected = {r["benchmark"]: r["output"] for r in rows if r["run"] == baseline_run}
+        for row in rows:
+            if isinstance(row["result"], int) and row["output"] != expected.get(row["benchmark"]):
+                row["result"] = "incorrect"
+        return rows
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] in ("-h", "--help"):
+        print("Usage: python brench_async.py <task.toml> [--jobs N] [--timeout S] [--retries N] "
+              "[--local | --interp <cmd>] [--csv out.csv]")
+        sys.exit(1)
+
+    config_file = args.pop(0)
+    jobs, timeout, retries, interp, parser, csv_file = os.cpu_count() or 1, 60.0, 0, None, None, None
+    while args:
+        arg = args.pop(0)
+        if arg in ("--jobs", "-j"):
+            jobs = int(args.pop(0))
+        elif arg == "--timeout":
+            timeout = float(args.pop(0))
+        elif arg == "--retries":
+            retries = int(args.pop(0))
+        elif arg == "--interp":
+            interp = args.pop(0)
+        elif arg == "--local":
+            interp, parser = local_interp(), local_parser()
+        elif arg == "--csv":
+            csv_file = args.pop(0)
+
+    extract, benchmarks, runs = load_config(config_file)
+    bench_files = sorted(glob.glob(benchmarks))
+    runner = Runner(extract, runs, jobs=jobs, timeout=timeout, retries=retries, interp=interp, parser=parser)
+    start = time.perf_counter()
+    rows = asyncio.run(runner.run_all(bench_files))
+
+    out = open(csv_file, "w", newline="") if csv_file else sys.stdout
+    writer = csv.writer(out)
+    writer.writerow(["benchmark", "run", "result", "attempts", "flaky"])
+    for row in rows:
+        writer.writerow([row["benchmark"], row["run"], row["result"], row["attempts"], row["flaky"]])
+    if csv_file:
+        out.close()
+    print(f"{len(bench_files)} benchmarks x {len(runs)} runs in {time.perf_counter() - start:.2f} s",
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import os
+import random
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "l2"))
+from bril_binary import parse_binary_flag, write_program
+
+ARITH_OPS = ["add", "sub", "add", "mul"]
+COMPARE_OPS = ["lt", "gt", "eq", "le"]
+
+class FunctionGenerator:
+    """
+    Builds one synthetic, terminating Bril function. Blocks are laid out as
+    nested counted loops (two trips each) up to `loop_depth`, with forward
+    branches inside each loop body at `branch_density`; with probability
+    `irreducible` a loop also gets a second entry into its body.
+    """
+    def __init__(self, name="main", instrs=1000, blocks=None, variables=16, loop_depth=2,
+                 branch_density=0.2, irreducible=0.0, seed=0):
+        self.name = name
+        self.rand = random.Random(seed)
+        self.num_blocks = max(3, blocks if blocks is not None else instrs // 8)
+        self.instrs = instrs
+        self.loop_depth = loop_depth
+        self.branch_density = branch_density
+        self.irreducible = irreducible
+        self.data = [f"v{i}" for i in range(max(2, variables))]
+        self.conds = [f"c{i}" for i in range(max(1, variables // 4))]
+        self.loops = []                       # (header, latch)
+        self.top = (0, self.num_blocks - 1)
+        self.region = [self.top] * self.num_blocks  # innermost enclosing (header, latch)
+        self.parent = {}
+
+    def nest(self, lo, hi, depth, parent):
+        """Splits blocks lo..hi-1 into up to four sibling regions, each a loop while depth allows."""
+        if hi - lo < 3 or depth >= self.loop_depth:
+            return
+        parts = min(self.rand.randint(1, 4), (hi - lo) // 3)
+        cuts = sorted(self.rand.sample(range(lo + 1, hi), parts - 1)) if parts > 1 else []
+        for start, end in zip([lo] + cuts, cuts + [hi]):
+            if end - start < 3:
+                continue
+            loop = (start, end - 1)
+            self.loops.append(loop)
+            self.parent[loop] = parent
+            for b in range(start, end):
+                self.region[b] = loop
+            self.nest(start + 1, end - 1, depth + 1, loop)
+
+    def forward_target(self, b):
+        """A later block of b's loop, or the header of a loop nested directly in it; None if none found."""
+        region = self.region[b]
+        for _ in range(4):
+            t = self.rand.randint(b + 1, region[1])
+            if self.region[t] == region or (self.region[t][0] == t and self.parent[self.region[t]] == region):
+                return t
+        return None
+
+    def body_instr(self):
+        r = self.rand.random()
+        a, b = self.rand.choice(self.data), self.rand.choice(self.data)
+        if r < 0.6:
+            return {"op": self.rand.choice(ARITH_OPS), "dest": self.rand.choice(self.data), "type": "int", "args": [a, b]}
+        if r < 0.7:
+            return {"op": "const", "dest": self.rand.choice(self.data), "type": "int", "value": self.rand.randint(0, 9)}
+        if r < 0.8:
+            return {"op": "id", "dest": self.rand.choice(self.data), "type": "int", "args": [a]}
+        if r < 0.95:
+            return {"op": self.rand.choice(COMPARE_OPS), "dest": self.rand.choice(self.conds), "type": "bool", "args": [a, b]}
+        return {"op": "print", "args": [a]}
+
+    def function(self):
+        n = self.num_blocks
+        self.nest(1, n - 1, 0, self.top)
+        bodies = [[] for _ in range(n)]
+        terms = [None] * n
+        entry = [{"op": "const", "dest": v, "type": "int", "value": self.rand.randint(0, 9)} for v in self.data]
+        entry += [{"op": "const", "dest": c, "type": "bool", "value": self.rand.random() < 0.5} for c in self.conds]
+        entry += [{"op": "const", "dest": "one", "type": "int", "value": 1},
+                  {"op": "const", "dest": "trips", "type": "int", "value": 2}]
+
+        for k, (header, latch) in enumerate(self.loops):
+            counter, test = f"i{k}", f"t{k}"
+            # Reset the counter just before the loop; the function entry defines it too,
+            # so a second entry into the body still finds it set.
+            entry.append({"op": "const", "dest": counter, "type": "int", "value": 0})
+            bodies[header - 1].append({"op": "const", "dest": counter, "type": "int", "value": 0})
+            bodies[latch] += [{"op": "add", "dest": counter, "type": "int", "args": [counter, "one"]},
+                              {"op": "lt", "dest": test, "type": "bool", "args": [counter, "trips"]}]
+            terms[latch] = {"op": "br", "args": [test], "labels": [f"b{header}", f"b{latch + 1}"]}
+
+        for k, (header, latch) in enumerate(self.loops):
+            if terms[header - 1] is None and latch - header >= 2 and self.rand.random() < self.irreducible:
+                side = self.rand.randint(header + 1, latch - 1)
+                terms[header - 1] = {"op": "br", "args": [self.rand.choice(self.conds)],
+                                     "labels": [f"b{header}", f"b{side}"]}
+
+        for b in range(n - 1):
+            if terms[b] is not None:
+                continue
+            target = None
+            if b + 1 < self.region[b][1] and self.rand.random() < self.branch_density:
+                target = self.forward_target(b)
+            if target is not None:
+                terms[b] = {"op": "br", "args": [self.rand.choice(self.conds)], "labels": [f"b{b + 1}", f"b{target}"]}
+            elif self.rand.random() < 0.5:
+                terms[b] = {"op": "jmp", "labels": [f"b{b + 1}"]}
+
+        overhead = len(entry) + sum(len(body) for body in bodies) + n + sum(t is not None for t in terms) + 1
+        per_block = max(0, self.instrs - overhead) / n
+        filled = 0.0
+        instrs = []
+        for b in range(n):
+            filled += per_block
+            count = int(filled)
+            filled -= count
+            instrs.append({"label": f"b{b}"})
+            if b == 0:
+                instrs += entry
+            instrs += [self.body_instr() for _ in range(count)]
+            instrs += bodies[b]
+            if terms[b] is not None:
+                instrs.append(terms[b])
+        instrs.append({"op": "print", "args": self.data[:4]})
+        return {"name": self.name, "instrs": instrs}
+
+def generate_function(name="main", seed=0, **params):
+    return FunctionGenerator(name, seed=seed, **params).function()
+
+def generate_program(functions=1, seed=0, **params):
+    names = ["main"] + [f"f{i}" for i in range(1, functions)]
+    return {"functions": [generate_function(name, seed=seed + i, **params) for i, name in enumerate(names)]}
+
+OPTIONS = {
+    "--instrs": ("instrs", int), "--blocks": ("blocks", int), "--vars": ("variables", int),
+    "--depth": ("loop_depth", int), "--branches": ("branch_density", float),
+    "--irreducible": ("irreducible", float), "--seed": ("seed", int), "--functions": ("functions", int),
+}
+
+def main():
+    binary = parse_binary_flag(sys.argv)
+    args = sys.argv[1:]
+    if args and args[0] in ("-h", "--help") or len(args) % 2:
+        print("Usage: python bril_gen.py [--instrs N] [--blocks N] [--vars N] [--depth N] "
+              "[--branches P] [--irreducible P] [--seed N] [--functions N] [--binary]")
+        sys.exit(1)
+    params = {}
+    for flag, value in zip(args[::2], args[1::2]):
+        if flag not in OPTIONS:
+            print(f"bril_gen.py: unknown option {flag}", file=sys.stderr)
+            sys.exit(1)
+        key, convert = OPTIONS[flag]
+        params[key] = convert(value)
+    write_program(generate_program(**params), sys.stdout, binary, indent=2)
+
+if __name__ == "__main__":
+    main()
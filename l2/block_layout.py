@@ -0,0 +1,78 @@
+import json
+import sys
+from bril_cfg import form_explicit_blocks, flatten_blocks
+from bril_binary import parse_binary_flag, read_program, write_program
+
+def form_chains(blocks, edge_counts):
+    """
+    Bottom-up chain formation (Pettis-Hansen): visit edges from hottest to
+    coldest and glue the source chain onto the target chain whenever the source
+    is a chain tail and the target a chain head. Only jmp edges are considered,
+    since a Bril br names both targets and never falls through.
+    """
+    entry = blocks[0][0]["label"]
+    by_label = {block[0]["label"]: block for block in blocks}
+    chain_of = {label: [label] for label in by_label}
+
+    jmp_edges = []
+    for (src, dst), count in edge_counts.items():
+        if src in by_label and dst in by_label and src != dst:
+            term = by_label[src][-1]
+            if term.get("op") == "jmp" and term["labels"][0] == dst:
+                jmp_edges.append((count, src, dst))
+    jmp_edges.sort(key=lambda e: -e[0])
+
+    for count, src, dst in jmp_edges:
+        if count <= 0 or dst == entry:
+            continue
+        src_chain, dst_chain = chain_of[src], chain_of[dst]
+        if src_chain is dst_chain or src_chain[-1] != src or dst_chain[0] != dst:
+            continue
+        src_chain.extend(dst_chain)
+        for label in dst_chain:
+            chain_of[label] = src_chain
+
+    chains = []
+    for block in blocks:
+        chain = chain_of[block[0]["label"]]
+        if chain[0] == block[0]["label"]:
+            chains.append(chain)
+    return chains
+
+def order_chains(chains, entry, block_counts):
+    """Places the entry chain first, then the rest by how often their head runs."""
+    first = [chain for chain in chains if chain[0] == entry]
+    rest = [chain for chain in chains if chain[0] != entry]
+    rest.sort(key=lambda chain: -block_counts.get(chain[0], 0))
+    return first + rest
+
+def layout_function(func, profile):
+    """Reorders the function's blocks so hot jmp targets become fallthroughs."""
+    blocks = form_explicit_blocks(func["instrs"])
+    edge_counts = {(src, dst): count for src, dst, count in profile["edges"]}
+    entry = blocks[0][0]["label"]
+    chains = order_chains(form_chains(blocks, edge_counts), entry, profile["blocks"])
+    by_label = {block[0]["label"]: block for block in blocks}
+    func["instrs"] = flatten_blocks([by_label[label] for chain in chains for label in chain])
+
+def layout_program(program, profile):
+    for func in program["functions"]:
+        if func["name"] in profile:
+            layout_function(func, profile[func["name"]])
+    return program
+
+def main():
+    binary = parse_binary_flag(sys.argv)
+    if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help"):
+        print("Usage: python block_layout.py <profile_json> < prog.json")
+        sys.exit(1)
+
+    with open(sys.argv[1], "r") as f:
+        profile = json.load(f)
+
+    program = read_program(sys.stdin)
+    program = layout_program(program, profile)
+    write_program(program, sys.stdout, binary, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+import json
+import re
+import struct
+
+from bril_ir import OP_NAMES
+
+# Layout:
+#   MAGIC, u64 offset of the trailer
+#   function records, back to back
+#   trailer: string table, function index (name, offset), top-level extras
+# Every integer is a LEB128 varint; strings are ids into the string table.
+MAGIC = b"BRILB\x01"
+TRAILER = struct.Struct("<Q")
+DOUBLE = struct.Struct("<d")
+
+LABEL = 0
+OPCODES = {name: i for i, name in enumerate(OP_NAMES) if name not in ("label", "unknown")}
+UNKNOWN_OP = len(OP_NAMES)          # followed by the op's string id
+CODE_NAMES = {code: name for name, code in OPCODES.items()}
+
+# Flag bits saying which keys an instruction has.
+F_DEST, F_TYPE, F_ARGS, F_FUNCS, F_LABELS, F_VALUE, F_EXTRA = (1 << i for i in range(7))
+INSTR_KEYS = {"op", "dest", "type", "args", "funcs", "labels", "value"}
+NAME_LISTS = ((F_ARGS, "args"), (F_FUNCS, "funcs"), (F_LABELS, "labels"))
+
+# Value tags
+V_INT, V_FALSE, V_TRUE, V_FLOAT, V_STR, V_NULL, V_JSON = range(7)
+
+LEADING_SPACE = re.compile(rb"\s*")
+
+def is_binary(data):
+    return data[:len(MAGIC)] == MAGIC
+
+class Encoder:
+    def __init__(self):
+        self.out = bytearray(MAGIC + TRAILER.pack(0))
+        self.strings = []
+        self.string_ids = {}
+        self.index = []
+
+    def string(self, s):
+        sid = self.string_ids.get(s)
+        if sid is None:
+            sid = self.string_ids[s] = len(self.strings)
+            self.strings.append(s)
+        return sid
+
+    def uint(self, n, out=None):
+        out = self.out if out is None else out
+        while n >= 0x80:
+            out.append((n & 0x7F) | 0x80)
+            n >>= 7
+        out.append(n)
+
+    def type(self, typ):
+        # Plain types are string ids; parameterized ones ({"ptr": ...}) their JSON.
+        if isinstance(typ, str):
+            self.uint(self.string(typ) << 1)
+        else:
+            self.uint(self.string(json.dumps(typ, separators=(",", ":"))) << 1 | 1)
+
+    def names(self, names):
+        out, string = self.out, self.string
+        count = len(names)
+        if count < 0x80:
+            out.append(count)
+        else:
+            self.uint(count)
+        for name in names:
+            sid = string(name)
+            if sid < 0x80:
+                out.append(sid)
+            else:
+                self.uint(sid)
+
+    def value(self, value):
+        out = self.out
+        if value is True:
+            out.append(V_TRUE)
+        elif value is False:
+            out.append(V_FALSE)
+        elif value is None:
+            out.append(V_NULL)
+        elif isinstance(value, int):
+            out.append(V_INT)
+            self.uint(value << 1 if value >= 0 else (-value << 1) - 1)
+        elif isinstance(value, float):
+            out.append(V_FLOAT)
+            out += DOUBLE.pack(value)
+        elif isinstance(value, str):
+            out.append(V_STR)
+            self.uint(self.string(value))
+        else:
+            out.append(V_JSON)
+            self.uint(self.string(json.dumps(value, separators=(",", ":"))))
+
+    def instr(self, instr):
+        if "label" in instr:
+            self.out.append(LABEL)
+            self.uint(self.string(instr["label"]))
+            extra = {k: v for k, v in instr.items() if k != "label"}
+            self.uint(self.string(json.dumps(extra, separators=(",", ":"))) + 1 if extra else 0)
+            return
+        op = instr.get("op")
+        code = OPCODES.get(op)
+        if code is None:
+            self.uint(UNKNOWN_OP)
+            self.uint(self.string(json.dumps(op)))
+        else:
+            self.uint(code)
+        extra = {k: v for k, v in instr.items() if k not in INSTR_KEYS}
+        flags = ((F_DEST if "dest" in instr else 0) | (F_TYPE if "type" in instr else 0) |
+                 (F_ARGS if "args" in instr else 0) | (F_FUNCS if "funcs" in instr else 0) |
+                 (F_LABELS if "labels" in instr else 0) | (F_VALUE if "value" in instr else 0) |
+                 (F_EXTRA if extra else 0))
+        self.out.append(flags)
+        if flags & F_DEST:
+            sid = self.string(instr["dest"])
+            if sid < 0x80:
+                self.out.append(sid)
+            else:
+                self.uint(sid)
+        if flags & F_TYPE:
+            self.type(instr["type"])
+        if flags & F_ARGS:
+            self.names(instr["args"])
+        if flags & F_FUNCS:
+            self.names(instr["funcs"])
+        if flags & F_LABELS:
+            self.names(instr["labels"])
+        if flags & F_VALUE:
+            self.value(instr["value"])
+        if flags & F_EXTRA:
+            self.uint(self.string(json.dumps(extra, separators=(",", ":"))))
+
+    def function(self, func):
+        self.index.append((self.string(func["name"]), len(self.out)))
+        args = func.get("args")
+        if args is None:
+            self.uint(0)
+        else:
+            self.uint(len(args) + 1)
+            for arg in args:
+                self.uint(self.string(arg["name"]))
+                self.type(arg["type"])
+        if "type" in func:
+            self.out.append(1)
+            self.type(func["type"])
+        else:
+            self.out.append(0)
+        extra = {k: v for k, v in func.items() if k not in ("name", "args", "type", "instrs")}
+        self.uint(self.string(json.dumps(extra, separators=(",", ":"))) + 1 if extra else 0)
+        self.uint(len(func["instrs"]))
+        for instr in func["instrs"]:
+            self.instr(instr)
+
+    def finish(self, extra=None):
+        trailer = bytearray()
+        self.uint(len(self.strings), trailer)
+        for s in self.strings:
+            raw = s.encode()
+            self.uint(len(raw), trailer)
+            trailer += raw
+        self.uint(len(self.index), trailer)
+        for name, offset in self.index:
+            self.uint(name, trailer)
+            self.uint(offset, trailer)
+        raw = json.dumps(extra or {}, separators=(",", ":")).encode()
+        self.uint(len(raw), trailer)
+        trailer += raw
+        self.out[len(MAGIC):len(MAGIC) + TRAILER.size] = TRAILER.pack(len(self.out))
+        return bytes(self.out + trailer)
+
+def encode_program(program):
+    enc = Encoder()
+    for func in program["functions"]:
+        enc.function(func)
+    return enc.finish({k: v for k, v in program.items() if k != "functions"})
+
+def read_uint(data, pos):
+    n = data[pos]
+    pos += 1
+    if n < 0x80:
+        return n, pos
+    n &= 0x7F
+    shift = 7
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+class BinaryProgram:
+    """
+    Decoder over an encoded program (bytes or an mmap). The string table and
+    function index are read up front; `function(i)` decodes one function on
+    demand from its recorded offset.
+    """
+    def __init__(self, data):
+        if not is_binary(data):
+            raise ValueError("not a binary Bril program")
+        self.data = data
+        (pos,) = TRAILER.unpack_from(data, len(MAGIC))
+        count, pos = read_uint(data, pos)
+        strings = []
+        for _ in range(count):
+            size, pos = read_uint(data, pos)
+            strings.append(bytes(data[pos:pos + size]).decode())
+            pos += size
+        self.strings = strings
+        self.types = {}
+        count, pos = read_uint(data, pos)
+        self.names = []
+        self.offsets = []
+        for _ in range(count):
+            name, pos = read_uint(data, pos)
+            offset, pos = read_uint(data, pos)
+            self.names.append(strings[name])
+            self.offsets.append(offset)
+        size, pos = read_uint(data, pos)
+        self.extra = json.loads(bytes(data[pos:pos + size]))
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def type(self, code):
+        if not code & 1:
+            return self.strings[code >> 1]
+        typ = self.types.get(code)
+        if typ is None:
+            typ = self.types[code] = json.loads(self.strings[code >> 1])
+        return typ
+
+    def function(self, i):
+        data, strings = self.data, self.strings
+        pos = self.offsets[i]
+        func = {"name": self.names[i]}
+        count, pos = read_uint(data, pos)
+        if count:
+            args = []
+            for _ in range(count - 1):
+                arg, pos = read_uint(data, pos)
+                typ, pos = read_uint(data, pos)
+                args.append({"name": strings[arg], "type": self.type(typ)})
+            func["args"] = args
+        has_type = data[pos]
+        pos += 1
+        if has_type:
+            typ, pos = read_uint(data, pos)
+            func["type"] = self.type(typ)
+        extra, pos = read_uint(data, pos)
+        count, pos = read_uint(data, pos)
+        func["instrs"] = self.instrs(pos, count)
+        if extra:
+            func.update(json.loads(strings[extra - 1]))
+        return func
+
+    def instrs(self, pos, count):
+        """Decodes `count` instructions. Single-byte varints, by far the common case, are read inline."""
+        data, strings, type_of = self.data, self.strings, self.type
+        instrs = []
+        append = instrs.append
+        for _ in range(count):
+            code = data[pos]
+            pos += 1
+            if code == LABEL:
+                n, pos = read_uint(data, pos)
+                instr = {"label": strings[n]}
+                n, pos = read_uint(data, pos)
+                if n:
+                    instr.update(json.loads(strings[n - 1]))
+                append(instr)
+                continue
+            if code == UNKNOWN_OP:
+                n, pos = read_uint(data, pos)
+                op = json.loads(strings[n])
+                instr = {} if op is None else {"op": op}
+            else:
+                instr = {"op": CODE_NAMES[code]}
+            flags = data[pos]
+            pos += 1
+            if flags & F_DEST:
+                n = data[pos]
+                pos += 1
+                if n >= 0x80:
+                    n, pos = read_uint(data, pos - 1)
+                instr["dest"] = strings[n]
+            if flags & F_TYPE:
+                n = data[pos]
+                pos += 1
+                if n >= 0x80:
+                    n, pos = read_uint(data, pos - 1)
+                instr["type"] = strings[n >> 1] if not n & 1 else type_of(n)
+            for flag, key in NAME_LISTS:
+                if flags & flag:
+                    count = data[pos]
+                    pos += 1
+                    if count >= 0x80:
+                        count, pos = read_uint(data, pos - 1)
+                    names = []
+                    for _ in range(count):
+                        n = data[pos]
+                        pos += 1
+                        if n >= 0x80:
+                            n, pos = read_uint(data, pos - 1)
+                        names.append(strings[n])
+                    instr[key] = names
+            if flags & F_VALUE:
+                tag = data[pos]
+                pos += 1
+                if tag == V_INT:
+                    n, pos = read_uint(data, pos)
+                    instr["value"] = -((n + 1) >> 1) if n & 1 else n >> 1
+                elif tag == V_TRUE:
+                    instr["value"] = True
+                elif tag == V_FALSE:
+                    instr["value"] = False
+                elif tag == V_FLOAT:
+                    instr["value"] = DOUBLE.unpack_from(data, pos)[0]
+                    pos += DOUBLE.size
+                elif tag == V_STR:
+                    n, pos = read_uint(data, pos)
+                    instr["value"] = strings[n]
+                elif tag == V_NULL:
+                    instr["value"] = None
+                else:
+                    n, pos = read_uint(data, pos)
+                    instr["value"] = json.loads(strings[n])
+            if flags & F_EXTRA:
+                n, pos = read_uint(data, pos)
+                instr.update(json.loads(strings[n]))
+            append(instr)
+        return instrs
+
+    def functions(self):
+        for i in range(len(self)):
+            yield self.function(i)
+
+    def program(self):
+        program = {"functions": list(self.functions())}
+        program.update(self.extra)
+        return program
+
+def decode_program(data):
+    return BinaryProgram(data).program()
+
+def read_program(stream):
+    """
+    Reads a program in any of the formats the tools accept: binary (detected
+    by its magic bytes), JSON, or Bril text, parsed in-process.
+    """
+    data = getattr(stream, "buffer", stream).read()
+    if is_binary(data):
+        return decode_program(data)
+    start = LEADING_SPACE.match(data).end()
+    if data[start:start + 1] == b"{":
+        return json.loads(data)
+    from bril_text import parse_program
+    return parse_program(data.decode())
+
+def write_program(program, stream, binary=False, **json_options):
+    """Writes `program` as binary, or as JSON with the caller's usual json.dump options."""
+    if binary:
+        out = getattr(stream, "buffer", stream)
+        out.write(encode_program(program))
+        out.flush()
+    else:
+        json.dump(program, stream, **json_options)
+        stream.write("\n")
+
+def parse_binary_flag(argv):
+    """Removes `--binary` from argv in place; True if it was there."""
+    if "--binary" in argv:
+        argv.remove("--binary")
+        return True
+    return False
@@ -1,4 +1,3 @@
-import json
 import sys
 from collections import defaultdict
 
@@ -47,15 +46,107 @@ def build_cfg(blocks):
 
     return cfg
 
+def index_cfg(blocks, build=build_cfg):
+    """
+    The block-index CFG the analyses take: {i: {"succs": [...], "preds": [...]}}
+    with an entry for every block. `build` makes the successor map; pass
+    bril_ir.build_cfg for IR blocks.
+    """
+    succ_map = build(blocks)
+    cfg = {i: {"succs": list(succ_map.get(i, [])), "preds": []} for i in range(len(blocks))}
+    for b, succs in succ_map.items():
+        for s in succs:
+            cfg[s]["preds"].append(b)
+    return cfg
+
+TERMINATORS = {"jmp", "br", "ret"}
+
+def share_program(program):
+    """
+    A copy of program whose functions are new dicts sharing the original's
+    instruction lists and instruction dicts. It is safe to hand to passes that
+    copy on write, replacing func["instrs"] and the instructions they change
+    rather than editing them in place; variants made this way cost memory only
+    for what differs.
+    """
+    shared = dict(program)
+    shared["functions"] = [dict(func) for func in program.get("functions", [])]
+    return shared
+
+def fresh_label(base, taken):
+    """Returns a label derived from `base` that is not in `taken`, and reserves it."""
+    label = base
+    n = 1
+    while label in taken:
+        label = f"{base}.{n}"
+        n += 1
+    taken.add(label)
+    return label
+
+def form_explicit_blocks(instrs):
+    """
+    Splits instructions into blocks that each start with a label and end with a
+    jmp, br or ret, making every fallthrough an explicit jmp.
+    """
+    taken = {instr["label"] for instr in instrs if "label" in instr}
+    blocks = []
+    current_block = None
+
+    for instr in instrs:
+        if "label" in instr:
+            if current_block is not None:
+                blocks.append(current_block)
+            current_block = [instr]
+            continue
+        if current_block is None:
+            current_block = [{"label": fresh_label(f"blk{len(blocks)}", taken)}]
+        current_block.append(instr)
+        if instr.get("op") in TERMINATORS:
+            blocks.append(current_block)
+            current_block = None
+
+    if current_block is not None:
+        blocks.append(current_block)
+    if not blocks:
+        blocks.append([{"label": fresh_label("blk0", taken)}])
+
+    for i, block in enumerate(blocks):
+        if block[-1].get("op") not in TERMINATORS:
+            if i + 1 < len(blocks):
+                block.append({"op": "jmp", "labels": [blocks[i + 1][0]["label"]]})
+            else:
+                block.append({"op": "ret"})
+    return blocks
+
+def flatten_blocks(blocks):
+    """
+    Linearizes explicit blocks back into an instruction list, dropping jumps to
+    the next block, a trailing bare ret and labels that nothing jumps to.
+    """
+    targets = {label for block in blocks for label in block[-1].get("labels", [])}
+    instrs = []
+    for i, block in enumerate(blocks):
+        label = block[0]["label"]
+        if label in targets:
+            instrs.append(block[0])
+        instrs.extend(block[1:-1])
+        term = block[-1]
+        next_label = blocks[i + 1][0]["label"] if i + 1 < len(blocks) else None
+        if term.get("op") == "jmp" and term["labels"][0] == next_label:
+            continue
+        if term.get("op") == "ret" and not term.get("args") and next_label is None:
+            continue
+        instrs.append(term)
+    return instrs
+
 def main():
+    from bril_index import load_functions, parse_function_flags
+    only = parse_function_flags(sys.argv)
     if len(sys.argv) < 2:
-        print("Usage: python bril_cfg.py <bril_json_file>")
+        print("Usage: python bril_cfg.py <bril_json_file> [--function <name>]...")
         sys.exit(1)
 
-    with open(sys.argv[1], "r") as f:
-        bril_program = json.load(f)
-
-    for function in bril_program.get("functions", []):
+    for function in load_functions(sys.argv[1], only):
         print(f"\nFunction: {function['name']}")
 
         # Form basic blocks
@@ -0,0 +1,151 @@
+import io
+import json
+import mmap
+import os
+import sys
+
+from bril_binary import BinaryProgram, is_binary
+from bril_stream import ProgramReader
+
+def index_path(path):
+    return path + ".idx"
+
+def build_json_index(path):
+    """
+    Scans a JSON program once and records the byte span of every function.
+    Decoding as latin-1 keeps character offsets equal to byte offsets; the
+    spans are later decoded from the original UTF-8 bytes. newline="" keeps
+    CRLF line endings from being collapsed, which would shift the offsets.
+    """
+    st = os.stat(path)
+    spans = []
+    with open(path, "rb") as f:
+        reader = ProgramReader(io.TextIOWrapper(f, encoding="latin-1", newline=""))
+        for func in reader:
+            spans.append([func["name"], reader.value_start, reader.offset()])
+    index = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "functions": spans, "extra": reader.extra}
+    try:
+        with open(index_path(path), "w") as f:
+            json.dump(index, f)
+    except OSError:
+        pass  # read-only location: keep the index in memory only
+    return index
+
+def load_json_index(path):
+    """Returns the sidecar index if it still matches the program file, else rebuilds it."""
+    st = os.stat(path)
+    try:
+        with open(index_path(path), "r") as f:
+            index = json.load(f)
+        if index["size"] == st.st_size and index["mtime_ns"] == st.st_mtime_ns:
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+    return build_json_index(path)
+
+class ProgramIndex:
+    """
+    A program file opened for function-level access. The file is mmapped and
+    a function is decoded only when asked for, so looking at one function
+    costs about that function's size, and forked workers share the pages.
+    Binary files carry their own offsets; JSON files get a sidecar `.idx`.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.cache = {}
+        if is_binary(self.map):
+            self.binary = BinaryProgram(self.map)
+            self.names = self.binary.names
+            self.extra = self.binary.extra
+            self.spans = None
+        else:
+            index = load_json_index(path)
+            self.binary = None
+            self.names = [name for name, _, _ in index["functions"]]
+            self.spans = [(start, end) for _, start, end in index["functions"]]
+            self.extra = index["extra"]
+        self.position = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.position
+
+    def function(self, name):
+        if name not in self.cache:
+            i = self.position[name]
+            if self.binary is not None:
+                self.cache[name] = self.binary.function(i)
+            else:
+                start, end = self.spans[i]
+                self.cache[name] = json.loads(self.map[start:end])
+        return self.cache[name]
+
+    def functions(self, names=None):
+        for name in (self.names if names is None else names):
+            yield self.function(name)
+
+    def program(self):
+        program = {"functions": list(self.functions())}
+        program.update(self.extra)
+        return program
+
+    def close(self):
+        self.cache.clear()
+        self.binary = None
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def load_functions(path, names=None):
+    """
+    The functions of the program at `path`, or only those in `names`. With
+    names, JSON and binary files are read through a ProgramIndex; Bril text
+    has no offsets to index, so it is parsed whole and filtered.
+    """
+    from bril_binary import read_program
+    if names:
+        with open(path, "rb") as f:
+            head = f.read(64).lstrip()
+        if is_binary(head) or head[:1] == b"{":
+            with ProgramIndex(path) as index:
+                missing = [name for name in names if name not in index]
+                if missing:
+                    raise KeyError(f"no function named {', '.join(missing)}")
+                return list(index.functions(names))
+    with open(path, "rb") as f:
+        functions = read_program(f)["functions"]
+    return [func for func in functions if not names or func["name"] in names]
+
+def parse_function_flags(argv):
+    """Removes every `--function NAME` from argv in place and returns the names."""
+    names = []
+    while "--function" in argv:
+        i = argv.index("--function")
+        names.append(argv[i + 1])
+        del argv[i:i + 2]
+    return names
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help"):
+        print("Usage: python bril_index.py <program_file> [function ...]")
+        sys.exit(1)
+
+    with ProgramIndex(sys.argv[1]) as index:
+        if len(sys.argv) == 2:
+            for name in index.names:
+                print(name)
+        else:
+            for name in sys.argv[2:]:
+                print(json.dumps(index.function(name), indent=2))
+
+if __name__ == "__main__":
+    main()
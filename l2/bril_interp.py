@@ -0,0 +1,383 @@
+import json
+import math
+import sys
+from collections import defaultdict
+from bril_cfg import form_explicit_blocks
+from bril_binary import read_program
+
+INT_MIN = -(1 << 63)
+INT_MAX = (1 << 63) - 1
+
+class BrilError(Exception):
+    pass
+
+class OutOfFuel(BrilError):
+    """The program ran past its instruction budget, most likely an infinite loop."""
+
+def wrap_int(value):
+    """Wraps an integer to 64-bit two's complement, like brili's BigInt.asIntN(64, ...)."""
+    return ((value - INT_MIN) & 0xFFFFFFFFFFFFFFFF) + INT_MIN
+
+def int_div(a, b):
+    if b == 0:
+        raise BrilError("division by zero")
+    q = abs(a) // abs(b)
+    return wrap_int(q if (a < 0) == (b < 0) else -q)
+
+def float_div(a, b):
+    if b == 0:
+        if a == 0 or math.isnan(a):
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+def format_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        if value != value:
+            return "NaN"
+        if value in (float("inf"), float("-inf")):
+            return "Infinity" if value > 0 else "-Infinity"
+        return "%.17f" % value
+    if isinstance(value, Pointer):
+        return f"ptr<{value.offset}>"
+    return str(value)
+
+class Pointer:
+    __slots__ = ("buf", "offset")
+
+    def __init__(self, buf, offset):
+        self.buf = buf
+        self.offset = offset
+
+    def load(self):
+        if not 0 <= self.offset < len(self.buf) or self.buf[self.offset] is None:
+            raise BrilError("load from uninitialized, freed or out-of-bounds memory")
+        return self.buf[self.offset]
+
+    def store(self, value):
+        if not 0 <= self.offset < len(self.buf):
+            raise BrilError("store to out-of-bounds memory")
+        self.buf[self.offset] = value
+
+# Expressions for value operations, over the already-loaded operands a and b.
+WRAPPED_OPS = {"add": "{a} + {b}", "sub": "{a} - {b}", "mul": "{a} * {b}"}
+VALUE_OPS = {
+    "div": "_int_div({a}, {b})",
+    "eq": "{a} == {b}", "lt": "{a} < {b}", "gt": "{a} > {b}",
+    "le": "{a} <= {b}", "ge": "{a} >= {b}",
+    "and": "{a} and {b}", "or": "{a} or {b}", "not": "not {a}",
+    "id": "{a}",
+    "fadd": "{a} + {b}", "fsub": "{a} - {b}", "fmul": "{a} * {b}",
+    "fdiv": "_float_div({a}, {b})",
+    "feq": "{a} == {b}", "flt": "{a} < {b}", "fgt": "{a} > {b}",
+    "fle": "{a} <= {b}", "fge": "{a} >= {b}",
+    "ceq": "{a} == {b}", "clt": "{a} < {b}", "cgt": "{a} > {b}",
+    "cle": "{a} <= {b}", "cge": "{a} >= {b}",
+    "char2int": "ord({a})", "int2char": "chr({a})",
+    "ptradd": "_Pointer({a}.buf, {a}.offset + {b})",
+    "load": "{a}.load()",
+    "alloc": "_alloc({a})",
+}
+
+# Operations whose result may itself be undefined.
+MAYBE_UNDEFINED = {"undef", "get", "call"}
+
+def literal(instr):
+    value = instr["value"]
+    typ = instr.get("type")
+    if typ == "float":
+        return repr(float(value))
+    if typ == "bool":
+        return repr(bool(value))
+    return repr(value)
+
+class CompiledFunction:
+    """A function lowered to one Python closure per block over integer variable slots."""
+    def __init__(self, func, index_of, runtime):
+        self.name = func["name"]
+        self.blocks = form_explicit_blocks(func["instrs"])
+        self.labels = [block[0]["label"] for block in self.blocks]
+        original = {id(instr) for instr in func["instrs"]}
+
+        self.slots = {}
+        for arg in func.get("args", []):
+            self.slot(arg["name"])
+        self.num_args = len(self.slots)
+        for block in self.blocks:
+            for instr in block:
+                for var in instr.get("args", []):
+                    self.slot(var)
+                if "dest" in instr:
+                    self.slot(instr["dest"])
+        self.num_vars = len(self.slots)
+        # set/get keep a shadow copy of each variable after the regular slots,
+        # and the last slot holds the return value.
+        self.frame_size = 2 * self.num_vars + 1
+
+        block_index = {label: i for i, label in enumerate(self.labels)}
+        assigned = self.assigned_on_entry(func, block_index)
+        self.sizes = []
+        self.code = []
+        for block, defined in zip(self.blocks, assigned):
+            self.sizes.append(sum(1 for instr in block[1:] if id(instr) in original))
+            self.code.append(self.compile_block(block, defined, block_index, index_of, runtime))
+
+    def slot(self, var):
+        if var not in self.slots:
+            self.slots[var] = len(self.slots)
+        return self.slots[var]
+
+    def assigned_on_entry(self, func, block_index):
+        """
+        For each block, the variables every path from the entry has assigned a
+        value, so reading them cannot fail. Unreachable blocks get the empty set.
+        """
+        succs = [[block_index[label] for label in block[-1].get("labels", [])] for block in self.blocks]
+        assigned = [None] * len(self.blocks)
+        assigned[0] = frozenset(arg["name"] for arg in func.get("args", []))
+        worklist = [0]
+        while worklist:
+            b = worklist.pop()
+            out = set(assigned[b])
+            for instr in self.blocks[b][1:]:
+                if "dest" in instr:
+                    if instr.get("op") in MAYBE_UNDEFINED:
+                        out.discard(instr["dest"])
+                    else:
+                        out.add(instr["dest"])
+            for s in succs[b]:
+                new = out if assigned[s] is None else assigned[s] & out
+                if new != assigned[s]:
+                    assigned[s] = frozenset(new)
+                    worklist.append(s)
+        return [defined or frozenset() for defined in assigned]
+
+    def compile_block(self, block, defined, block_index, index_of, runtime):
+        # Slots start out as None, and reading one no path has assigned is an
+        # error, as in brili. A variable not in `defined` is checked where the
+        # block first reads it, unless the block has assigned it by then.
+        lines = []
+        checked = set(defined)
+        for instr in block[1:]:
+            for var in instr.get("args", []):
+                if var not in checked:
+                    checked.add(var)
+                    lines.append(f"if r[{self.slots[var]}] is None: _undefined({var!r})")
+            lines.extend(self.compile_instr(instr, block_index, index_of))
+            if "dest" in instr:
+                if instr.get("op") in MAYBE_UNDEFINED:
+                    checked.discard(instr["dest"])
+                else:
+                    checked.add(instr["dest"])
+        if not lines or not lines[-1].startswith("return"):
+            lines.append("return -1")
+        src = "def _block(r):\n" + "".join(f"    {line}\n" for line in lines)
+        exec(compile(src, f"<bril {self.name}>", "exec"), runtime)
+        return runtime.pop("_block")
+
+    def compile_instr(self, instr, block_index, index_of):
+        op = instr.get("op")
+        args = [f"r[{self.slots[a]}]" for a in instr.get("args", [])]
+        dest = f"r[{self.slots[instr['dest']]}]" if "dest" in instr else None
+        a = args[0] if args else None
+        b = args[1] if len(args) > 1 else None
+
+        if op == "const":
+            return [f"{dest} = {literal(instr)}"]
+        if op in WRAPPED_OPS:
+            return [f"t = {WRAPPED_OPS[op].format(a=a, b=b)}",
+                    f"{dest} = t if {INT_MIN} <= t <= {INT_MAX} else _wrap_int(t)"]
+        if op in VALUE_OPS:
+            return [f"{dest} = {VALUE_OPS[op].format(a=a, b=b)}"]
+        if op == "print":
+            return [f"_print({', '.join(args)})"]
+        if op == "jmp":
+            return [f"return {block_index[instr['labels'][0]]}"]
+        if op == "br":
+            t, f = (block_index[label] for label in instr["labels"])
+            return [f"return {t} if {a} else {f}"]
+        if op == "ret":
+            return ([f"r[-1] = {a}"] if a else []) + ["return -1"]
+        if op == "call":
+            call = f"_call({index_of[instr['funcs'][0]]}, ({''.join(x + ', ' for x in args)}))"
+            return [f"{dest} = {call}" if dest else call]
+        if op == "store":
+            return [f"{a}.store({b})"]
+        if op == "free":
+            return [f"_free({a})"]
+        if op == "nop":
+            return []
+        if op == "undef":
+            return [f"{dest} = None"]
+        if op == "set":
+            return [f"r[{self.num_vars + self.slots[instr['args'][0]]}] = {b}"]
+        if op == "get":
+            return [f"{dest} = r[{self.num_vars + self.slots[instr['dest']]}]"]
+        raise BrilError(f"unsupported operation {op!r}")
+
+def undefined(var):
+    raise BrilError(f"undefined variable {var}")
+
+RUNTIME = {
+    "_undefined": undefined,
+    "_wrap_int": wrap_int,
+    "_int_div": int_div,
+    "_float_div": float_div,
+    "_Pointer": Pointer,
+}
+
+class Interpreter:
+    """
+    Runs a Bril JSON program in-process. `total_dyn_inst` matches `brili -p`;
+    with `profile=True` block and edge counts are recorded per function, and
+    with `fuel` a run raises OutOfFuel once it executes more instructions.
+    """
+    def __init__(self, program, profile=False, fuel=None):
+        self.functions = program["functions"]
+        self.index_of = {func["name"]: i for i, func in enumerate(self.functions)}
+        runtime = dict(RUNTIME, _call=self.call, _print=self.print, _alloc=self.alloc, _free=self.free)
+        self.compiled = [CompiledFunction(func, self.index_of, runtime) for func in self.functions]
+        self.profiling = profile
+        self.fuel = fuel
+        self.block_counts = [[0] * len(f.code) for f in self.compiled]
+        self.edge_counts = [defaultdict(int) for _ in self.compiled]
+        self.call_counts = [0] * len(self.compiled)
+        self.total_dyn_inst = 0
+        self.live_allocs = 0
+        self.out = sys.stdout
+
+    def print(self, *values):
+        self.out.write(" ".join(format_value(v) for v in values) + "\n")
+
+    def alloc(self, size):
+        if size <= 0:
+            raise BrilError("must allocate a positive amount of memory")
+        self.live_allocs += 1
+        return Pointer([None] * size, 0)
+
+    def free(self, ptr):
+        if ptr.offset != 0 or not ptr.buf:
+            raise BrilError("freeing a pointer that is not the start of a live allocation")
+        # An emptied buffer makes later loads, stores and frees through it fail.
+        ptr.buf.clear()
+        self.live_allocs -= 1
+
+    def call(self, index, args):
+        func = self.compiled[index]
+        r = [None] * func.frame_size
+        r[:func.num_args] = args
+        code = func.code
+        sizes = func.sizes
+        b = 0
+        n = 0
+        fuel = self.fuel
+        if self.profiling:
+            counts = self.block_counts[index]
+            edges = self.edge_counts[index]
+            self.call_counts[index] += 1
+            while b >= 0:
+                n += sizes[b]
+                if fuel is not None and n > fuel - self.total_dyn_inst:
+                    raise OutOfFuel(f"more than {fuel} instructions executed")
+                counts[b] += 1
+                nb = code[b](r)
+                edges[(b, nb)] += 1
+                b = nb
+        elif fuel is not None:
+            limit = fuel - self.total_dyn_inst
+            while b >= 0:
+                n += sizes[b]
+                if n > limit:
+                    # Callees add their counts to total_dyn_inst as they return,
+                    # so the budget left at entry may since have shrunk.
+                    limit = fuel - self.total_dyn_inst
+                    if n > limit:
+                        raise OutOfFuel(f"more than {fuel} instructions executed")
+                b = code[b](r)
+        else:
+            while b >= 0:
+                n += sizes[b]
+                b = code[b](r)
+        self.total_dyn_inst += n
+        return r[-1]
+
+    def run(self, args=(), out=None):
+        """Runs main with command-line style arguments and returns total_dyn_inst."""
+        self.out = out or sys.stdout
+        main = self.index_of["main"]
+        params = self.functions[main].get("args", [])
+        if len(args) != len(params):
+            raise BrilError(f"main expects {len(params)} arguments, got {len(args)}")
+        values = [parse_arg(value, param["type"]) for value, param in zip(args, params)]
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 100000))
+        try:
+            self.call(main, values)
+        finally:
+            sys.setrecursionlimit(limit)
+        if self.live_allocs:
+            raise BrilError("some memory locations have not been freed by end of execution")
+        return self.total_dyn_inst
+
+    def profile(self):
+        """Block and edge frequencies in the format written by `edge_profile.py read`."""
+        profile = {}
+        for i, func in enumerate(self.compiled):
+            labels = func.labels
+            profile[func.name] = {
+                "blocks": {label: self.block_counts[i][b] for b, label in enumerate(labels)},
+                "edges": [[labels[src], labels[dst] if dst >= 0 else None, count]
+                          for (src, dst), count in sorted(self.edge_counts[i].items())],
+                "calls": self.call_counts[i],
+            }
+        return profile
+
+def parse_arg(value, typ):
+    if typ == "int":
+        return int(value)
+    if typ == "bool":
+        return value == "true"
+    if typ == "float":
+        return float(value)
+    if typ == "char":
+        return value
+    raise BrilError(f"unsupported argument type {typ!r}")
+
+def main():
+    argv = sys.argv[1:]
+    if argv[:1] == ["--help"] or not argv:
+        print("Usage: python bril_interp.py [-p] [--profile <out_json>] <bril_json_file|-> [args...]")
+        sys.exit(1)
+
+    report = False
+    profile_file = None
+    while argv and argv[0].startswith("-") and argv[0] != "-":
+        flag = argv.pop(0)
+        if flag == "-p":
+            report = True
+        elif flag == "--profile":
+            profile_file = argv.pop(0)
+
+    if argv[0] == "-":
+        program = read_program(sys.stdin)
+    else:
+        with open(argv[0], "r") as f:
+            program = read_program(f)
+
+    interp = Interpreter(program, profile=profile_file is not None)
+    try:
+        total = interp.run(argv[1:])
+    except BrilError as e:
+        sys.stdout.flush()
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(2)
+    if report:
+        print(f"total_dyn_inst: {total}", file=sys.stderr)
+    if profile_file:
+        with open(profile_file, "w") as f:
+            json.dump(interp.profile(), f, indent=2)
+
+if __name__ == "__main__":
+    main()
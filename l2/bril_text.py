@@ -0,0 +1,252 @@
+import json
+import re
+import sys
+
+# One regex pass splits the whole file into token strings; a token's first
+# character tells its kind. The final \S catches anything else as an error.
+TOKEN = re.compile(r"""
+    \#[^\n]*
+  | '(?:\\.|[^'\\])'
+  | "[^"]*"
+  | [-+]?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?(?![\w.%])
+  | [@.]?[\w%][\w.%]*
+  | [{}():;=,<>]
+  | \S
+""", re.VERBOSE)
+
+ESCAPES = {"n": "\n", "t": "\t", "0": "\0", "\\": "\\", "'": "'", "r": "\r", "a": "\a", "b": "\b", "f": "\f", "v": "\v"}
+
+UNESCAPES = {v: k for k, v in ESCAPES.items()}
+
+class BrilSyntaxError(ValueError):
+    pass
+
+def tokenize(text):
+    tokens = [tok for tok in TOKEN.findall(text) if tok[0] != "#"]
+    tokens.append("")
+    return tokens
+
+class Parser:
+    """Recursive descent over the token list, producing Bril JSON (what bril2json emits)."""
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def next(self):
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
+    def expect(self, value):
+        tok = self.next()
+        if tok != value:
+            raise BrilSyntaxError(f"expected {value!r}, found {tok or 'end of input'!r}")
+        return tok
+
+    def program(self):
+        functions = []
+        imports = []
+        while self.peek() != "":
+            if self.peek() == "from":
+                imports.append(self.import_())
+            else:
+                functions.append(self.function())
+        program = {"functions": functions}
+        if imports:
+            program["imports"] = imports
+        return program
+
+    def import_(self):
+        self.expect("from")
+        path = self.next()
+        self.expect("import")
+        funcs = []
+        while self.peek() != ";":
+            name = {"name": self.next()[1:]}
+            if self.peek() == "as":
+                self.next()
+                name["alias"] = self.next()[1:]
+            funcs.append(name)
+            if self.peek() == ",":
+                self.next()
+        self.expect(";")
+        return {"path": json.loads(path), "functions": funcs}
+
+    def type(self):
+        name = self.next()
+        if self.peek() == "<":
+            self.next()
+            param = self.type()
+            self.expect(">")
+            return {name: param}
+        return name
+
+    def function(self):
+        name = self.next()
+        if name[:1] != "@":
+            raise BrilSyntaxError(f"expected a function, found {name or 'end of input'!r}")
+        func = {"name": name[1:]}
+        if self.peek() == "(":
+            self.next()
+            args = []
+            while self.peek() != ")":
+                arg = self.next()
+                self.expect(":")
+                args.append({"name": arg, "type": self.type()})
+                if self.peek() == ",":
+                    self.next()
+            self.next()
+            if args:
+                func["args"] = args
+        if self.peek() == ":":
+            self.next()
+            func["type"] = self.type()
+        self.expect("{")
+        func["instrs"] = self.instrs()
+        self.expect("}")
+        return func
+
+    def instrs(self):
+        """Parses instructions up to the closing brace; the hot loop, so it works on locals."""
+        tokens = self.tokens
+        pos = self.pos
+        instrs = []
+        append = instrs.append
+        while True:
+            tok = tokens[pos]
+            if tok == "}" or tok == "":
+                break
+            nxt = tokens[pos + 1]
+            if tok[0] == "." and nxt == ":":
+                append({"label": tok[1:]})
+                pos += 2
+                continue
+            if nxt == ":":
+                self.pos = pos + 2
+                typ = self.type()
+                self.expect("=")
+                op = self.next()
+                pos = self.pos
+                instr = {"op": op, "dest": tok, "type": typ}
+                if op == "const":
+                    self.pos = pos
+                    instr["value"] = self.literal(typ)
+                    self.expect(";")
+                    pos = self.pos
+                    append(instr)
+                    continue
+            elif nxt == "=":
+                # Untyped value operation: `x = op args;`
+                instr = {"op": tokens[pos + 2], "dest": tok}
+                pos += 3
+            else:
+                instr = {"op": tok}
+                pos += 1
+            args = funcs = labels = None
+            while True:
+                tok = tokens[pos]
+                pos += 1
+                first = tok[:1]
+                if tok == ";":
+                    break
+                if first == "@":
+                    if funcs is None:
+                        funcs = instr["funcs"] = []
+                    funcs.append(tok[1:])
+                elif first == ".":
+                    if labels is None:
+                        labels = instr["labels"] = []
+                    labels.append(tok[1:])
+                elif first and (first.isalnum() or first in "_%-+"):
+                    if args is None:
+                        args = []
+                    args.append(tok)
+                else:
+                    raise BrilSyntaxError(f"unexpected {tok or 'end of input'!r} in instruction")
+            if args is not None:
+                instr["args"] = args
+            append(instr)
+        self.pos = pos
+        return instrs
+
+    def literal(self, typ):
+        tok = self.next()
+        if tok[:1] == "'":
+            body = tok[1:-1]
+            return ESCAPES.get(body[1], body[1]) if body.startswith("\\") else body
+        if tok in ("true", "false"):
+            return tok == "true"
+        if typ == "float" or "." in tok or "e" in tok.lower():
+            return float(tok)
+        return int(tok)
+
+def parse_program(text):
+    return Parser(text).program()
+
+def format_type(typ):
+    if isinstance(typ, dict):
+        (name, param), = typ.items()
+        return f"{name}<{format_type(param)}>"
+    return typ
+
+def format_value(value, typ):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if typ == "char":
+        return f"'\\{UNESCAPES[value]}'" if value in UNESCAPES else f"'{value}'"
+    return str(value)
+
+def format_instr(instr):
+    if "label" in instr:
+        return f".{instr['label']}:"
+    op = instr.get("op")
+    parts = [op]
+    if op == "const":
+        parts.append(format_value(instr.get("value"), instr.get("type")))
+    else:
+        parts += [f"@{f}" for f in instr.get("funcs", [])]
+        parts += instr.get("args", [])
+        parts += [f".{l}" for l in instr.get("labels", [])]
+    rhs = " ".join(parts)
+    if "dest" in instr:
+        if instr.get("type") is not None:
+            return f"  {instr['dest']}: {format_type(instr['type'])} = {rhs};"
+        return f"  {instr['dest']} = {rhs};"
+    return f"  {rhs};"
+
+def format_program(program):
+    """Prints a program in Bril's text syntax, laid out like bril2txt."""
+    lines = []
+    for imp in program.get("imports", []):
+        names = ", ".join(f"@{f['name']}" + (f" as @{f['alias']}" if "alias" in f else "")
+                          for f in imp["functions"])
+        lines.append(f"from {json.dumps(imp['path'])} import {names};")
+    for func in program["functions"]:
+        header = f"@{func['name']}"
+        if func.get("args"):
+            header += "(" + ", ".join(f"{a['name']}: {format_type(a['type'])}" for a in func["args"]) + ")"
+        if "type" in func:
+            header += f": {format_type(func['type'])}"
+        lines.append(header + " {")
+        lines.extend(format_instr(instr) for instr in func["instrs"])
+        lines.append("}")
+    return "\n".join(lines) + "\n"
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] not in ("json", "txt"):
+        print("Usage: python bril_text.py json < prog.bril > prog.json")
+        print("       python bril_text.py txt < prog.json > prog.bril")
+        sys.exit(1)
+
+    if sys.argv[1] == "json":
+        json.dump(parse_program(sys.stdin.read()), sys.stdout, indent=2)
+        print()
+    else:
+        from bril_binary import read_program
+        sys.stdout.write(format_program(read_program(sys.stdin)))
+
+if __name__ == "__main__":
+    main()
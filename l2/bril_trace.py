@@ -0,0 +1,225 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import nullcontext
+
+# Tracing is on when BRIL_TRACE names an output file (or after enable() /
+# --trace FILE); BRIL_TRACE_MEMORY=1 or --trace-memory adds tracemalloc
+# peaks, which slows everything down noticeably. When off, a traced call
+# costs one global lookup and a comparison. Only the tracing process is recorded:
+# work farmed out by --jobs N to worker processes is not, so profile with
+# the default of one job.
+_tracer = None
+_NULL = nullcontext()
+# tracemalloc.reset_peak() is new in 3.9. Without it, a peak is the highest
+# level since tracing started, so on 3.8 peak_kib is only an upper bound.
+_reset_peak = getattr(tracemalloc, "reset_peak", None)
+
+def describe(target):
+    """(function name, instruction count) of a Bril JSON or IR function, else (None, None)."""
+    if isinstance(target, dict):
+        if "instrs" in target:
+            return target.get("name"), len(target["instrs"])
+    elif hasattr(target, "instrs") and hasattr(target, "name"):
+        return target.name, len(target.instrs)
+    return None, None
+
+class Tracer:
+    """
+    Collects one complete ("X") Chrome trace event per traced call. Each event
+    carries the Bril function it ran on (inherited from the enclosing call when
+    the callee only sees a CFG), instructions in and out, any counters the code
+    reported with annotate(), and with `memory` the tracemalloc peak above the
+    allocation level at entry. Each thread keeps its own stack of open calls
+    and its own track in the trace, so a threaded server's requests do not
+    nest into each other; memory peaks are process-wide, though.
+    """
+    def __init__(self, path, memory=False):
+        self.path = path
+        self.memory = memory
+        self.events = []
+        self.local = threading.local()
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @property
+    def stack(self):
+        """The calling thread's open calls, innermost last."""
+        try:
+            return self.local.stack
+        except AttributeError:
+            self.local.stack = []
+            return self.local.stack
+
+    def begin(self, name, cat, target):
+        stack = self.stack
+        function, size = describe(target)
+        if function is None and stack:
+            function = stack[-1]["function"]
+        span = {"name": name, "cat": cat, "function": function, "target": target,
+                "instrs_in": size, "args": {}}
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # reset_peak() below forgets the parent's peak so far; keep it on the stack.
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+            if _reset_peak is not None:
+                _reset_peak()
+            span["mem_start"] = span["peak"] = current
+        stack.append(span)
+        span["start"] = time.perf_counter()
+        return span
+
+    def end(self, span):
+        end = time.perf_counter()
+        stack = self.stack
+        stack.pop()
+        args = span["args"]
+        if span["function"] is not None:
+            args["function"] = span["function"]
+        if span["instrs_in"] is not None:
+            args["instrs_in"] = span["instrs_in"]
+            args["instrs_out"] = describe(span["target"])[1]
+        if self.memory:
+            peak = max(tracemalloc.get_traced_memory()[1], span["peak"])
+            args["peak_kib"] = round((peak - span["mem_start"]) / 1024, 1)
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+        self.events.append({
+            "name": span["name"], "cat": span["cat"], "ph": "X", "pid": self.pid,
+            "tid": threading.get_ident(),
+            "ts": round((span["start"] - self.origin) * 1e6, 3),
+            "dur": round((end - span["start"]) * 1e6, 3),
+            "args": args,
+        })
+
+    def annotate(self, counts):
+        stack = self.stack
+        if stack:
+            args = stack[-1]["args"]
+            for key, value in counts.items():
+                args[key] = args.get(key, 0) + value
+
+    def write(self):
+        with open(self.path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+    def summary(self, out=sys.stderr, top=10):
+        """Per-name totals, then the slowest (name, function) pairs."""
+        totals = defaultdict(lambda: {"calls": 0, "dur": 0.0, "max": 0.0, "in": None, "out": None, "peak": 0.0})
+        by_function = defaultdict(float)
+        for event in self.events:
+            row = totals[event["name"]]
+            args = event["args"]
+            row["calls"] += 1
+            row["dur"] += event["dur"]
+            row["max"] = max(row["max"], event["dur"])
+            if "instrs_in" in args:
+                row["in"] = (row["in"] or 0) + args["instrs_in"]
+                row["out"] = (row["out"] or 0) + args["instrs_out"]
+            row["peak"] = max(row["peak"], args.get("peak_kib", 0.0))
+            by_function[event["name"], args.get("function")] += event["dur"]
+        print(f"{'pass / analysis':<28}{'calls':>7}{'total ms':>12}{'max ms':>10}"
+              f"{'instrs in':>11}{'instrs out':>11}" + (f"{'peak KiB':>10}" if self.memory else ""), file=out)
+        for name, row in sorted(totals.items(), key=lambda kv: -kv[1]["dur"]):
+            # Analyses that only see a CFG have no instruction counts.
+            counts = "".join(f"{'-' if row[k] is None else row[k]:>11}" for k in ("in", "out"))
+            print(f"{name:<28}{row['calls']:>7}{row['dur'] / 1000:>12.3f}{row['max'] / 1000:>10.3f}"
+                  f"{counts}" + (f"{row['peak']:>10.1f}" if self.memory else ""), file=out)
+        slowest = sorted(by_function.items(), key=lambda kv: -kv[1])[:top]
+        if slowest:
+            print("\nslowest functions:", file=out)
+            for (name, function), dur in slowest:
+                print(f"  {dur / 1000:>10.3f} ms  {name} @{function}", file=out)
+
+    def finish(self):
+        # Forked workers inherit the tracer but must not overwrite the parent's file.
+        if os.getpid() != self.pid:
+            return
+        self.write()
+        self.summary()
+        print(f"trace written to {self.path}", file=sys.stderr)
+
+def enable(path, memory=False):
+    """Starts recording; the trace and summary are written when the process exits."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(path, memory)
+        atexit.register(_tracer.finish)
+    return _tracer
+
+def enabled():
+    return _tracer is not None
+
+def traced(name=None, cat="pass"):
+    """
+    Decorator recording every call as a trace event named `name` (default the
+    qualified name). The first argument, when it is a Bril function, gives
+    the function name and instruction counts.
+    """
+    def wrap(fn):
+        label = name or fn.__qualname__
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+            span = tracer.begin(label, cat, args[0] if args else None)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                tracer.end(span)
+        return wrapper
+    return wrap
+
+class Span:
+    __slots__ = ("name", "cat", "target", "record")
+
+    def __init__(self, name, cat, target):
+        self.name, self.cat, self.target = name, cat, target
+
+    def __enter__(self):
+        self.record = _tracer.begin(self.name, self.cat, self.target)
+        return self
+
+    def __exit__(self, *exc):
+        _tracer.end(self.record)
+        return False
+
+def span(name, target=None, cat="pass"):
+    """Context manager form of traced(), for code that is not a single call."""
+    if _tracer is None:
+        return _NULL
+    return Span(name, cat, target)
+
+def annotate(**counts):
+    """Adds counters (iterations, rounds, ...) to the innermost traced call."""
+    if _tracer is not None:
+        _tracer.annotate(counts)
+
+def parse_trace_flags(argv):
+    """Removes `--trace FILE` and `--trace-memory` from argv in place and enables tracing."""
+    memory = "--trace-memory" in argv
+    if memory:
+        argv.remove("--trace-memory")
+    if "--trace" in argv:
+        i = argv.index("--trace")
+        if i + 1 == len(argv):
+            print("Usage: --trace <trace_json> [--trace-memory]")
+            sys.exit(1)
+        path = argv[i + 1]
+        del argv[i:i + 2]
+        enable(path, memory)
+    elif memory and _tracer is None:
+        enable("bril_trace.json", memory)
+
+if os.environ.get("BRIL_TRACE"):
+    enable(os.environ["BRIL_TRACE"], os.environ.get("BRIL_TRACE_MEMORY") == "1")
@@ -1,6 +1,12 @@
 import json
+import os
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from bril_binary import parse_binary_flag, read_program, write_program
+
+USAGE = "Usage: python trace_jumps.py [--edge-profile <map_file>] <bril_json_file> [--binary]"
+
 def trace_jumps(bril_program):
     """Modifies a Bril program to insert a print instruction before each jmp or br."""
     for function in bril_program.get("functions", []):
@@ -24,19 +30,37 @@ def trace_jumps(bril_program):
     return bril_program
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python transform_jumps.py <bril_json_file>")
+    binary = parse_binary_flag(sys.argv)
+    args = sys.argv[1:]
+    map_file = None
+    if "--edge-profile" in args:
+        i = args.index("--edge-profile")
+        if i + 1 == len(args):
+            print(USAGE)
+            sys.exit(1)
+        map_file = args[i + 1]
+        del args[i:i + 2]
+    if len(args) != 1:
+        print(USAGE)
         sys.exit(1)
 
     # Load Bril JSON file
-    with open(sys.argv[1], "r") as f:
-        bril_program = json.load(f)
+    with open(args[0], "r") as f:
+        bril_program = read_program(f)
 
-    # Transform Bril program
-    modified_program = insert_print_before_jumps(bril_program)
+    if map_file is not None:
+        # Count edges instead of printing at every jump
+        from edge_profile import instrument_program
+        profile_map = instrument_program(bril_program)
+        with open(map_file, "w") as f:
+            json.dump(profile_map, f)
+        modified_program = bril_program
+    else:
+        # Transform Bril program
+        modified_program = trace_jumps(bril_program)
 
     # Print the modified Bril program (as JSON)
-    json.dump(modified_program, sys.stdout, indent=2)
+    write_program(modified_program, sys.stdout, binary, indent=2)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
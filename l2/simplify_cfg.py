@@ -0,0 +1,130 @@
+import sys
+from collections import defaultdict
+from bril_cfg import form_explicit_blocks, flatten_blocks
+from bril_binary import parse_binary_flag, read_program, write_program
+from bril_trace import traced
+
+def successors(block):
+    term = block[-1]
+    if term.get("op") in ("jmp", "br"):
+        return term["labels"]
+    return []
+
+def remove_unreachable(blocks):
+    """Drops blocks that cannot be reached from the entry block."""
+    by_label = {block[0]["label"]: block for block in blocks}
+    reachable = set()
+    worklist = [blocks[0][0]["label"]]
+    while worklist:
+        label = worklist.pop()
+        if label in reachable:
+            continue
+        reachable.add(label)
+        worklist.extend(successors(by_label[label]))
+    kept = [block for block in blocks if block[0]["label"] in reachable]
+    changed = len(kept) != len(blocks)
+    blocks[:] = kept
+    return changed
+
+def collapse_branches(blocks):
+    """Turns `br c .a .a` into `jmp .a`."""
+    changed = False
+    for block in blocks:
+        term = block[-1]
+        if term.get("op") == "br" and term["labels"][0] == term["labels"][1]:
+            block[-1] = {"op": "jmp", "labels": [term["labels"][0]]}
+            changed = True
+    return changed
+
+def thread_jumps(blocks):
+    """
+    Retargets jumps to blocks that contain nothing but a jmp, and replaces a jmp
+    to a block that contains nothing but a ret with a copy of that ret.
+    """
+    entry = blocks[0][0]["label"]
+    forward = {}
+    returns = {}
+    for block in blocks:
+        label = block[0]["label"]
+        if len(block) == 2 and label != entry:
+            if block[-1].get("op") == "jmp":
+                forward[label] = block[-1]["labels"][0]
+            elif block[-1].get("op") == "ret":
+                returns[label] = block[-1]
+
+    def resolve(label):
+        seen = set()
+        while label in forward and label not in seen:
+            seen.add(label)
+            label = forward[label]
+        return label
+
+    changed = False
+    for block in blocks:
+        term = block[-1]
+        if term.get("op") not in ("jmp", "br"):
+            continue
+        new_labels = [resolve(label) for label in term["labels"]]
+        if new_labels != term["labels"]:
+            term = dict(term, labels=new_labels)
+            block[-1] = term
+            changed = True
+        if term.get("op") == "jmp" and term["labels"][0] in returns:
+            block[-1] = dict(returns[term["labels"][0]])
+            changed = True
+    return changed
+
+def merge_blocks(blocks):
+    """Merges a block into its predecessor when each is the other's only neighbour."""
+    preds = defaultdict(list)
+    for block in blocks:
+        for succ in set(successors(block)):
+            preds[succ].append(block[0]["label"])
+
+    entry = blocks[0][0]["label"]
+    by_label = {block[0]["label"]: block for block in blocks}
+    merged = set()
+    for block in blocks:
+        label = block[0]["label"]
+        if label in merged:
+            continue
+        while block[-1].get("op") == "jmp":
+            succ = block[-1]["labels"][0]
+            if succ == entry or succ == label or preds[succ] != [label]:
+                break
+            block[-1:] = by_label[succ][1:]
+            merged.add(succ)
+            # Blocks that jumped from `succ` now come from the merged block.
+            for s in set(successors(block)):
+                preds[s] = [label if p == succ else p for p in preds[s]]
+    blocks[:] = [block for block in blocks if block[0]["label"] not in merged]
+    return bool(merged)
+
+@traced("simplify_cfg_function")
+def simplify_cfg_function(func):
+    """
+    Iterates unreachable-block removal, branch collapsing, jump threading and
+    block merging until the CFG stops changing.
+    """
+    blocks = form_explicit_blocks(func["instrs"])
+    changed = True
+    while changed:
+        changed = remove_unreachable(blocks)
+        changed |= collapse_branches(blocks)
+        changed |= thread_jumps(blocks)
+        changed |= merge_blocks(blocks)
+    func["instrs"] = flatten_blocks(blocks)
+
+def simplify_cfg(program):
+    for func in program["functions"]:
+        simplify_cfg_function(func)
+    return program
+
+def main():
+    binary = parse_binary_flag(sys.argv)
+    program = read_program(sys.stdin)
+    program = simplify_cfg(program)
+    write_program(program, sys.stdout, binary, indent=2)
+
+if __name__ == "__main__":
+    main()
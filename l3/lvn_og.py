@@ -1,80 +1,64 @@
-import json
 import sys
 import os
 from collections import defaultdict
 
-from tdce import trivial_dce_function, has_side_effect
+from tdce import trivial_dce_function, trivial_dce_ir
 
-sys.path.append(os.path.abspath("../l2"))
-from bril_cfg import form_basic_blocks  
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "l2"))
+from bril_ir import Function, Instr, Op, SIDE_EFFECT_OPS, COMMUTATIVE_OPS, NO_VAR, form_basic_blocks
+from bril_binary import parse_binary_flag, read_program, write_program
 
 def canonicalize(value):
     """Sort arguments for commutative operations like add and mul."""
-    if value[0] in {"add", "mul", "eq", "and", "or"}:
-        # Separate numbers and strings for correct sorting
+    if value[0] in COMMUTATIVE_OPS:
+        # Value numbers are ints; variables without one are kept as (var id,)
         num_args = sorted([x for x in value[1:] if isinstance(x, int)])
-        str_args = sorted([x for x in value[1:] if isinstance(x, str)])
-        return (value[0],) + tuple(num_args + str_args)  # Preserve correct order
+        var_args = sorted([x for x in value[1:] if isinstance(x, tuple)])
+        return (value[0],) + tuple(num_args + var_args)  # Preserve correct order
     return value
 
 def lvn_block(block):
     """
-    Perform Local Value Numbering on a single basic block.
+    Perform Local Value Numbering on a single basic block of IR instructions.
     Eliminates common subexpressions and performs copy propagation.
     """
-    val_table = {}  # Maps (op, arg1, arg2, ...) -> (value_number, var_name)
-    var2num = {}    # Maps variable names to value numbers
-    num2var = {}    # Maps value numbers to canonical variable names
+    val_table = {}  # Maps (op, arg1, arg2, ...) -> (value_number, var_id)
+    var2num = {}    # Maps variable ids to value numbers
+    num2var = {}    # Maps value numbers to canonical variable ids
     next_value_number = 0
     new_block = []
 
     for instr in block:
-        if "label" in instr or has_side_effect(instr):
+        if instr.op == Op.LABEL or instr.op in SIDE_EFFECT_OPS:
             new_block.append(instr)
             continue
 
-        dest = instr.get("dest")
-        args = instr.get("args", [])
+        dest = instr.dest
+        args = instr.args or ()
 
-        if instr["op"] == "const" and "value" in instr:
-            value_repr = ("const", instr["value"])
+        if instr.op == Op.CONST and instr.value is not None:
+            value_repr = (Op.CONST, instr.value)
 
             if value_repr in val_table:
                 existing_num, existing_var = val_table[value_repr]
-                new_block.append({
-                    "op": "id",
-                    "dest": dest,
-                    "type": instr["type"],
-                    "args": [existing_var]
-                })
+                new_block.append(Instr(Op.ID, dest=dest, type=instr.type, args=(existing_var,)))
                 var2num[dest] = existing_num  
             else:
                 val_table[value_repr] = (next_value_number, dest)
                 var2num[dest] = next_value_number
                 num2var[next_value_number] = dest
                 next_value_number += 1
-                new_instr = {
-                    "op": "const",
-                    "dest": dest,
-                    "type": instr["type"],
-                    "value": instr["value"]
-                }
-                new_block.append(new_instr)
+                new_block.append(Instr(Op.CONST, dest=dest, type=instr.type, value=instr.value))
             continue  
 
-        arg_nums = tuple(var2num.get(arg, arg) for arg in args)
-        value = canonicalize((instr["op"],) + arg_nums)
+        arg_nums = tuple(var2num[arg] if arg in var2num else (arg,) for arg in args)
+        value = canonicalize((instr.op,) + arg_nums)
 
         if value in val_table:
             existing_num, existing_var = val_table[value]
 
-            if dest and existing_var != dest:
-                new_block.append({
-                    "op": "id",
-                    "dest": dest,
-                    "type": instr["type"],
-                    "args": [existing_var]
-                })
+            if dest != NO_VAR and existing_var != dest:
+                new_block.append(Instr(Op.ID, dest=dest, type=instr.type, args=(existing_var,)))
             
             var2num[dest] = existing_num  
         else:
@@ -84,32 +68,27 @@ def lvn_block(block):
             var2num[dest] = curr_num
             num2var[curr_num] = dest  
 
-            new_args = [num2var.get(arg, arg) for arg in arg_nums]
+            new_args = tuple(num2var[arg] if isinstance(arg, int) else arg[0] for arg in arg_nums)
 
-            new_instr = {
-                "op": instr["op"],
-                "args": new_args
-            }
-            if dest:
-                new_instr["dest"] = dest
-                new_instr["type"] = instr["type"]
-
-            new_block.append(new_instr)
+            if dest != NO_VAR:
+                new_block.append(Instr(instr.op, dest=dest, type=instr.type, args=new_args))
+            else:
+                new_block.append(Instr(instr.op, args=new_args))
 
     return new_block
 
-def local_value_numbering(func):
+def local_value_numbering(fn):
     """
-    Apply LVN to all basic blocks in a function.
+    Apply LVN to all basic blocks of an IR function.
     """
-    blocks = form_basic_blocks(func["instrs"])
+    blocks = form_basic_blocks(fn.instrs)
     new_instrs = []
     
     for block in blocks:
         optimized_block = lvn_block(block)
         new_instrs.extend(optimized_block)
 
-    func["instrs"] = new_instrs
+    fn.instrs = new_instrs
 
 def trivial_dce(program):
     """
@@ -124,15 +103,17 @@ def optimize_program(program):
     Run Local Value Numbering (LVN) and Trivial Dead Code Elimination (TDCE).
     """
     for func in program["functions"]:
-        local_value_numbering(func)  # Apply LVN
-        trivial_dce_function(func)   # can turn on/off DCE using this
+        fn = Function.from_json(func)
+        local_value_numbering(fn)  # Apply LVN
+        trivial_dce_ir(fn)         # can turn on/off DCE using this
+        func["instrs"] = fn.instrs_to_json()
     return program
 
 def main():
-    program = json.load(sys.stdin)
+    binary = parse_binary_flag(sys.argv)
+    program = read_program(sys.stdin)
     program = optimize_program(program)
-    json.dump(program, sys.stdout, indent=2)
-    print()
+    write_program(program, sys.stdout, binary, indent=2)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,9 @@
-import json
 import sys
 from collections import defaultdict
-from bril_cfg import form_basic_blocks, build_cfg
+from bril_cfg import index_cfg
+from bril_ir import Function, Op, OP_NAMES, NO_VAR, form_basic_blocks, form_explicit_blocks, build_cfg
+from bril_index import load_functions, parse_function_flags
+from bril_trace import traced, annotate
 
 class DataFlowSolver:
     def __init__(self, cfg, direction, merge, transfer, initial, gen_sets):
@@ -17,11 +19,14 @@ class DataFlowSolver:
             self.out_sets = {b: set() for b in cfg}
             self.in_sets = {b: gen_sets[b].copy() for b in cfg}
 
+    @traced("DataFlowSolver.solve", cat="analysis")
     def solve(self):
+        iterations = 0
         if self.direction == "forward":
             worklist = set(self.cfg.keys())
             while worklist:
                 block = worklist.pop()
+                iterations += 1
                 preds = self.cfg[block]["preds"]
                 new_in = self.merge([self.out_sets[p] for p in preds]) if preds else self.initial.copy()
                 if new_in != self.in_sets[block]:
@@ -30,11 +35,13 @@ class DataFlowSolver:
                     if new_out != self.out_sets[block]:
                         self.out_sets[block] = new_out
                         worklist.update(self.cfg[block]["succs"])
+            annotate(iterations=iterations)
             return self.in_sets, self.out_sets
         else:
             worklist = set(self.cfg.keys())
             while worklist:
                 block = worklist.pop()
+                iterations += 1
                 succs = self.cfg[block]["succs"]
                 new_out = self.merge([self.in_sets[s] for s in succs]) if succs else self.initial.copy()
                 if new_out != self.out_sets[block]:
@@ -43,9 +50,14 @@ class DataFlowSolver:
                     if new_in != self.in_sets[block]:
                         self.in_sets[block] = new_in
                         worklist.update(self.cfg[block]["preds"])
+            annotate(iterations=iterations)
             return self.in_sets, self.out_sets
 
 class ReachingDefinitions:
+    """
+    Reaching definitions over explicit IR blocks, keyed by label id. A
+    definition is the pair (variable id, label id of its block).
+    """
     def __init__(self, cfg, blocks):
         self.cfg = cfg
         self.blocks = blocks
@@ -56,19 +68,16 @@ class ReachingDefinitions:
         kill_sets = defaultdict(set)
         all_defs = defaultdict(set)
         for block in self.blocks:
-            label = block[0]["label"]
+            label = block[0].labels[0]
             for instr in block:
-                if "dest" in instr:
-                    var = instr["dest"]
-                    def_name = f"{var}_{label}"
-                    definitions[label].add(def_name)
-                    all_defs[var].add(def_name)
+                if instr.dest != NO_VAR:
+                    definitions[label].add((instr.dest, label))
+                    all_defs[instr.dest].add((instr.dest, label))
         for block in self.blocks:
-            label = block[0]["label"]
+            label = block[0].labels[0]
             for instr in block:
-                if "dest" in instr:
-                    var = instr["dest"]
-                    kill_sets[label] = all_defs[var] - {f"{var}_{label}"}
+                if instr.dest != NO_VAR:
+                    kill_sets[label] |= all_defs[instr.dest] - {(instr.dest, label)}
         return definitions, kill_sets
 
     def merge(self, sets):
@@ -88,7 +97,124 @@ class ReachingDefinitions:
         )
         return solver.solve()
 
+ARGS_BLOCK = -1  # function arguments are defined at (ARGS_BLOCK, i)
+
+def with_virtual_entry(cfg, entry):
+    """
+    A copy of `cfg` with block ARGS_BLOCK added ahead of `entry`. Its gen set
+    is what holds on function entry, and it flows in even when `entry` is
+    also a loop target.
+    """
+    cfg = {b: {"succs": cfg[b]["succs"], "preds": list(cfg[b]["preds"])} for b in cfg}
+    cfg[ARGS_BLOCK] = {"succs": [entry], "preds": []}
+    cfg[entry]["preds"].append(ARGS_BLOCK)
+    return cfg
+
+class DefUseChains:
+    """
+    Instruction-precise def-use and use-def chains, from reaching definitions.
+    Definitions and uses are (block, index) positions into the IR `blocks`,
+    with `cfg` keyed by block index; `params` are the function's (variable
+    id, type) pairs and variables are ids throughout. After analyze():
+      use_def[pos][var]  definitions of var that reach the use at pos
+      def_use[pos]       positions that use the definition at pos
+    When every variable has a single definition (SSA form) the chains are
+    read off directly without solving. Otherwise each block carries the set
+    of definitions reaching it, so the cost grows as blocks x definitions:
+    about n^1.6 on generated functions of n instructions.
+    """
+    def __init__(self, cfg, blocks, params=(), entry=0):
+        self.cfg = cfg
+        self.blocks = blocks
+        self.entry = entry
+        self.var_of = {}
+        self.var_defs = defaultdict(set)
+        for i, (var, _) in enumerate(params):
+            self.var_of[(ARGS_BLOCK, i)] = var
+            self.var_defs[var].add((ARGS_BLOCK, i))
+        self.gen_sets = {ARGS_BLOCK: set(self.var_of)}
+        for b in cfg:
+            last = {}
+            for i, instr in enumerate(blocks[b] if b < len(blocks) else ()):
+                dest = instr.dest
+                if dest != NO_VAR:
+                    self.var_of[(b, i)] = dest
+                    self.var_defs[dest].add((b, i))
+                    last[dest] = (b, i)
+            self.gen_sets[b] = set(last.values())
+        self.kill_sets = {b: set() for b in self.gen_sets}
+        for b, gen in self.gen_sets.items():
+            for d in gen:
+                self.kill_sets[b] |= self.var_defs[self.var_of[d]]
+        self.use_def = {}
+        self.def_use = defaultdict(set)
+
+    def merge(self, sets):
+        return set().union(*sets)
+
+    def transfer(self, block, in_set):
+        return self.gen_sets[block] | (in_set - self.kill_sets[block])
+
+    def reaching_in(self):
+        """Definitions reaching the top of each block, grouped by variable."""
+        if all(len(defs) == 1 for defs in self.var_defs.values()):
+            single = {var: frozenset(defs) for var, defs in self.var_defs.items()}
+            return {b: single for b in self.cfg}
+        solver = DataFlowSolver(
+            cfg=with_virtual_entry(self.cfg, self.entry),
+            direction="forward",
+            merge=self.merge,
+            transfer=self.transfer,
+            initial=set(),
+            gen_sets=self.gen_sets
+        )
+        in_sets, _ = solver.solve()
+        reaching = {}
+        for b in self.cfg:
+            # Only variables read before being redefined in the block need their defs.
+            exposed = set()
+            defined = set()
+            for instr in self.blocks[b] if b < len(self.blocks) else ():
+                if instr.args:
+                    exposed.update(arg for arg in instr.args if arg not in defined)
+                if instr.dest != NO_VAR:
+                    defined.add(instr.dest)
+            by_var = defaultdict(set)
+            var_of = self.var_of
+            for d in in_sets[b]:
+                if var_of[d] in exposed:
+                    by_var[var_of[d]].add(d)
+            reaching[b] = {var: frozenset(defs) for var, defs in by_var.items()}
+        return reaching
+
+    @traced("DefUseChains.analyze", cat="analysis")
+    def analyze(self):
+        empty = frozenset()
+        for b, reaching in self.reaching_in().items():
+            if b >= len(self.blocks):
+                continue
+            reaching = dict(reaching)
+            for i, instr in enumerate(self.blocks[b]):
+                args = instr.args
+                if args:
+                    pos = (b, i)
+                    uses = self.use_def[pos] = {}
+                    for arg in args:
+                        defs = uses[arg] = reaching.get(arg, empty)
+                        for d in defs:
+                            self.def_use[d].add(pos)
+                if instr.dest != NO_VAR:
+                    reaching[instr.dest] = frozenset([(b, i)])
+        return self.use_def, self.def_use
+
+    def defs_of(self, pos, var):
+        return self.use_def.get(pos, {}).get(var, frozenset())
+
+    def uses_of(self, pos):
+        return self.def_use.get(pos, ())
+
 class LiveVariables:
+    """Live variable ids at each explicit IR block, keyed by label id."""
     def __init__(self, cfg, blocks):
         self.cfg = cfg
         self.blocks = blocks
@@ -98,16 +224,16 @@ class LiveVariables:
         uses = {}
         defs = {}
         for block in self.blocks:
-            label = block[0]["label"]
+            label = block[0].labels[0]
             block_use = set()
             block_def = set()
             for instr in block:
-                if "args" in instr:
-                    for var in instr["args"]:
+                if instr.args:
+                    for var in instr.args:
                         if var not in block_def:
                             block_use.add(var)
-                if "dest" in instr:
-                    block_def.add(instr["dest"])
+                if instr.dest != NO_VAR:
+                    block_def.add(instr.dest)
             uses[label] = block_use
             defs[label] = block_def
         return uses, defs
@@ -155,16 +281,18 @@ def merge_maps(maps):
         result[key] = merged
     return result
 
+ARITH_OPS = frozenset([Op.ADD, Op.SUB, Op.MUL, Op.DIV])
+
 def transfer_block(block, in_map):
     state = in_map.copy()
     for instr in block:
-        if "dest" in instr:
-            var = instr["dest"]
-            op = instr.get("op")
-            if op == "const":
-                state[var] = instr["value"]
-            elif op in {"add", "sub", "mul", "div"}:
-                args = instr.get("args", [])
+        if instr.dest != NO_VAR:
+            var = instr.dest
+            op = instr.op
+            if op == Op.CONST:
+                state[var] = instr.value
+            elif op in ARITH_OPS:
+                args = instr.args or ()
                 arg_vals = []
                 all_const = True
                 for arg in args:
@@ -175,13 +303,13 @@ def transfer_block(block, in_map):
                         all_const = False
                         break
                 if all_const and len(arg_vals) == len(args):
-                    if op == "add":
+                    if op == Op.ADD:
                         res = arg_vals[0] + arg_vals[1]
-                    elif op == "sub":
+                    elif op == Op.SUB:
                         res = arg_vals[0] - arg_vals[1]
-                    elif op == "mul":
+                    elif op == Op.MUL:
                         res = arg_vals[0] * arg_vals[1]
-                    elif op == "div":
+                    elif op == Op.DIV:
                         res = arg_vals[0] // arg_vals[1] if arg_vals[1] != 0 else NC
                     state[var] = res
                 else:
@@ -191,11 +319,12 @@ def transfer_block(block, in_map):
     return state
 
 class ConstantPropagation:
+    """Constant values of variable ids at each explicit IR block, keyed by label id."""
     def __init__(self, cfg, blocks):
         self.cfg = cfg
         self.blocks = blocks
-        self.blocks_dict = {block[0]["label"]: block for block in blocks}
-        self.gen_sets = {block[0]["label"]: transfer_block(block, {}) for block in blocks}
+        self.blocks_dict = {block[0].labels[0]: block for block in blocks}
+        self.gen_sets = {label: transfer_block(block, {}) for label, block in self.blocks_dict.items()}
 
     def merge(self, maps):
         return merge_maps(maps)
@@ -240,53 +369,75 @@ def print_constant_results(block_labels, in_sets, out_sets):
         print(f"  out: {format_const_map(out_sets.get(label, {}))}")
     print("\n")
 
+def print_chains(fn, blocks, chains):
+    for (b, i), uses in sorted(chains.use_def.items()):
+        instr = blocks[b][i]
+        op = OP_NAMES[instr.op]
+        for var in dict.fromkeys(instr.args):
+            defs = ", ".join(f"{d[0]}.{d[1]}" for d in sorted(uses[var])) or "∅"
+            print(f"{b}.{i} {op} uses {fn.var_names[var]}: defined at {defs}")
+    print("\n")
+
+def named(fn, sets, name_of):
+    """Label-id keyed results with their label names, and elements named by `name_of`."""
+    return {fn.label_names[label]: name_of(value) for label, value in sets.items()}
+
 def main():
+    only = parse_function_flags(sys.argv)
     if len(sys.argv) < 3:
-        print("Usage: python df.py <bril_json_file> <analysis_type>")
+        print("Usage: python df.py <bril_json_file> <analysis_type> [--function <name>]...")
         sys.exit(1)
 
     bril_file = sys.argv[1]
     analysis_type = sys.argv[2]
 
-    with open(bril_file, "r") as f:
-        bril_program = json.load(f)
-
-    for function in bril_program.get("functions", []):
-        blocks = form_basic_blocks(function["instrs"])
-        cfg_raw = build_cfg(blocks)
-        cfg = {label: {"succs": list(cfg_raw[label]), "preds": []} for label in cfg_raw}
-        for label, succs in cfg_raw.items():
-            for succ in succs:
-                if succ not in cfg:
-                    cfg[succ] = {"succs": [], "preds": []}
+    for function in load_functions(bril_file, only):
+        fn = Function.from_json(function)
+
+        if analysis_type == "def-use":
+            print(f"\nDef-Use Chains of {function['name']} \n")
+            blocks = form_basic_blocks(fn.instrs)
+            chains = DefUseChains(index_cfg(blocks, build_cfg), blocks, fn.params)
+            chains.analyze()
+            print_chains(fn, blocks, chains)
+            continue
+
+        # The block analyses are keyed by label, so every block gets one.
+        blocks = form_explicit_blocks(fn)
+        cfg = {block[0].labels[0]: {"succs": list(block[-1].labels or ()), "preds": []} for block in blocks}
+        for label, node in cfg.items():
+            for succ in node["succs"]:
                 cfg[succ]["preds"].append(label)
 
         print("\nControl Flow Graph:")
         for label, data in cfg.items():
-            print(f"{label}: {data}")
+            succs = [fn.label_names[l] for l in data["succs"]]
+            preds = [fn.label_names[l] for l in data["preds"]]
+            print(f"{fn.label_names[label]}: {{'succs': {succs}, 'preds': {preds}}}")
 
-        block_labels = [block[0]["label"] for block in blocks]
+        block_labels = [fn.label_names[block[0].labels[0]] for block in blocks]
+        var_names = lambda vars: {fn.var_names[v] for v in vars}
 
         if analysis_type == "reaching-definitions":
-            from df import ReachingDefinitions
             print("\nReaching Definitions Analysis \n")
             analysis = ReachingDefinitions(cfg, blocks)
             in_sets, out_sets = analysis.analyze()
-            print_analysis_results(block_labels, in_sets, out_sets)
+            def_names = lambda defs: {f"{fn.var_names[v]}_{fn.label_names[l]}" for v, l in defs}
+            print_analysis_results(block_labels, named(fn, in_sets, def_names), named(fn, out_sets, def_names))
         elif analysis_type == "live":
-            from df import LiveVariables
             print("\nLive Variables Analysis \n")
             analysis = LiveVariables(cfg, blocks)
             in_sets, out_sets = analysis.analyze()
-            print_analysis_results(block_labels, in_sets, out_sets)
+            print_analysis_results(block_labels, named(fn, in_sets, var_names), named(fn, out_sets, var_names))
         elif analysis_type == "constant":
             print("\nConstant Propagation Analysis \n")
             analysis = ConstantPropagation(cfg, blocks)
             in_sets, out_sets = analysis.analyze()
-            print_constant_results(block_labels, in_sets, out_sets)
+            const_names = lambda m: {fn.var_names[v]: value for v, value in m.items()}
+            print_constant_results(block_labels, named(fn, in_sets, const_names), named(fn, out_sets, const_names))
         else:
-            print("Unknown analysis type. Use 'reaching-definitions', 'live', or 'constant'.")
+            print("Unknown analysis type. Use 'reaching-definitions', 'live', 'constant' or 'def-use'.")
             sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
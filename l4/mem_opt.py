@@ -0,0 +1,300 @@
+import sys
+from bril_cfg import index_cfg
+from bril_ir import Function, Instr, Op, NO_VAR, form_basic_blocks, build_cfg
+from bril_stream import stream_program
+from bril_binary import parse_binary_flag, read_program, write_program
+from df import DataFlowSolver
+from tdce import trivial_dce_ir
+from bril_trace import traced
+
+UNKNOWN = "?"
+CLOBBER_OPS = {Op.CALL}
+
+def cfg_with_preds(blocks):
+    """
+    Build a succs/preds CFG over IR `blocks`. If the first block is a loop target,
+    an empty entry block is appended so the solver's initial state only flows
+    into the function once.
+    """
+    cfg = index_cfg(blocks, build_cfg)
+    if cfg[0]["preds"]:
+        entry = len(blocks)
+        blocks.append([])
+        cfg[entry] = {"succs": [0], "preds": []}
+        cfg[0]["preds"].append(entry)
+    return cfg
+
+def is_ptr_type(typ):
+    return isinstance(typ, dict) and "ptr" in typ
+
+def number_alloc_sites(blocks):
+    """Give every `alloc` a stable allocation-site name, keyed by (block, index)."""
+    sites = {}
+    for b, block in enumerate(blocks):
+        for i, instr in enumerate(block):
+            if instr.op == Op.ALLOC:
+                sites[(b, i)] = f"alloc{len(sites)}"
+    return sites
+
+def may_alias(pts, p, q):
+    if p == q:
+        return True
+    p_sites = pts.get(p, {UNKNOWN})
+    q_sites = pts.get(q, {UNKNOWN})
+    if UNKNOWN in p_sites or UNKNOWN in q_sites:
+        return True
+    return bool(p_sites & q_sites)
+
+def points_to_step(state, instr, site):
+    """Update a var -> allocation sites map across one instruction."""
+    dest = instr.dest
+    if dest == NO_VAR:
+        return
+    op = instr.op
+    if op == Op.ALLOC:
+        state[dest] = frozenset([site])
+    elif op in (Op.ID, Op.PTRADD):
+        state[dest] = state.get(instr.args[0], frozenset([UNKNOWN]))
+    elif is_ptr_type(instr.type):
+        # Pointers read from memory or returned by calls may point anywhere.
+        state[dest] = frozenset([UNKNOWN])
+    else:
+        state.pop(dest, None)
+
+class PointsTo:
+    """Flow-sensitive, allocation-site based points-to analysis over alloc/ptradd."""
+    def __init__(self, cfg, blocks, params=()):
+        self.cfg = cfg
+        self.blocks = blocks
+        self.sites = number_alloc_sites(blocks)
+        self.initial = {var: frozenset([UNKNOWN]) for var, typ in params if is_ptr_type(typ)}
+        self.gen_sets = {b: self.transfer(b, self.initial) for b in cfg}
+
+    def merge(self, maps):
+        result = {}
+        for m in maps:
+            for var, sites in m.items():
+                result[var] = result.get(var, frozenset()) | sites
+        return result
+
+    def transfer(self, block, in_map):
+        state = dict(in_map)
+        for i, instr in enumerate(self.blocks[block]):
+            points_to_step(state, instr, self.sites.get((block, i)))
+        return state
+
+    def states(self, block, in_map):
+        """Yield the points-to map in effect before each instruction of a block."""
+        state = dict(in_map)
+        for i, instr in enumerate(self.blocks[block]):
+            yield state
+            points_to_step(state, instr, self.sites.get((block, i)))
+
+    def analyze(self):
+        solver = DataFlowSolver(
+            cfg=self.cfg,
+            direction="forward",
+            merge=self.merge,
+            transfer=self.transfer,
+            initial=self.initial,
+            gen_sets=self.gen_sets
+        )
+        return solver.solve()
+
+def kill_var(avail, var):
+    for ptr in [p for p, v in avail.items() if p == var or v == var]:
+        del avail[ptr]
+
+def kill_aliases(avail, pts, ptr):
+    for other in [p for p in avail if may_alias(pts, p, ptr)]:
+        del avail[other]
+
+def avail_step(avail, pts, instr):
+    """
+    Update the pointer -> variable map of known memory contents across one instruction.
+    `avail[p] == v` means `load p` would produce the current value of `v`.
+    """
+    op = instr.op
+    args = instr.args or ()
+    if op == Op.STORE:
+        kill_aliases(avail, pts, args[0])
+        if args[0] != args[1]:
+            avail[args[0]] = args[1]
+    elif op == Op.FREE:
+        kill_aliases(avail, pts, args[0])
+    elif op in CLOBBER_OPS:
+        avail.clear()
+    dest = instr.dest
+    if dest != NO_VAR:
+        kill_var(avail, dest)
+        if op == Op.LOAD and args[0] != dest:
+            avail[args[0]] = dest
+
+class AvailableLoads:
+    """Forward must-analysis of which pointers have a known value in some variable."""
+    def __init__(self, cfg, blocks, points_to, pts_in):
+        self.cfg = cfg
+        self.blocks = blocks
+        self.points_to = points_to
+        self.pts_in = pts_in
+        self.gen_sets = {b: self.transfer(b, {}) for b in cfg}
+
+    def merge(self, maps):
+        result = dict(maps[0])
+        for m in maps[1:]:
+            for ptr in list(result):
+                if m.get(ptr) != result[ptr]:
+                    del result[ptr]
+        return result
+
+    def transfer(self, block, in_map):
+        avail = dict(in_map)
+        for pts, instr in zip(self.points_to.states(block, self.pts_in[block]), self.blocks[block]):
+            avail_step(avail, pts, instr)
+        return avail
+
+    def analyze(self):
+        solver = DataFlowSolver(
+            cfg=self.cfg,
+            direction="forward",
+            merge=self.merge,
+            transfer=self.transfer,
+            initial={},
+            gen_sets=self.gen_sets
+        )
+        return solver.solve()
+
+def dead_step(dead, pts, instr):
+    """
+    Move the set of pointers whose contents are overwritten before being read
+    backwards across one instruction.
+    """
+    op = instr.op
+    args = instr.args or ()
+    dest = instr.dest
+    if dest != NO_VAR:
+        dead.discard(dest)
+    if op == Op.STORE or op == Op.FREE:
+        dead.add(args[0])
+    elif op == Op.LOAD:
+        for ptr in [p for p in dead if may_alias(pts, p, args[0])]:
+            dead.discard(ptr)
+    elif op in CLOBBER_OPS or op == Op.RET:
+        dead.clear()
+
+class DeadStores:
+    """Backward must-analysis of pointers whose current contents will never be read."""
+    def __init__(self, cfg, blocks, points_to, pts_in):
+        self.cfg = cfg
+        self.blocks = blocks
+        self.points_to = points_to
+        self.pts_in = pts_in
+        self.gen_sets = {b: self.transfer(b, set()) for b in cfg}
+
+    def merge(self, sets):
+        return set.intersection(*[set(s) for s in sets])
+
+    def transfer(self, block, out_set):
+        dead = set(out_set)
+        states = [dict(s) for s in self.points_to.states(block, self.pts_in[block])]
+        for pts, instr in reversed(list(zip(states, self.blocks[block]))):
+            dead_step(dead, pts, instr)
+        return dead
+
+    def analyze(self):
+        solver = DataFlowSolver(
+            cfg=self.cfg,
+            direction="backward",
+            merge=self.merge,
+            transfer=self.transfer,
+            initial=set(),
+            gen_sets=self.gen_sets
+        )
+        return solver.solve()
+
+def forward_copy(block, start, dest, src):
+    """Rewrite uses of `dest` to `src` in the rest of the block while both are unchanged."""
+    for instr in block[start:]:
+        if instr.args is not None:
+            instr.args = tuple(src if a == dest else a for a in instr.args)
+        if instr.dest in (dest, src):
+            break
+
+def eliminate_redundant_loads(blocks, points_to, pts_in, avail_in):
+    changed = False
+    for b, block in enumerate(blocks):
+        avail = dict(avail_in[b])
+        states = [dict(s) for s in points_to.states(b, pts_in[b])]
+        for i, instr in enumerate(block):
+            if instr.op == Op.LOAD and instr.args[0] in avail:
+                src = avail[instr.args[0]]
+                block[i] = Instr(Op.ID, dest=instr.dest, type=instr.type, args=(src,))
+                forward_copy(block, i + 1, instr.dest, src)
+                changed = True
+            avail_step(avail, states[i], block[i])
+    return changed
+
+def eliminate_dead_stores(blocks, points_to, pts_in, dead_out):
+    changed = False
+    for b, block in enumerate(blocks):
+        dead = set(dead_out[b])
+        states = [dict(s) for s in points_to.states(b, pts_in[b])]
+        keep = [True] * len(block)
+        for i in range(len(block) - 1, -1, -1):
+            instr = block[i]
+            if instr.op == Op.STORE and instr.args[0] in dead:
+                keep[i] = False
+                changed = True
+                continue
+            dead_step(dead, states[i], instr)
+        block[:] = [instr for i, instr in enumerate(block) if keep[i]]
+    return changed
+
+def memory_opt_ir(fn):
+    """
+    Forward stored values to later loads, remove repeated loads of unchanged
+    locations and delete stores that are overwritten before being read, in
+    IR function fn.
+    """
+    blocks = form_basic_blocks(fn.instrs)
+    if not blocks:
+        return
+    cfg = cfg_with_preds(blocks)
+    points_to = PointsTo(cfg, blocks, fn.params)
+    pts_in, _ = points_to.analyze()
+    pts_in = {b: pts_in[b] if isinstance(pts_in[b], dict) else {} for b in cfg}
+
+    avail_in, _ = AvailableLoads(cfg, blocks, points_to, pts_in).analyze()
+    avail_in = {b: avail_in[b] if isinstance(avail_in[b], dict) else {} for b in cfg}
+    eliminate_redundant_loads(blocks, points_to, pts_in, avail_in)
+
+    _, dead_out = DeadStores(cfg, blocks, points_to, pts_in).analyze()
+    eliminate_dead_stores(blocks, points_to, pts_in, dead_out)
+
+    fn.instrs = [instr for block in blocks for instr in block]
+    trivial_dce_ir(fn)
+
+@traced("memory_opt_function")
+def memory_opt_function(func):
+    """Memory optimizations on Bril JSON function func, converted to the IR once each way."""
+    fn = Function.from_json(func)
+    if fn.instrs:
+        memory_opt_ir(fn)
+        func["instrs"] = fn.instrs_to_json()
+
+def memory_opt(program):
+    for func in program["functions"]:
+        memory_opt_function(func)
+    return program
+
+def main():
+    binary = parse_binary_flag(sys.argv)
+    if "--stream" in sys.argv:
+        stream_program(memory_opt_function, sys.stdin, sys.stdout, binary)
+        return
+    program = read_program(sys.stdin)
+    program = memory_opt(program)
+    write_program(program, sys.stdout, binary, indent=2)
+
+if __name__ == "__main__":
+    main()
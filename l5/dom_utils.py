@@ -0,0 +1,506 @@
+import os
+import sys
+from collections import defaultdict, deque
+from bril_cfg import form_basic_blocks, build_cfg
+from bril_index import load_functions, parse_function_flags
+from bril_trace import traced, annotate
+
+# With BRIL_DOM_CHECK=1, every incremental update is checked against a full recompute.
+CHECK_UPDATES = os.environ.get("BRIL_DOM_CHECK") == "1"
+# remove_edge recomputes from scratch once the blocks it must re-solve are this share of the function.
+REBUILD_SHARE = 0.5
+
+def dfs_postorder(cfg, start, visited=None, result=None):
+    """Blocks reachable from start in depth-first postorder; iterative, so any CFG depth works."""
+    if visited is None:
+        visited = set()
+    if result is None:
+        result = []
+    visited.add(start)
+    stack = [(start, iter(cfg[start]["succs"]))]
+    while stack:
+        b, succs = stack[-1]
+        for s in succs:
+            if s not in visited:
+                visited.add(s)
+                stack.append((s, iter(cfg[s]["succs"])))
+                break
+        else:
+            stack.pop()
+            result.append(b)
+    return result
+
+def reachable_blocks(cfg, start):
+    seen = {start}
+    stack = [start]
+    while stack:
+        for s in cfg[stack.pop()]["succs"]:
+            if s not in seen:
+                seen.add(s)
+                stack.append(s)
+    return seen
+
+def build_postorder_map(cfg, entry):
+    post = dfs_postorder(cfg, entry)
+    return {b: i for i, b in enumerate(post)}
+
+def intersect_idom(x, y, idom, postorder_index):
+    while x != y:
+        if postorder_index[x] < postorder_index[y]:
+            x = idom[x]
+        else:
+            y = idom[y]
+    return x
+
+def compute_idom(cfg, entry, dominators):
+    idom = {entry: entry}
+    for b in cfg:
+        if b != entry:
+            idom[b] = None
+    postorder_index = build_postorder_map(cfg, entry)
+    changed = True
+    while changed:
+        changed = False
+        # Unreachable blocks have no postorder number and keep idom None.
+        rev_post = sorted(postorder_index, key=lambda x: postorder_index[x], reverse=True)
+        if entry in rev_post:
+            rev_post.remove(entry)
+        for b in rev_post:
+            preds = [p for p in cfg[b]["preds"] if idom[p] is not None]
+            if not preds:
+                continue
+            new_idom = preds[0]
+            for p in preds[1:]:
+                new_idom = intersect_idom(new_idom, p, idom, postorder_index)
+            if idom[b] != new_idom:
+                idom[b] = new_idom
+                changed = True
+    return idom
+
+def find_all_paths(cfg, start, end, path=None):
+    if path is None:
+        path = []
+    path = path + [start]
+    if start == end:
+        return [path]
+    if start not in cfg:
+        return []
+    paths = []
+    for succ in cfg[start]["succs"]:
+        if succ not in path:
+            paths.extend(find_all_paths(cfg, succ, end, path))
+    return paths
+
+def verify_dominators(cfg, entry, dominators):
+    for b in cfg:
+        for d in dominators[b]:
+            all_paths = find_all_paths(cfg, entry, b)
+            if any(d not in p for p in all_paths):
+                return False
+    return True
+
+def ensure_unique_entry(cfg, entry_block, block_labels):
+    external_preds = [p for p in cfg[entry_block]["preds"] if p < entry_block]
+    if not external_preds:
+        return entry_block
+    new_block = max(cfg.keys()) + 1
+    cfg[new_block] = {"succs": [entry_block], "preds": []}
+    block_labels[new_block] = ".uentry"
+    for p in external_preds:
+        if entry_block in cfg[p]["succs"]:
+            cfg[p]["succs"].remove(entry_block)
+            if new_block not in cfg[p]["succs"]:
+                cfg[p]["succs"].append(new_block)
+    remaining = [p for p in cfg[entry_block]["preds"] if p >= entry_block]
+    cfg[entry_block]["preds"] = remaining + [new_block]
+    return new_block
+
+def print_tree_viz(root, dom_tree, block_labels, prefix="", is_tail=True):
+    label = block_labels.get(root, f".blk{root}")
+    connector = "└── " if is_tail else "├── "
+    print(prefix + connector + label)
+    children = sorted(dom_tree.get(root, []))
+    for i, child in enumerate(children):
+        last_child = (i == len(children) - 1)
+        new_prefix = prefix + ("    " if is_tail else "│   ")
+        print_tree_viz(child, dom_tree, block_labels, new_prefix, last_child)
+
+class Dominators:
+    """
+    Dominator sets, immediate dominators, dominator tree and dominance
+    frontiers of `cfg` from `entry`. Blocks unreachable from entry have
+    dominators {b}, idom None and are left out of the tree.
+
+    The CFG may be edited through add_block, add_edge, remove_edge,
+    insert_block and split_block, which change `cfg` in place and update the
+    analysis incrementally; dom_frontier and the tree intervals behind
+    dominates() are rebuilt lazily on the next query. With `check` (or
+    BRIL_DOM_CHECK=1) every update is verified against a full recompute.
+    """
+    @traced("Dominators", cat="analysis")
+    def __init__(self, cfg, entry, check=None):
+        self.cfg = cfg
+        self.entry = entry
+        self.check = CHECK_UPDATES if check is None else check
+        self.reachable = reachable_blocks(cfg, entry)
+        self.dominators = self.compute_full_dominators()
+        self.idom = compute_idom(cfg, entry, self.dominators)
+        self.dom_tree = self.build_dominator_tree()
+        self._frontier = None
+        self._intervals = None
+
+    def compute_full_dominators(self):
+        all_blocks = set(self.reachable)
+        dom = {b: {b} for b in self.cfg}
+        for b in all_blocks:
+            if b != self.entry:
+                dom[b] = set(all_blocks)
+        changed = True
+        rounds = 0
+        while changed:
+            changed = False
+            rounds += 1
+            for block in self.cfg:
+                if block == self.entry or block not in all_blocks:
+                    continue
+                preds = [dom[p] for p in self.cfg[block]["preds"] if p in all_blocks]
+                if preds:
+                    common = set.intersection(*preds)
+                else:
+                    common = {block}
+                new_dom = {block} | common
+                if new_dom != dom[block]:
+                    dom[block] = new_dom
+                    changed = True
+        annotate(rounds=rounds)
+        return dom
+
+    def build_dominator_tree(self):
+        tree = defaultdict(list)
+        for b, parent in self.idom.items():
+            if b != self.entry and parent is not None:
+                tree[parent].append(b)
+        return dict(tree)
+
+    def compute_dominance_frontier(self):
+        DF = defaultdict(set)
+        tree_children = self.dom_tree
+        reachable = self.reachable
+        for x in self.cfg:
+            DF[x] = set()
+        for x in reachable:
+            for s in self.cfg[x]["succs"]:
+                if self.idom[s] != x:
+                    DF[x].add(s)
+        for x in reachable:
+            for p in self.cfg[x]["preds"]:
+                if p != x and p in reachable and x in self.dominators[p]:
+                    DF[x].add(x)
+                    break
+        # Children's frontiers pass up to their parents, so the tree is walked
+        # bottom-up: every block after all of its descendants.
+        order = [self.entry]
+        for x in order:
+            order.extend(tree_children.get(x, []))
+        for x in reversed(order):
+            for c in tree_children.get(x, []):
+                for y in DF[c]:
+                    if self.idom[y] != x:
+                        DF[x].add(y)
+        return dict(DF)
+
+    @property
+    def dom_frontier(self):
+        if self._frontier is None:
+            self._frontier = self.compute_dominance_frontier()
+        return self._frontier
+
+    def intervals(self):
+        """(pre, post) numbers of the dominator tree; a dominates b iff a's interval encloses b's."""
+        if self._intervals is None:
+            pre, post = {}, {}
+            counter = 0
+            stack = [(self.entry, False)]
+            while stack:
+                b, done = stack.pop()
+                if done:
+                    post[b] = counter
+                    counter += 1
+                    continue
+                pre[b] = counter
+                counter += 1
+                stack.append((b, True))
+                stack.extend((c, False) for c in self.dom_tree.get(b, ()))
+            self._intervals = (pre, post)
+        return self._intervals
+
+    def dominates(self, a, b):
+        pre, post = self.intervals()
+        if a not in pre or b not in pre:
+            return a == b
+        return pre[a] <= pre[b] and post[b] <= post[a]
+
+    def subtree(self, b):
+        """b and every block it dominates."""
+        blocks = [b]
+        for x in blocks:
+            blocks.extend(self.dom_tree.get(x, ()))
+        return blocks
+
+    # Incremental updates. Each edit re-solves only the blocks it can affect:
+    # added edges shrink dominator sets, which are solved down and the idoms
+    # patched from them; removed edges grow them, so the idoms are solved
+    # again from scratch over the region and the sets rebuilt from the tree.
+
+    def set_idom(self, b, parent):
+        old = self.idom.get(b)
+        if old == parent or b == self.entry:
+            return
+        if old is not None:
+            siblings = self.dom_tree[old]
+            siblings.remove(b)
+            if not siblings:
+                del self.dom_tree[old]
+        self.idom[b] = parent
+        if parent is not None:
+            self.dom_tree.setdefault(parent, []).append(b)
+
+    def closest_dominator(self, b):
+        """The strict dominator of b with the most dominators of its own, i.e. idom(b)."""
+        return max((d for d in self.dominators[b] if d != b), key=lambda d: len(self.dominators[d]))
+
+    def solve_from(self, worklist):
+        """Re-solves dominator sets as compute_full_dominators does, starting from `worklist`."""
+        changed = set()
+        queued = set(worklist)
+        worklist = deque(worklist)
+        while worklist:
+            b = worklist.popleft()
+            queued.discard(b)
+            if b == self.entry:
+                continue
+            preds = [self.dominators[p] for p in self.cfg[b]["preds"] if p in self.reachable]
+            new_dom = {b} | (set.intersection(*preds) if preds else set())
+            if new_dom != self.dominators[b]:
+                self.dominators[b] = new_dom
+                changed.add(b)
+                for s in self.cfg[b]["succs"]:
+                    if s not in queued:
+                        queued.add(s)
+                        worklist.append(s)
+        return changed
+
+    def refresh(self, changed, operation):
+        for b in changed:
+            self.set_idom(b, self.closest_dominator(b) if b in self.reachable else None)
+        self._frontier = None
+        self._intervals = None
+        if self.check:
+            self.verify(operation)
+
+    def add_block(self, b):
+        """Adds an unconnected block b."""
+        self.cfg[b] = {"succs": [], "preds": []}
+        self.dominators[b] = {b}
+        self.idom[b] = None
+        self.refresh((), f"add_block({b})")
+
+    def add_edge(self, u, v):
+        self.cfg[u]["succs"].append(v)
+        self.cfg[v]["preds"].append(u)
+        changed = set()
+        if u in self.reachable:
+            if v in self.reachable:
+                changed = self.solve_from([v])
+            else:
+                # Everything reachable only through the new edge starts at "all
+                # blocks" and is solved down, as in a full computation.
+                newly = reachable_blocks(self.cfg, v) - self.reachable
+                self.reachable |= newly
+                for b in newly:
+                    self.dominators[b] = set(self.reachable)
+                entered = [s for b in newly for s in self.cfg[b]["succs"] if s not in newly]
+                changed = self.solve_from(list(newly) + entered) | newly
+        self.refresh(changed, f"add_edge({u}, {v})")
+
+    def remove_edge(self, u, v):
+        self.cfg[u]["succs"].remove(v)
+        self.cfg[v]["preds"].remove(u)
+        if u in self.reachable and v != self.entry and u not in self.cfg[v]["preds"]:
+            # Dominators only grow, so solving down from the old values would
+            # stop too early. Only blocks reachable from v can gain one; their
+            # idoms are solved again from scratch, the rest stay as they are.
+            reachable = reachable_blocks(self.cfg, self.entry)
+            region = (reachable_blocks(self.cfg, v) & reachable) - {self.entry}
+            if len(region) >= REBUILD_SHARE * len(reachable):
+                self.recompute()
+            else:
+                for b in self.reachable - reachable:
+                    self.dominators[b] = {b}
+                    self.set_idom(b, None)
+                self.reachable = reachable
+                self.resolve_idoms(region)
+        self.refresh((), f"remove_edge({u}, {v})")
+
+    def resolve_idoms(self, region):
+        """
+        Re-solves the idoms of `region` as compute_idom does, in reverse
+        postorder and starting from undefined, with every other reachable
+        block's idom held fixed; then rebuilds the dominator sets of the
+        blocks whose idom or any dominator changed, down the new tree.
+        """
+        postorder_index = build_postorder_map(self.cfg, self.entry)
+        order = sorted(region, key=postorder_index.__getitem__, reverse=True)
+        old = {b: self.idom[b] for b in order}
+        idom = self.idom
+        for b in order:
+            idom[b] = None
+        changed = True
+        while changed:
+            changed = False
+            for b in order:
+                preds = [p for p in self.cfg[b]["preds"] if idom.get(p) is not None]
+                new_idom = preds[0]
+                for p in preds[1:]:
+                    new_idom = intersect_idom(new_idom, p, idom, postorder_index)
+                if idom[b] != new_idom:
+                    idom[b] = new_idom
+                    changed = True
+        grown = set()
+        for b in order:
+            parent = idom[b]
+            idom[b] = old[b]
+            self.set_idom(b, parent)
+            if parent != old[b] or parent in grown:
+                self.dominators[b] = self.dominators[parent] | {b}
+                grown.add(b)
+
+    def recompute(self):
+        """Rebuilds the analysis from scratch: idoms by compute_idom, dominator sets down the tree."""
+        self.reachable = reachable_blocks(self.cfg, self.entry)
+        self.idom = compute_idom(self.cfg, self.entry, None)
+        self.dom_tree = self.build_dominator_tree()
+        self.dominators = {b: {b} for b in self.cfg}
+        post = dfs_postorder(self.cfg, self.entry)
+        for b in reversed(post[:-1]):
+            self.dominators[b] = self.dominators[self.idom[b]] | {b}
+
+    def insert_block(self, new, target, preds):
+        """
+        Adds block `new` on the edges from `preds` into `target`, as for a
+        loop preheader. When every other predecessor of target is dominated by
+        target (its back edges), `new` dominates exactly what target did and
+        the update is done in place; otherwise it falls back to edge updates.
+        """
+        preds = list(preds)
+        others = [q for q in self.cfg[target]["preds"] if q not in preds and q in self.reachable]
+        fast = (target in self.reachable and target != self.entry and preds
+                and all(p in self.reachable and target not in self.dominators[p] for p in preds)
+                and all(target in self.dominators[q] for q in others))
+        if not fast:
+            self.add_block(new)
+            self.add_edge(new, target)
+            for p in preds:
+                self.add_edge(p, new)
+                self.remove_edge(p, target)
+            return
+        self.cfg[new] = {"succs": [target], "preds": list(preds)}
+        for p in preds:
+            self.cfg[p]["succs"].remove(target)
+            self.cfg[p]["succs"].append(new)
+            self.cfg[target]["preds"].remove(p)
+        self.cfg[target]["preds"].append(new)
+        self.reachable.add(new)
+        self.dominators[new] = {new} | set.intersection(*(self.dominators[p] for p in preds))
+        self.idom[new] = None
+        for b in self.subtree(target):
+            self.dominators[b].add(new)
+        self.set_idom(new, self.closest_dominator(new))
+        self.set_idom(target, new)
+        self.refresh((), f"insert_block({new}, {target}, {preds})")
+
+    def split_block(self, b, new):
+        """Moves b's outgoing edges to a new block `new`, which b then falls through to."""
+        succs = self.cfg[b]["succs"]
+        self.cfg[new] = {"succs": succs, "preds": [b]}
+        self.cfg[b]["succs"] = [new]
+        for s in succs:
+            preds = self.cfg[s]["preds"]
+            preds[preds.index(b)] = new
+        self.idom[new] = None
+        self.dominators[new] = {new}
+        if b in self.reachable:
+            # new sits between b and everything b strictly dominates.
+            self.reachable.add(new)
+            children = list(self.dom_tree.get(b, ()))
+            for x in self.subtree(b)[1:]:
+                self.dominators[x].add(new)
+            self.dominators[new] = self.dominators[b] | {new}
+            self.set_idom(new, b)
+            for c in children:
+                self.set_idom(c, new)
+        self.refresh((), f"split_block({b}, {new})")
+
+    def verify(self, operation="update"):
+        """Raises AssertionError if this analysis differs from a full recompute."""
+        cfg = {b: {"succs": list(n["succs"]), "preds": list(n["preds"])} for b, n in self.cfg.items()}
+        full = Dominators(cfg, self.entry, check=False)
+        def fail(what):
+            raise AssertionError(f"incremental dominators wrong after {operation}: {what}")
+        if full.reachable != self.reachable:
+            fail(f"reachable blocks {sorted(self.reachable)} != {sorted(full.reachable)}")
+        for b in self.cfg:
+            if full.dominators[b] != self.dominators[b]:
+                fail(f"dominators of {b}: {sorted(self.dominators[b])} != {sorted(full.dominators[b])}")
+            if full.idom[b] != self.idom[b]:
+                fail(f"idom of {b}: {self.idom[b]} != {full.idom[b]}")
+        tree = {b: set(c) for b, c in self.dom_tree.items()}
+        if tree != {b: set(c) for b, c in full.dom_tree.items()}:
+            fail("dominator tree")
+        if self.dom_frontier != full.dom_frontier:
+            fail("dominance frontier")
+        for b in self.reachable:
+            if not all(self.dominates(d, b) for d in full.dominators[b]):
+                fail(f"tree intervals of {b}")
+
+def main():
+    only = parse_function_flags(sys.argv)
+    if len(sys.argv) < 2:
+        sys.exit(1)
+    bril_file = sys.argv[1]
+    for func in load_functions(bril_file, only):
+        blocks = form_basic_blocks(func['instrs'])
+        raw_cfg = build_cfg(blocks)
+        block_labels = {}
+        for i, block in enumerate(blocks):
+            if "label" in block[0]:
+                block_labels[i] = block[0]["label"]
+            else:
+                block_labels[i] = f".blk{i}"
+        cfg = {}
+        for i in raw_cfg:
+            cfg[i] = {"succs": list(raw_cfg[i]), "preds": []}
+        for i, succs in raw_cfg.items():
+            for s in succs:
+                if s not in cfg:
+                    cfg[s] = {"succs": [], "preds": []}
+                cfg[s]["preds"].append(i)
+        entry_block = min(cfg.keys())
+        entry_block = ensure_unique_entry(cfg, entry_block, block_labels)
+        doms = Dominators(cfg, entry_block)
+        print("\n-- Dominator Sets -- ")
+        for b in sorted(cfg.keys()):
+            dom_set = sorted(doms.dominators[b])
+            names = [block_labels[d] for d in dom_set]
+            print(f"Block {block_labels.get(b, f'.blk{b}')}: {', '.join(names)}")
+        print("\n-- Dominance Tree -- ")
+        print_tree_viz(entry_block, doms.dom_tree, block_labels)
+        print("\n-- Dominance Frontier --")
+        for x in sorted(cfg.keys()):
+            frontier = sorted(doms.dom_frontier[x])
+            f_labels = [block_labels[y] for y in frontier]
+            x_label = block_labels.get(x, f".blk{x}")
+            print(f"{x_label}: {', '.join(f_labels) if f_labels else '∅'}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
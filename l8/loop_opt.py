@@ -1,37 +1,52 @@
 #!/usr/bin/env python3
-import json
 import sys
-from bril_cfg import form_basic_blocks, build_cfg
+from collections import deque
+from bril_cfg import fresh_label, index_cfg
+from bril_ir import Function, Instr, Op, NO_VAR, TERMINATORS, form_basic_blocks, build_cfg
+from bril_parallel import parse_jobs, run_per_function
+from bril_binary import parse_binary_flag, read_program, write_program
 from dom_utils import Dominators, ensure_unique_entry
-
-def has_side_effects(instr):
-    return instr.get("op") in ["call", "print", "jmp", "br", "ret"]
-
-def is_loop_invariant(instr, loop_blocks, defs, invariant):
-    if has_side_effects(instr):
+from df import DefUseChains
+from bril_trace import traced, annotate
+
+# Never hoisted: effects, values that are not a function of the arguments
+# (memory and SSA shadow reads), and operations that can trap.
+PINNED_OPS = frozenset([Op.CALL, Op.PRINT, Op.JMP, Op.BR, Op.RET, Op.STORE, Op.FREE,
+                        Op.ALLOC, Op.LOAD, Op.SET, Op.GET, Op.DIV])
+
+def is_pinned(instr):
+    return instr.op in PINNED_OPS
+
+def is_loop_invariant(pos, instr, loop_blocks, chains, invariant):
+    """
+    Each argument must be defined only outside the loop, or by exactly one
+    reaching definition that is itself an invariant instruction of the loop.
+    """
+    if is_pinned(instr):
         return False
-    if "args" not in instr:
-        return True  # const instr
-    for arg in instr["args"]:
-        arg_defs = defs.get(arg, [])
-        if any(def_block in loop_blocks and arg not in invariant for def_block in arg_defs):
+    for arg in instr.args or ():
+        defs = chains.defs_of(pos, arg)
+        inside = [d for d in defs if d[0] in loop_blocks]
+        if inside and (len(defs) > 1 or inside[0] not in invariant):
             return False
     return True
 
-def licm(func):
-    blocks = form_basic_blocks(func["instrs"])
-    cfg_raw = build_cfg(blocks)
-    cfg = {i: {"succs": list(cfg_raw.get(i, [])), "preds": []} for i in range(len(blocks))}
-    for b, succs in cfg_raw.items():
-        for s in succs:
-            cfg[s]["preds"].append(b)
-
-    entry = ensure_unique_entry(cfg, 0, {})
-    doms = Dominators(cfg, entry)
+def is_hoistable(pos, instr, loop_blocks, chains):
+    """
+    Moving the definition to the preheader must not change what any use
+    sees: it has to be the loop's only definition of its variable and the
+    only definition reaching each of its uses.
+    """
+    dest = instr.dest
+    if any(d != pos and d[0] in loop_blocks for d in chains.var_defs[dest]):
+        return False
+    return all(chains.defs_of(u, dest) == {pos} for u in chains.uses_of(pos))
 
+def find_loops(cfg, doms):
+    """Natural loops as (header, blocks) pairs, one per back edge."""
     loops = []
-    for src, succs in cfg_raw.items():
-        for dst in succs:
+    for src in cfg:
+        for dst in cfg[src]["succs"]:
             if dst in doms.dominators[src]:
                 loop_blocks = set([dst, src])
                 worklist = [src]
@@ -42,64 +57,113 @@ def licm(func):
                             loop_blocks.add(pred)
                             worklist.append(pred)
                 loops.append((dst, loop_blocks))
-
-    defs = {}
-    for i, block in enumerate(blocks):
-        for instr in block:
-            if "dest" in instr:
-                defs.setdefault(instr["dest"], []).append(i)
-
+    return loops
+
+def retarget(block, old, new):
+    """Points the block's jmp/br at label id `old` to `new`, on a copy of the instruction."""
+    last = block[-1]
+    if last.op in (Op.JMP, Op.BR) and old in last.labels:
+        block[-1] = last.copy(labels=tuple(new if label == old else label for label in last.labels))
+
+def licm_ir(fn, doms=None, chains=None):
+    """
+    Hoists loop-invariant instructions of IR function fn into preheaders and
+    returns how many moved. Precomputed `doms` (whose CFG is updated along
+    with it) and analyzed def-use `chains` for the current blocks may be
+    passed in.
+    """
+    blocks = form_basic_blocks(fn.instrs)
+    if doms is None:
+        cfg = index_cfg(blocks, build_cfg)
+        doms = Dominators(cfg, ensure_unique_entry(cfg, 0, {}))
+    cfg = doms.cfg
+
+    loops = find_loops(cfg, doms)
+
+    if chains is None and loops:
+        chains = DefUseChains(cfg, blocks, fn.params)
+        chains.analyze()
+
+    # Positions stay those of the original blocks; hoisted instructions are
+    # dropped from them when the function is rebuilt in `order`, where each
+    # preheader sits just before its header.
+    hoisted = set()
+    order = list(range(len(blocks)))
+    taken = set(fn.label_names)
     for header, loop_blocks in loops:
+        if header == doms.entry:
+            continue  # a preheader here would become the function's entry
         invariant_instrs = []
         invariant = set()
-        changed = True
-        while changed:
-            changed = False
-            for block_idx in loop_blocks:
-                for instr in blocks[block_idx]:
-                    if "dest" in instr and instr["dest"] not in invariant:
-                        if is_loop_invariant(instr, loop_blocks, defs, invariant):
-                            invariant.add(instr["dest"])
-                            invariant_instrs.append((block_idx, instr))
-                            changed = True
+        # Each instruction is checked once, and again only when one of the
+        # definitions it uses becomes invariant.
+        worklist = deque((b, i) for b in sorted(loop_blocks) for i in range(len(blocks[b])))
+        while worklist:
+            pos = worklist.popleft()
+            instr = blocks[pos[0]][pos[1]]
+            if instr.dest == NO_VAR or pos in invariant or pos in hoisted:
+                continue
+            if (is_loop_invariant(pos, instr, loop_blocks, chains, invariant)
+                    and is_hoistable(pos, instr, loop_blocks, chains)):
+                invariant.add(pos)
+                invariant_instrs.append((pos, instr))
+                worklist.extend(u for u in chains.uses_of(pos) if u[0] in loop_blocks)
 
         if not invariant_instrs:
             continue  # Do NOT create preheader if nothing to move
 
         preheader_idx = len(blocks)
-        preheader_label = f"preheader{preheader_idx}"
-        preheader_block = [{"label": preheader_label}, {"op": "jmp", "labels": [blocks[header][0]["label"]]}]
+        header_label = blocks[header][0].labels[0]
+        preheader_label = fn.label(fresh_label(f"preheader{preheader_idx}", taken))
+        preheader_block = [Instr(Op.LABEL, labels=(preheader_label,)), Instr(Op.JMP, labels=(header_label,))]
 
         # Actually move invariant instructions
-        for block_idx, instr in invariant_instrs:
-            blocks[block_idx].remove(instr)
+        for pos, instr in invariant_instrs:
+            hoisted.add(pos)
             preheader_block.insert(-1, instr)
 
+        # Entries from outside the loop now go through the preheader: jumps are
+        # retargeted, and a block falling through to the header falls into the
+        # preheader instead. A loop block falling through keeps going to the header.
+        outside = [p for p in cfg[header]["preds"] if p not in loop_blocks]
+        for p in outside:
+            retarget(blocks[p], header_label, preheader_label)
+        at = order.index(header)
+        if at and order[at - 1] in loop_blocks and blocks[order[at - 1]][-1].op not in TERMINATORS:
+            blocks[order[at - 1]].append(Instr(Op.JMP, labels=(header_label,)))
+        order.insert(at, preheader_idx)
         blocks.append(preheader_block)
-        cfg[preheader_idx] = {"succs": [header], "preds": []}
-
-        for pred in cfg[header]["preds"][:]:
-            if pred not in loop_blocks:
-                cfg[pred]["succs"].remove(header)
-                cfg[pred]["succs"].append(preheader_idx)
-                cfg[preheader_idx]["preds"].append(pred)
-                cfg[header]["preds"].remove(pred)
-        cfg[header]["preds"].append(preheader_idx)
-
-    func["instrs"] = [instr for block in blocks for instr in block]
+        # Rewires cfg and keeps doms current for the loops still to come.
+        doms.insert_block(preheader_idx, header, outside)
+
+    if hoisted:
+        fn.instrs = [instr for b in order for i, instr in enumerate(blocks[b]) if (b, i) not in hoisted]
+    annotate(loops=len(loops), hoisted=len(hoisted))
+    return len(hoisted)
+
+@traced("licm")
+def licm(func, doms=None, chains=None):
+    """
+    LICM on Bril JSON function func, on the compact IR; `chains` is over the
+    variable ids Function.from_json(func) assigns.
+    """
+    fn = Function.from_json(func)
+    if licm_ir(fn, doms, chains):
+        func["instrs"] = fn.instrs_to_json()
 
 def main():
+    jobs = parse_jobs(sys.argv)
+    binary = parse_binary_flag(sys.argv)
     if len(sys.argv) != 2:
-        print("Usage: python loop_opt.py <bril_json_file>")
+        print("Usage: python loop_opt.py <bril_json_file> [--jobs N] [--binary]")
         sys.exit(1)
 
     with open(sys.argv[1], "r") as f:
-        prog = json.load(f)
+        prog = read_program(f)
 
-    for func in prog.get("functions", []):
-        licm(func)
+    run_per_function(licm, prog, jobs)
 
-    print(json.dumps(prog, indent=2))
+    write_program(prog, sys.stdout, binary, indent=2)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,22 @@
+import io
+import os
+import sys
+
+import pytest
+
+# The lesson modules import each other by bare name, as when run as scripts.
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+for lesson in ("l2", "l3", "l4", "l5", "l6", "l8", "tools", os.path.join("l2", "debug_jumps_in_bril!")):
+    sys.path.append(os.path.join(ROOT, lesson))
+DEBUG_TESTS = os.path.join(ROOT, "l2", "debug_jumps_in_bril!", "tests")
+
+from bril_interp import Interpreter
+
+@pytest.fixture
+def run_bril():
+    """Runs a program on the in-repo interpreter; returns (stdout, dynamic instruction count)."""
+    def run(program, args=()):
+        out = io.StringIO()
+        total = Interpreter(program).run([str(a) for a in args], out=out)
+        return out.getvalue(), total
+    return run
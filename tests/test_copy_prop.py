@@ -0,0 +1,36 @@
+import copy
+
+from pass_manager import PassManager
+
+def const(dest, value):
+    return {"op": "const", "dest": dest, "type": "int", "value": value}
+
+def instr(op, dest, *args):
+    return {"op": op, "dest": dest, "type": "int", "args": list(args)}
+
+# v2 is redefined after `v8 = id v2`; propagating v8 -> v2.blk0 in SSA makes
+# the last add read the redefinition once out-of-SSA drops the suffixes.
+REDEFINED_SOURCE = {"functions": [{
+    "name": "main",
+    "args": [{"name": "v0", "type": "int"}],
+    "instrs": [
+        const("v2", 7), const("v3", 7), const("v4", 6),
+        instr("id", "v8", "v2"),
+        instr("id", "v1", "v4"),
+        instr("add", "v2", "v1", "v3"),
+        instr("add", "v2", "v3", "v8"),
+        {"op": "print", "args": ["v0", "v1", "v2", "v3"]},
+    ],
+}]}
+
+def test_copy_prop_through_ssa_keeps_semantics(run_bril):
+    expected, _ = run_bril(REDEFINED_SOURCE, [5])
+    assert expected == "5 6 14 7\n"
+    optimized = PassManager("ssa,copy-prop,out-ssa").run(copy.deepcopy(REDEFINED_SOURCE))
+    assert run_bril(optimized, [5])[0] == expected
+
+def test_copy_prop_outside_ssa_still_propagates(run_bril):
+    optimized = PassManager("copy-prop,gdce").run(copy.deepcopy(REDEFINED_SOURCE))
+    copies = [i["dest"] for i in optimized["functions"][0]["instrs"] if i.get("op") == "id"]
+    assert copies == ["v8"]    # v1 is propagated; v2 is redefined before v8 is read
+    assert run_bril(optimized, [5])[0] == "5 6 14 7\n"
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+import dom_utils
+from dom_utils import Dominators
+
+def random_cfg(rng, n):
+    cfg = {b: {"succs": [], "preds": []} for b in range(n)}
+    for b in range(n):
+        for s in rng.sample(range(n), rng.randint(0, min(3, n))):
+            cfg[b]["succs"].append(s)
+            cfg[s]["preds"].append(b)
+    return cfg
+
+def random_edits(rng, doms, count):
+    """Applies `count` random CFG edits; check=True verifies each against a full recompute."""
+    cfg = doms.cfg
+    new = max(cfg) + 1
+    for _ in range(count):
+        edges = [(u, s) for u in cfg for s in cfg[u]["succs"]]
+        choice = rng.random()
+        if choice < 0.45 and edges:
+            doms.remove_edge(*rng.choice(edges))
+        elif choice < 0.8:
+            u, v = rng.choice(list(cfg)), rng.choice(list(cfg))
+            if v not in cfg[u]["succs"]:
+                doms.add_edge(u, v)
+        elif choice < 0.9 and edges:
+            u, v = rng.choice(edges)
+            doms.insert_block(new, v, [u])
+            new += 1
+        else:
+            doms.split_block(rng.choice(list(cfg)), new)
+            new += 1
+
+# remove_edge re-solves a region or rebuilds depending on the region's size;
+# 0 and 2 force one path or the other.
+@pytest.mark.parametrize("rebuild_share", [0.0, 0.5, 2.0])
+def test_incremental_updates_match_recompute(monkeypatch, rebuild_share):
+    monkeypatch.setattr(dom_utils, "REBUILD_SHARE", rebuild_share)
+    rng = random.Random(rebuild_share)
+    for _ in range(150):
+        doms = Dominators(random_cfg(rng, rng.randint(1, 20)), 0, check=True)
+        random_edits(rng, doms, 10)
+
+def test_deep_cfg_does_not_recurse():
+    n = 2000    # deeper than the default recursion limit
+    cfg = {b: {"succs": [b + 1] if b + 1 < n else [], "preds": [b - 1] if b else []} for b in range(n)}
+    doms = Dominators(cfg, 0)
+    assert doms.idom[n - 1] == n - 2
+    assert doms.dom_frontier[n - 1] == set()
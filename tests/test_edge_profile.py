@@ -0,0 +1,42 @@
+import copy
+import io
+import json
+import os
+
+import pytest
+
+from bril_gen import generate_program
+from bril_interp import Interpreter
+from conftest import DEBUG_TESTS
+from edge_profile import instrument_program, read_counts, read_profile
+
+def edges(profile):
+    return {(src, dst): count for src, dst, count in profile["edges"] if count}
+
+def check_against_interpreter(program, args=()):
+    """Counts read back from an instrumented run must equal the interpreter's own profile."""
+    reference = Interpreter(copy.deepcopy(program), profile=True)
+    reference.run([str(a) for a in args], out=io.StringIO())
+    expected = reference.profile()
+
+    instrumented = copy.deepcopy(program)
+    profile_map = json.loads(json.dumps(instrument_program(instrumented)))
+    out = io.StringIO()
+    Interpreter(instrumented).run([str(a) for a in args], out=out)
+    profile = read_profile(profile_map, read_counts(out.getvalue()))
+
+    assert profile.keys() == expected.keys()
+    for name, counts in expected.items():
+        assert profile[name]["calls"] == counts["calls"], name
+        assert profile[name]["blocks"] == counts["blocks"], name
+        assert edges(profile[name]) == edges(counts), name
+
+@pytest.mark.parametrize("name, args", [("simple_test.json", []), ("fib_recursive.json", [6])])
+def test_edge_profile_of_test_programs(name, args):
+    with open(os.path.join(DEBUG_TESTS, name)) as f:
+        check_against_interpreter(json.load(f), args)
+
+@pytest.mark.parametrize("seed", range(8))
+def test_edge_profile_of_generated_programs(seed):
+    program = generate_program(functions=2, instrs=150, loop_depth=2, irreducible=0.3, seed=seed)
+    check_against_interpreter(program)
@@ -0,0 +1,46 @@
+import copy
+import json
+import os
+
+import pytest
+
+from bril_binary import decode_program, encode_program
+from bril_text import format_program, parse_program
+from conftest import DEBUG_TESTS
+from trace_jumps import trace_jumps
+
+def load(name):
+    with open(os.path.join(DEBUG_TESTS, name)) as f:
+        return f.read() if name.endswith(".bril") else json.load(f)
+
+PROGRAMS = ["simple_test.json", "fib_recursive.json", "fib_recursive_transformed.json"]
+
+def test_text_parses_to_the_paired_json():
+    assert parse_program(load("simple_test.bril")) == load("simple_test.json")
+
+@pytest.mark.parametrize("name", ["simple_test.bril", "fib_recursive_transformed.bril"])
+def test_text_round_trip(name):
+    program = parse_program(load(name))
+    assert parse_program(format_program(program)) == program
+
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_binary_round_trip(name, run_bril):
+    program = load(name)
+    decoded = decode_program(encode_program(program))
+    assert decoded == program
+    args = [4] if program["functions"][0].get("args") else []
+    assert run_bril(decoded, args) == run_bril(program, args)
+
+def test_trace_jumps_matches_the_transformed_pair():
+    # fibonacci_test.t, without bril2json and bril2txt.
+    transformed = trace_jumps(load("fib_recursive.json"))
+    assert transformed == load("fib_recursive_transformed.json")
+    assert parse_program(format_program(transformed)) == parse_program(load("fib_recursive_transformed.bril"))
+
+def test_trace_jumps_prints_before_every_jump(run_bril):
+    program = load("fib_recursive.json")
+    out, _ = run_bril(program, [4])
+    traced_out, _ = run_bril(trace_jumps(copy.deepcopy(program)), [4])
+    assert [line for line in traced_out.splitlines() if line] == out.splitlines()
+    jumps = sum(i.get("op") in ("jmp", "br") for f in program["functions"] for i in f["instrs"])
+    assert jumps and traced_out.count("\n") > len(out.splitlines())
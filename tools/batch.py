@@ -0,0 +1,180 @@
+import copy
+import csv
+import glob
+import io
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+# Run as a script only tools/ is on sys.path; the passes live in the lesson directories.
+for lesson in ("l2", "l3", "l4", "l5", "l6", "l8"):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", lesson))
+
+from bril_binary import read_program
+from bril_interp import BrilError, Interpreter, OutOfFuel
+from bril_text import BrilSyntaxError, parse_program
+from bril_parallel import parse_jobs
+from pass_manager import PassManager
+
+# Same column names and result values as brench, plus static and cost metrics.
+FIELDS = ["benchmark", "run", "result", "static_inst", "dyn_inst", "pass_ms", "peak_kib"]
+DEFAULT_RUNS = {"tdce": "dce", "lvn": "lvn,dce"}
+# Instructions a program may execute before it is reported as a "timeout",
+# about 20 s of interpretation; a count keeps the result independent of load.
+DEFAULT_FUEL = 100_000_000
+USAGE = ("Usage: python batch.py <dir|glob>... [--run name=pass,pass]... [--csv out.csv] "
+         "[--json out.json] [--jobs N] [--fuel N]")
+
+def find_programs(patterns):
+    """Expands directories (every .json and .bril inside) and globs into a sorted file list."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths += glob.glob(os.path.join(pattern, "*.json")) + glob.glob(os.path.join(pattern, "*.bril"))
+        else:
+            paths += glob.glob(pattern)
+    return sorted(set(paths))
+
+def load_program(path):
+    """Returns (program, args). Text programs are parsed in-process; ARGS comes from `# ARGS:`."""
+    if not path.endswith(".bril"):
+        with open(path, "rb") as f:
+            return read_program(f), []
+    with open(path, "r") as f:
+        text = f.read()
+    args = []
+    for line in text.splitlines():
+        if line.strip().startswith("# ARGS:"):
+            args = line.split(":", 1)[1].split()
+    return parse_program(text), args
+
+def static_count(program):
+    return sum(1 for func in program["functions"] for instr in func["instrs"] if "op" in instr)
+
+def execute(program, args, fuel=DEFAULT_FUEL):
+    out = io.StringIO()
+    dyn = Interpreter(program, fuel=fuel).run(args, out)
+    return out.getvalue(), dyn
+
+def optimize(program, pipeline):
+    """Runs the pipeline on a copy; returns (program, wall ms, peak traced KiB)."""
+    optimized = copy.deepcopy(program)
+    start = time.perf_counter()
+    PassManager(pipeline).run(optimized)
+    elapsed = (time.perf_counter() - start) * 1000
+    # Memory is measured in a second, traced run so tracing does not skew the timing.
+    tracemalloc.start()
+    PassManager(pipeline).run(copy.deepcopy(program))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return optimized, elapsed, peak / 1024
+
+def run_benchmark(path, runs, fuel=DEFAULT_FUEL):
+    name = os.path.splitext(os.path.basename(path))[0]
+    try:
+        program, args = load_program(path)
+        expected, dyn = execute(program, args, fuel)
+    except OutOfFuel as e:
+        print(f"{name}: baseline failed: {e}", file=sys.stderr)
+        return [{"benchmark": name, "run": "baseline", "result": "timeout"}]
+    except (OSError, ValueError, BrilSyntaxError, BrilError) as e:
+        print(f"{name}: baseline failed: {e}", file=sys.stderr)
+        return [{"benchmark": name, "run": "baseline", "result": "missing"}]
+    rows = [{"benchmark": name, "run": "baseline", "result": dyn,
+             "static_inst": static_count(program), "dyn_inst": dyn}]
+
+    for run, pipeline in runs.items():
+        row = {"benchmark": name, "run": run}
+        try:
+            optimized, row["pass_ms"], row["peak_kib"] = optimize(program, pipeline)
+            row["static_inst"] = static_count(optimized)
+            output, row["dyn_inst"] = execute(optimized, args, fuel)
+            row["result"] = row["dyn_inst"] if output == expected else "incorrect"
+        except OutOfFuel as e:
+            print(f"{name}/{run}: {e}", file=sys.stderr)
+            row["result"] = "timeout"
+        except Exception as e:
+            print(f"{name}/{run}: {type(e).__name__}: {e}", file=sys.stderr)
+            row["result"] = "missing"
+        rows.append(row)
+    return rows
+
+def run_batch(paths, runs, jobs=1, fuel=DEFAULT_FUEL):
+    if jobs <= 1:
+        results = [run_benchmark(path, runs, fuel) for path in paths]
+    else:
+        with ProcessPoolExecutor(jobs) as pool:
+            results = list(pool.map(partial(run_benchmark, runs=runs, fuel=fuel), paths))
+    return [row for rows in results for row in rows]
+
+def summarize(rows, out=sys.stderr):
+    """Per run: how many programs were correct, and the geometric mean of dyn_inst vs baseline."""
+    baseline = {r["benchmark"]: r["dyn_inst"] for r in rows if r["run"] == "baseline" and "dyn_inst" in r}
+    by_run = {}
+    for row in rows:
+        if row["run"] != "baseline":
+            by_run.setdefault(row["run"], []).append(row)
+    print(f"{'run':<16}{'correct':>10}{'dyn vs base':>14}{'pass ms':>12}", file=out)
+    for run, run_rows in by_run.items():
+        ok = [r for r in run_rows if isinstance(r["result"], int) and baseline.get(r["benchmark"])]
+        ratios = [r["dyn_inst"] / baseline[r["benchmark"]] for r in ok]
+        geomean = math.exp(sum(math.log(x) for x in ratios) / len(ratios)) if ratios else float("nan")
+        total_ms = sum(r.get("pass_ms", 0) for r in run_rows)
+        print(f"{run:<16}{f'{len(ok)}/{len(run_rows)}':>10}{geomean:>14.4f}{total_ms:>12.1f}", file=out)
+
+def write_csv(rows, out):
+    writer = csv.DictWriter(out, fieldnames=FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({k: (f"{v:.3f}" if isinstance(v, float) else v) for k, v in row.items()})
+
+def main():
+    args = sys.argv[1:]
+    jobs = parse_jobs(args)
+    if not args or args[0] in ("-h", "--help"):
+        print(USAGE)
+        sys.exit(1)
+
+    runs, csv_file, json_file, fuel, patterns = {}, None, None, DEFAULT_FUEL, []
+    while args:
+        arg = args.pop(0)
+        if arg == "--run":
+            name, _, pipeline = args.pop(0).partition("=")
+            runs[name] = pipeline or name
+        elif arg == "--csv":
+            csv_file = args.pop(0)
+        elif arg == "--json":
+            json_file = args.pop(0)
+        elif arg == "--fuel":
+            fuel = int(args.pop(0))
+        elif arg.startswith("-"):
+            print(f"unknown option {arg}", file=sys.stderr)
+            print(USAGE)
+            sys.exit(1)
+        else:
+            patterns.append(arg)
+    runs = runs or DEFAULT_RUNS
+    for pipeline in runs.values():
+        PassManager(pipeline)  # fail on unknown passes before starting the sweep
+
+    paths = find_programs(patterns)
+    start = time.perf_counter()
+    rows = run_batch(paths, runs, jobs, fuel)
+    if json_file:
+        with open(json_file, "w") as f:
+            json.dump(rows, f, indent=2)
+    if csv_file:
+        with open(csv_file, "w", newline="") as f:
+            write_csv(rows, f)
+    elif not json_file:
+        write_csv(rows, sys.stdout)
+    summarize(rows)
+    print(f"{len(paths)} programs, {len(runs)} runs in {time.perf_counter() - start:.2f} s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import _socket
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "l2"))
+from opt_protocol import HEADER, default_socket_path
+
+def recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise EOFError("optimizer server closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def request(header, body=b"", path=None):
+    """
+    Sends one message to the optimizer server and returns (header, body). Uses
+    the C-level _socket module directly to keep client startup small.
+    """
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        sock.connect(path or default_socket_path())
+        head = json.dumps(header).encode()
+        sock.sendall(HEADER.pack(len(head)) + head + HEADER.pack(len(body)))
+        if body:
+            sock.sendall(body)
+        (size,) = HEADER.unpack(recv_exact(sock, HEADER.size))
+        response = json.loads(recv_exact(sock, size))
+        (size,) = HEADER.unpack(recv_exact(sock, HEADER.size))
+        return response, recv_exact(sock, size)
+    finally:
+        sock.close()
+
+def optimize_locally(passes, body, binary=False):
+    """Fallback when no server is running: run the same pipeline in this process."""
+    import io
+    from bril_binary import encode_program, read_program
+    from pass_manager import PassManager
+    program = read_program(io.BytesIO(body))
+    PassManager(passes).run(program)
+    return encode_program(program) if binary else json.dumps(program).encode()
+
+def main():
+    args = sys.argv[1:]
+    # Checked by hand: bril_binary.parse_binary_flag would import the IR on every call.
+    binary = "--binary" in args
+    if binary:
+        args.remove("--binary")
+    if not args or args[0] in ("-h", "--help"):
+        print("Usage: python opt_client.py <pass,pass,...|--ping|--shutdown> [--socket <path>] [--binary] < prog.json")
+        sys.exit(1)
+    path = args[args.index("--socket") + 1] if "--socket" in args else None
+
+    if args[0] in ("--ping", "--shutdown"):
+        header, _ = request({"cmd": args[0][2:]}, path=path)
+        print(header)
+        return
+
+    body = sys.stdin.buffer.read()
+    try:
+        header, output = request({"cmd": "optimize", "passes": args[0], "binary": binary}, body, path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        output = optimize_locally(args[0], body, binary)
+    else:
+        if "error" in header:
+            print(f"optimizer server: {header['error']}", file=sys.stderr)
+            sys.exit(1)
+    sys.stdout.buffer.write(output)
+
+if __name__ == "__main__":
+    main()
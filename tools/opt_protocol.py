@@ -0,0 +1,37 @@
+import json
+import os
+import struct
+
+HEADER = struct.Struct(">Q")
+
+def default_socket_path():
+    return os.environ.get("BRIL_OPT_SOCKET") or f"/tmp/bril-opt-{os.getuid()}.sock"
+
+def write_frame(stream, payload):
+    stream.write(HEADER.pack(len(payload)) + payload)
+
+def read_frame(stream):
+    """Reads one length-prefixed frame, or returns None at end of stream."""
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    (size,) = HEADER.unpack(header)
+    payload = stream.read(size)
+    if len(payload) < size:
+        raise EOFError("connection closed in the middle of a frame")
+    return payload
+
+def write_message(stream, header, body=b""):
+    """A message is a JSON header frame followed by a raw body frame (a Bril program)."""
+    write_frame(stream, json.dumps(header).encode())
+    write_frame(stream, body)
+    stream.flush()
+
+def read_message(stream):
+    header = read_frame(stream)
+    if header is None:
+        return None, None
+    body = read_frame(stream)
+    if body is None:
+        raise EOFError("connection closed before the message body")
+    return json.loads(header), body
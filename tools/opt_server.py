@@ -0,0 +1,101 @@
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from functools import lru_cache
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "l2"))
+from bril_binary import encode_program, read_program
+from opt_protocol import default_socket_path, read_message, write_message
+from pass_manager import PassManager, parse_pipeline
+
+@lru_cache(maxsize=64)
+def cached_pipeline(passes):
+    return tuple(parse_pipeline(passes))
+
+class OptimizerHandler(socketserver.StreamRequestHandler):
+    """Serves any number of requests over one connection until the client hangs up."""
+    def handle(self):
+        while True:
+            try:
+                header, body = read_message(self.rfile)
+            except (EOFError, ValueError):
+                return
+            if header is None:
+                return
+            response, payload = self.server.dispatch(header, body)
+            try:
+                write_message(self.wfile, response, payload)
+            except OSError:
+                connected = False  # the client hung up without waiting for the reply
+            else:
+                connected = True
+            if header.get("cmd") == "shutdown":
+                # Stop once the reply is out, from a thread other than serve_forever's.
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+            if not connected:
+                return
+
+class OptimizerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Long-lived optimizer: modules stay imported and pipelines stay parsed, so
+    a request costs only the optimization itself.
+    """
+    daemon_threads = True
+
+    def __init__(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, OptimizerHandler)
+        self.path = path
+        self.requests_served = 0
+        self.lock = threading.Lock()
+
+    def dispatch(self, header, body):
+        cmd = header.get("cmd", "optimize")
+        if cmd == "ping":
+            return {"ok": True, "requests": self.requests_served}, b""
+        if cmd == "shutdown":
+            return {"ok": True}, b""
+        if cmd != "optimize":
+            return {"error": f"unknown command {cmd!r}"}, b""
+        try:
+            start = time.perf_counter()
+            manager = PassManager(cached_pipeline(header.get("passes", "")))
+            program = read_program(io.BytesIO(body))
+            manager.run(program)
+            payload = encode_program(program) if header.get("binary") else json.dumps(program).encode()
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}, b""
+        with self.lock:
+            self.requests_served += 1
+        return {"ok": True, "seconds": time.perf_counter() - start,
+                "timings": dict(manager.timings)}, payload
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] in (["-h"], ["--help"]):
+        print("Usage: python opt_server.py [--socket <path>]")
+        sys.exit(1)
+    path = args[args.index("--socket") + 1] if "--socket" in args else default_socket_path()
+
+    server = OptimizerServer(path)
+    print(f"bril optimizer listening on {path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+from collections import defaultdict
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Running total of the cache's size, so evict() need not walk it every time.
+SIZE_INDEX = "size.json"
+
+# Analysis objects that may be stored, rebuilt from their attributes. Entries
+# are plain JSON: unlike a pickle, nothing read back from a shared cache
+# directory can name code to run.
+ANALYSIS_CLASSES = {"Dominators": "dom_utils", "DefUseChains": "df"}
+DEFAULT_FACTORIES = {"set": set, "list": list, "int": int}
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.environ.get("BRIL_CACHE_DIR") or os.path.join(base, "bril-tools")
+
+def function_digest(func):
+    """Hash of a function's canonical JSON: key order and whitespace do not matter."""
+    text = json.dumps(func, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+_source_digests = {}
+
+def code_version(modules):
+    """Hash of the source files of `modules`, found without importing them."""
+    h = hashlib.sha256()
+    for name in sorted(set(modules)):
+        if name not in _source_digests:
+            spec = importlib.util.find_spec(name)
+            with open(spec.origin, "rb") as f:
+                _source_digests[name] = hashlib.sha256(f.read()).hexdigest()
+        h.update(f"{name}:{_source_digests[name]}\n".encode())
+    return h.hexdigest()
+
+def to_data(value):
+    """
+    JSON-ready form of an analysis: containers JSON lacks (tuples, sets,
+    dicts with non-string keys) and allowed objects become tagged objects.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [to_data(v) for v in value]
+    if isinstance(value, tuple):
+        return {"t": [to_data(v) for v in value]}
+    if isinstance(value, frozenset):
+        return {"fs": [to_data(v) for v in value]}
+    if isinstance(value, set):
+        return {"s": [to_data(v) for v in value]}
+    if isinstance(value, dict):
+        data = {"d": [[to_data(k), to_data(v)] for k, v in value.items()]}
+        if isinstance(value, defaultdict):
+            data["f"] = value.default_factory.__name__
+        return data
+    name = type(value).__name__
+    if ANALYSIS_CLASSES.get(name) == type(value).__module__:
+        return {"o": name, "a": to_data(vars(value))}
+    raise TypeError(f"cannot cache a {name}")
+
+def from_data(data):
+    if not isinstance(data, (dict, list)):
+        return data
+    if isinstance(data, list):
+        return [from_data(v) for v in data]
+    if "t" in data:
+        return tuple(from_data(v) for v in data["t"])
+    if "fs" in data:
+        return frozenset(from_data(v) for v in data["fs"])
+    if "s" in data:
+        return {from_data(v) for v in data["s"]}
+    if "d" in data:
+        items = ((from_data(k), from_data(v)) for k, v in data["d"])
+        if "f" in data:
+            return defaultdict(DEFAULT_FACTORIES[data["f"]], items)
+        return dict(items)
+    cls = getattr(importlib.import_module(ANALYSIS_CLASSES[data["o"]]), data["o"])
+    obj = cls.__new__(cls)
+    obj.__dict__.update(from_data(data["a"]))
+    return obj
+
+class PassCache:
+    """
+    Content-addressed store of optimized functions and analysis results. An
+    entry is one file named by the hash of its inputs; reading an entry bumps
+    its mtime, and `evict` removes least recently used files until the cache
+    fits in `max_bytes`. Analyses are stored as JSON via to_data().
+    """
+    def __init__(self, root=None, max_bytes=None):
+        self.root = root or default_cache_dir()
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("BRIL_CACHE_MB", DEFAULT_MAX_BYTES >> 20)) << 20
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.added = 0  # bytes written since the size index was last updated
+
+    def key(self, *parts):
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+    def path(self, key, kind):
+        return os.path.join(self.root, kind, key[:2], key[2:])
+
+    def read(self, key, kind):
+        path = self.path(key, kind)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def write(self, key, kind, data):
+        path = self.path(key, kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so concurrent readers never see a partial entry.
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        try:
+            self.added -= os.stat(path).st_size
+        except OSError:
+            pass
+        os.replace(tmp, path)
+        self.added += len(data)
+
+    def get_function(self, key):
+        data = self.read(key, "functions")
+        return None if data is None else json.loads(data)
+
+    def put_function(self, key, func):
+        self.write(key, "functions", json.dumps(func, separators=(",", ":")).encode())
+
+    def get_analysis(self, key):
+        data = self.read(key, "analyses")
+        if data is None:
+            return None
+        try:
+            return from_data(json.loads(data))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # Not an entry this version wrote (an older pickle, a foreign file).
+            self.hits -= 1
+            self.misses += 1
+            return None
+
+    def put_analysis(self, key, value):
+        self.write(key, "analyses", json.dumps(to_data(value), separators=(",", ":")).encode())
+
+    def load_size(self):
+        try:
+            with open(os.path.join(self.root, SIZE_INDEX), "r") as f:
+                return int(json.load(f)["bytes"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save_size(self, total):
+        path = os.path.join(self.root, SIZE_INDEX)
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"bytes": total}, f)
+        os.replace(tmp, path)
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache is within
+        max_bytes. The size index is updated with what this cache object
+        wrote, and the cache is walked only when that puts it over budget or
+        there is no index yet. Processes updating the index concurrently can
+        lose each other's additions; the next walk sets the exact size again.
+        """
+        total = self.load_size()
+        if total is not None:
+            total += self.added
+            if total <= self.max_bytes:
+                if self.added:
+                    self.save_size(total)
+                    self.added = 0
+                return 0
+        self.added = 0
+        index = os.path.join(self.root, SIZE_INDEX)
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if path == index:
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        entries.sort()
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        if os.path.isdir(self.root):
+            self.save_size(total)
+        return removed
@@ -0,0 +1,330 @@
+import os
+import sys
+import time
+from collections import defaultdict
+
+# Run as a script only tools/ is on sys.path; the passes live in the lesson directories.
+for lesson in ("l2", "l3", "l4", "l5", "l6", "l8"):
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", lesson))
+
+from bril_cfg import form_basic_blocks, index_cfg
+from bril_binary import parse_binary_flag, read_program, write_program
+from bril_trace import span, parse_trace_flags
+
+class CFGInfo:
+    """Block graph of a function: index-keyed succs/preds, block labels and entry."""
+    def __init__(self, func):
+        blocks = form_basic_blocks(func["instrs"])
+        self.cfg = index_cfg(blocks)
+        self.block_labels = {}
+        for i, block in enumerate(blocks):
+            if "label" in block[0]:
+                self.block_labels[i] = block[0]["label"]
+            else:
+                self.block_labels[i] = f"blk{i}"
+        self.entry = 0
+        self.shape = cfg_shape(blocks)
+
+def cfg_shape(blocks):
+    """What a CFG depends on: each block's label and terminator."""
+    shape = []
+    for block in blocks:
+        first, last = block[0], block[-1]
+        term = (last.get("op"), tuple(last.get("labels", ()))) if last.get("op") in ("jmp", "br", "ret") else None
+        shape.append((first.get("label"), term))
+    return tuple(shape)
+
+def compute_cfg(func, am):
+    return CFGInfo(func)
+
+def compute_dominators(func, am):
+    from dom_utils import Dominators
+    info = am.get("cfg")
+    return Dominators(info.cfg, info.entry)
+
+# Live variables and def-use chains are over variable ids, which a pass
+# using them gets again from its own Function.from_json(func).
+
+def compute_live(func, am):
+    from bril_ir import Function, form_basic_blocks as form_ir_blocks
+    from ssa import compute_live_vars
+    info = am.get("cfg")
+    return compute_live_vars(form_ir_blocks(Function.from_json(func).instrs), info.cfg)
+
+def compute_def_use(func, am):
+    from bril_ir import Function, form_basic_blocks as form_ir_blocks
+    from df import DefUseChains
+    fn = Function.from_json(func)
+    chains = DefUseChains(am.get("cfg").cfg, form_ir_blocks(fn.instrs), fn.params)
+    chains.analyze()
+    chains.blocks = None  # positions are all later passes need
+    return chains
+
+def compute_loops(func, am):
+    from loop_opt import find_loops
+    return find_loops(am.get("cfg").cfg, am.get("dominators"))
+
+# name -> (compute function, analyses it is derived from)
+ANALYSES = {
+    "cfg": (compute_cfg, ()),
+    "dominators": (compute_dominators, ("cfg",)),
+    "live": (compute_live, ("cfg",)),
+    "loops": (compute_loops, ("cfg", "dominators")),
+    "def-use": (compute_def_use, ("cfg",)),
+}
+CFG_ANALYSES = {"cfg", "dominators", "loops"}
+# Analyses worth keeping in a PassCache, with the modules their results depend on.
+ANALYSIS_MODULES = {
+    "dominators": ("dom_utils", "bril_cfg"),
+    "live": ("ssa", "bril_ir", "bril_cfg", "dom_utils"),
+    "loops": ("loop_opt", "bril_cfg", "dom_utils"),
+    "def-use": ("df", "bril_ir", "bril_cfg"),
+}
+
+class AnalysisManager:
+    """
+    Lazily computes and caches analyses of one function. With a PassCache,
+    the analyses in ANALYSIS_MODULES are also looked up on / saved to disk.
+    """
+    def __init__(self, func, disk_cache=None):
+        self.func = func
+        self.cache = {}
+        self.stats = defaultdict(int)
+        self.disk_cache = disk_cache
+        self.digest = None
+
+    def disk_key(self, name):
+        from pass_cache import code_version, function_digest
+        if self.digest is None:
+            self.digest = function_digest(self.func)
+        return self.disk_cache.key("analysis", name, self.digest, code_version(ANALYSIS_MODULES[name]))
+
+    def get(self, name):
+        if name not in self.cache:
+            key = None
+            if self.disk_cache is not None and name in ANALYSIS_MODULES:
+                key = self.disk_key(name)
+                value = self.disk_cache.get_analysis(key)
+                if value is not None:
+                    self.stats[f"analysis:{name}:disk"] += 1
+                    self.cache[name] = value
+                    return value
+            compute, _ = ANALYSES[name]
+            start = time.perf_counter()
+            with span(f"analysis:{name}", self.func, cat="analysis"):
+                self.cache[name] = compute(self.func, self)
+            self.stats[f"analysis:{name}"] += 1
+            self.stats[f"analysis:{name}:time"] += time.perf_counter() - start
+            if key is not None:
+                self.disk_cache.put_analysis(key, self.cache[name])
+        return self.cache[name]
+
+    def invalidate(self, preserved):
+        """Drops every cached analysis not in `preserved`, or derived from one that was dropped."""
+        self.digest = None
+        if "cfg" in preserved and "cfg" in self.cache:
+            # A pass that keeps the CFG must not have touched labels or terminators.
+            if self.cache["cfg"].shape != cfg_shape(form_basic_blocks(self.func["instrs"])):
+                preserved = set(preserved) - CFG_ANALYSES
+        kept = {}
+        for name in ANALYSES:
+            _, deps = ANALYSES[name]
+            if name in self.cache and name in preserved and all(d in kept for d in deps):
+                kept[name] = self.cache[name]
+        self.cache = kept
+
+def fingerprint(func):
+    return hash(tuple(
+        (i.get("label"), i.get("op"), i.get("dest"), tuple(i.get("args", ())), tuple(i.get("labels", ())))
+        for i in func["instrs"]
+    ))
+
+def run_tdce(func, am):
+    from tdce import trivial_dce_function
+    trivial_dce_function(func)
+
+def run_global_dce(func, am):
+    from tdce import global_dce_function
+    global_dce_function(func, chains=am.get("def-use"))
+
+def run_copy_prop(func, am):
+    from copy_prop import copy_prop_function
+    copy_prop_function(func, dce=False)
+
+def run_compact_vars(func, am):
+    from var_slots import compact_variables_function
+    compact_variables_function(func)
+
+def run_lvn(func, am):
+    from bril_ir import Function
+    from lvn_opt import local_value_numbering
+    fn = Function.from_json(func)
+    local_value_numbering(fn)
+    func["instrs"] = fn.instrs_to_json()
+
+def run_to_ssa(func, am):
+    from ssa import to_ssa
+    info = am.get("cfg")
+    to_ssa(func, cfg=info.cfg, doms=am.get("dominators"), live=am.get("live"))
+
+def run_from_ssa(func, am):
+    from ssa import from_ssa
+    from_ssa(func)
+
+def run_licm(func, am):
+    from loop_opt import licm
+    licm(func, doms=am.get("dominators"), chains=am.get("def-use"))
+
+def run_mem(func, am):
+    from mem_opt import memory_opt_function
+    memory_opt_function(func)
+
+def run_simplify_cfg(func, am):
+    from simplify_cfg import simplify_cfg_function
+    simplify_cfg_function(func)
+
+class Pass:
+    """`modules` lists every module the pass's result depends on, for cache keys."""
+    def __init__(self, name, run, requires=(), preserves=(), modules=()):
+        self.name = name
+        self.run = run
+        self.requires = requires
+        self.preserves = set(preserves)
+        self.modules = modules
+
+PASSES = {p.name: p for p in [
+    Pass("dce", run_tdce, preserves=CFG_ANALYSES, modules=("tdce", "bril_ir")),
+    Pass("gdce", run_global_dce, requires=("def-use",), preserves=CFG_ANALYSES,
+         modules=("tdce", "df", "bril_ir", "bril_cfg")),
+    Pass("copy-prop", run_copy_prop, preserves=CFG_ANALYSES, modules=("copy_prop", "var_slots", "df", "bril_cfg")),
+    Pass("compact-vars", run_compact_vars, preserves=CFG_ANALYSES, modules=("var_slots", "df", "bril_cfg")),
+    Pass("lvn", run_lvn, preserves=CFG_ANALYSES, modules=("lvn_opt", "tdce", "bril_ir")),
+    Pass("ssa", run_to_ssa, requires=("cfg", "dominators", "live"),
+         modules=("ssa", "bril_ir", "bril_cfg", "dom_utils")),
+    Pass("out-ssa", run_from_ssa, modules=("ssa",)),
+    Pass("licm", run_licm, requires=("cfg", "dominators", "def-use"),
+         modules=("loop_opt", "bril_ir", "bril_cfg", "dom_utils", "df")),
+    Pass("mem", run_mem, preserves=CFG_ANALYSES, modules=("mem_opt", "df", "tdce", "bril_ir")),
+    Pass("simplify-cfg", run_simplify_cfg, modules=("simplify_cfg", "bril_cfg")),
+]}
+PASSES["tdce"] = PASSES["dce"]
+
+def parse_pipeline(pipeline):
+    names = [name.strip() for name in pipeline.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PASSES]
+    if unknown:
+        raise ValueError(f"unknown pass(es) {', '.join(unknown)}; available: {', '.join(sorted(PASSES))}")
+    return [PASSES[name] for name in names]
+
+class PassManager:
+    """
+    Runs a pipeline of passes over every function in one process. Analyses are
+    cached per function and dropped only when a pass changes the function and
+    does not declare them preserved. With a PassCache, functions already
+    optimized by the same pipeline and pass code are read back from disk.
+    """
+    def __init__(self, pipeline, cache=None):
+        self.passes = parse_pipeline(pipeline) if isinstance(pipeline, str) else list(pipeline)
+        self.timings = defaultdict(float)
+        self.stats = defaultdict(int)
+        self.cache = cache
+        self.cache_version = None
+
+    def cache_key(self, func):
+        from pass_cache import code_version, function_digest
+        if self.cache_version is None:
+            modules = [m for p in self.passes for m in p.modules]
+            for p in self.passes:
+                for name in p.requires:
+                    modules += ANALYSIS_MODULES.get(name, ())
+            self.cache_version = code_version(modules + ["pass_manager"])
+        pipeline = ",".join(p.name for p in self.passes)
+        return self.cache.key("function", function_digest(func), pipeline, self.cache_version)
+
+    def run_function(self, func):
+        key = None
+        if self.cache is not None:
+            key = self.cache_key(func)
+            cached = self.cache.get_function(key)
+            if cached is not None:
+                self.stats["cache:hit"] += 1
+                func.clear()
+                func.update(cached)
+                return func
+            self.stats["cache:miss"] += 1
+        self.optimize_function(func)
+        if key is not None:
+            self.cache.put_function(key, func)
+        return func
+
+    def optimize_function(self, func):
+        am = AnalysisManager(func, self.cache)
+        for p in self.passes:
+            for name in p.requires:
+                am.get(name)
+            before = fingerprint(func)
+            self.stats[p.name] += 1
+            start = time.perf_counter()
+            with span(f"pass:{p.name}", func):
+                p.run(func, am)
+            self.timings[p.name] += time.perf_counter() - start
+            if fingerprint(func) != before:
+                self.stats[f"pass:{p.name}:changed"] += 1
+                am.invalidate(p.preserves)
+        for key, value in am.stats.items():
+            if key.endswith(":time"):
+                self.timings[key[:-len(":time")]] += value
+            else:
+                self.stats[key] += value
+        return func
+
+    def run(self, program):
+        for func in program["functions"]:
+            self.run_function(func)
+        if self.cache is not None:
+            self.cache.evict()
+        return program
+
+    def report(self, out=sys.stderr):
+        print(f"{'pass / analysis':<24}{'time (ms)':>12}{'runs':>8}", file=out)
+        for name, seconds in sorted(self.timings.items(), key=lambda kv: -kv[1]):
+            runs = self.stats.get(name, "")
+            print(f"{name:<24}{seconds * 1000:>12.3f}{runs:>8}", file=out)
+
+def main():
+    binary = parse_binary_flag(sys.argv)
+    parse_trace_flags(sys.argv)
+    args = sys.argv[1:]
+    if len(args) < 1 or args[0] in ("-h", "--help"):
+        print("Usage: python pass_manager.py <pass,pass,...> [--time] [--cache [dir]] [--stream] [--binary] "
+              "[--trace trace.json] [--trace-memory] < prog.json")
+        print(f"Passes: {', '.join(sorted(PASSES))}")
+        sys.exit(1)
+
+    cache = None
+    if "--cache" in args:
+        from pass_cache import PassCache
+        i = args.index("--cache")
+        root = args[i + 1] if i + 1 < len(args) and not args[i + 1].startswith("-") else None
+        cache = PassCache(root)
+
+    try:
+        manager = PassManager(args[0], cache)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+    if "--stream" in args:
+        from bril_stream import stream_program
+        stream_program(manager.run_function, sys.stdin, sys.stdout, binary)
+        if cache is not None:
+            cache.evict()
+    else:
+        program = read_program(sys.stdin)
+        manager.run(program)
+        write_program(program, sys.stdout, binary, indent=2)
+    if "--time" in args:
+        manager.report()
+
+if __name__ == "__main__":
+    main()
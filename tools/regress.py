@@ -0,0 +1,218 @@
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from brench_async import build_command, load_config, local_interp, local_parser, read_args
+
+# Stages that are not the optimizer: their time is left out of pass_ms.
+NON_PASS_TOOLS = {"bril2json", "brili"}
+USAGE = ("Usage: python regress.py <record|check> <task.toml> [--baseline file] [--runs a,b] "
+         "[--dyn-tolerance F] [--time-tolerance F] [--min-ms MS] [--repeat N] [--timeout S] "
+         "[--local | --interp <cmd>] [--update]")
+
+def run_stages(pipeline, bench_file, args, extract, timeout, interp=None, parser=None):
+    """
+    Runs a brench pipeline one stage at a time, so the optimizer stages can
+    be timed apart from parsing and interpretation. Returns (result, stdout,
+    pass_ms), where result is the extracted count, "timeout" or "missing".
+    """
+    with open(bench_file, "rb") as f:
+        data = f.read()
+    stderr = b""
+    pass_seconds = 0.0
+    deadline = time.perf_counter() + timeout
+    for stage in pipeline:
+        command = build_command([stage], args, interp, parser)
+        start = time.perf_counter()
+        try:
+            proc = subprocess.run(command, shell=True, input=data, capture_output=True,
+                                  timeout=max(0.0, deadline - start))
+        except subprocess.TimeoutExpired:
+            return "timeout", "", pass_seconds * 1000
+        if stage.split()[:1] and stage.split()[0] not in NON_PASS_TOOLS:
+            pass_seconds += time.perf_counter() - start
+        if proc.returncode != 0:
+            return "missing", "", pass_seconds * 1000
+        data, stderr = proc.stdout, proc.stderr
+    found = extract.findall(stderr.decode(errors="replace"))
+    if not found:
+        return "missing", data.decode(errors="replace"), pass_seconds * 1000
+    return int(found[-1]), data.decode(errors="replace"), pass_seconds * 1000
+
+def run_suite(bench_files, runs, extract, timeout=60.0, repeat=1, interp=None, parser=None, log=sys.stderr):
+    """
+    Measures every (benchmark, run): the dynamic instruction count and the
+    best pass time of `repeat` attempts. As in brench, the first run is the
+    reference output and a run printing something else is "incorrect".
+    Returns {run: {benchmark: {"dyn": count or status, "pass_ms": ms}}}.
+    """
+    extract = re.compile(extract)
+    results = {run: {} for run in runs}
+    for bench_file in bench_files:
+        name = os.path.splitext(os.path.basename(bench_file))[0]
+        args = read_args(bench_file)
+        expected = None
+        for run, pipeline in runs.items():
+            result, output, pass_ms = run_stages(pipeline, bench_file, args, extract, timeout, interp, parser)
+            for _ in range(repeat - 1):
+                if not isinstance(result, int):
+                    break
+                pass_ms = min(pass_ms, run_stages(pipeline, bench_file, args, extract, timeout, interp, parser)[2])
+            if expected is None:
+                expected = output
+            elif isinstance(result, int) and output != expected:
+                result = "incorrect"
+            results[run][name] = {"dyn": result, "pass_ms": round(pass_ms, 3)}
+            print(f"{name:<24}{run:<16}{result!s:>12}{pass_ms:>12.1f} ms", file=log)
+    return results
+
+def change(old, new):
+    return f"{(new - old) / old * 100:+.1f}%" if old else "new"
+
+def compare(baseline, current, dyn_tolerance=0.0, time_tolerance=0.25, min_ms=50.0):
+    """
+    Lists (kind, run, benchmark, old, new) differences between two suites.
+    A regression is a benchmark that executes more instructions than the
+    baseline allows, or was correct and no longer is, or whose passes (or a
+    run's passes in total) slow down past both `time_tolerance` and `min_ms`.
+    Pass times include each stage's process startup, tens of milliseconds of
+    noise on small benchmarks, which `min_ms` is there to absorb.
+    """
+    regressions, improvements = [], []
+    for run, benches in current.items():
+        base_benches = baseline.get(run, {})
+        old_total = new_total = 0.0
+        for name, now in benches.items():
+            before = base_benches.get(name)
+            if before is None:
+                continue
+            old_dyn, new_dyn = before["dyn"], now["dyn"]
+            if isinstance(old_dyn, int):
+                if not isinstance(new_dyn, int):
+                    regressions.append(("result", run, name, old_dyn, new_dyn))
+                elif new_dyn > old_dyn * (1 + dyn_tolerance):
+                    regressions.append(("dyn", run, name, old_dyn, new_dyn))
+                elif new_dyn < old_dyn:
+                    improvements.append(("dyn", run, name, old_dyn, new_dyn))
+            elif isinstance(new_dyn, int):
+                improvements.append(("result", run, name, old_dyn, new_dyn))
+            old_ms, new_ms = before["pass_ms"], now["pass_ms"]
+            old_total += old_ms
+            new_total += new_ms
+            if new_ms > old_ms * (1 + time_tolerance) and new_ms - old_ms > min_ms:
+                regressions.append(("pass_ms", run, name, old_ms, new_ms))
+        if new_total > old_total * (1 + time_tolerance) and new_total - old_total > min_ms:
+            regressions.append(("pass_ms", run, "(total)", round(old_total, 3), round(new_total, 3)))
+    return regressions, improvements
+
+def format_diff(kind, run, name, old, new):
+    if kind == "result":
+        return f"  {run}/{name}: result {old} -> {new}"
+    if kind == "dyn":
+        return f"  {run}/{name}: dyn_inst {old} -> {new} ({change(old, new)})"
+    return f"  {run}/{name}: pass time {old:.1f} ms -> {new:.1f} ms ({change(old, new)})"
+
+def report(baseline, current, regressions, improvements, out=sys.stdout):
+    print(f"{'run':<16}{'dyn (base)':>14}{'dyn (now)':>14}{'pass ms (base)':>16}{'pass ms (now)':>16}", file=out)
+    for run, benches in current.items():
+        base_benches = baseline.get(run, {})
+        shared = [n for n in benches if n in base_benches]
+        dyn = [sum(b[n]["dyn"] for n in shared if isinstance(b[n]["dyn"], int)) for b in (base_benches, benches)]
+        ms = [sum(b[n]["pass_ms"] for n in shared) for b in (base_benches, benches)]
+        print(f"{run:<16}{dyn[0]:>14}{dyn[1]:>14}{ms[0]:>16.1f}{ms[1]:>16.1f}", file=out)
+        missing = sorted(set(base_benches) - set(benches))
+        added = sorted(set(benches) - set(base_benches))
+        if missing:
+            print(f"  not run (in baseline): {', '.join(missing)}", file=out)
+        if added:
+            print(f"  new (not in baseline): {', '.join(added)}", file=out)
+    if improvements:
+        print(f"\n{len(improvements)} improvement(s):", file=out)
+        for diff in improvements:
+            print(format_diff(*diff), file=out)
+    if regressions:
+        print(f"\n{len(regressions)} REGRESSION(S):", file=out)
+        for diff in regressions:
+            print(format_diff(*diff), file=out)
+    else:
+        print("\nno regressions", file=out)
+
+def main():
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] not in ("record", "check"):
+        print(USAGE)
+        sys.exit(1)
+
+    mode, config_file = args.pop(0), args.pop(0)
+    baseline_file = os.path.splitext(config_file)[0] + ".baseline.json"
+    only, interp, parser, update = None, None, None, False
+    dyn_tolerance, time_tolerance, min_ms, repeat, timeout = 0.0, 0.25, 50.0, 3, 60.0
+    while args:
+        arg = args.pop(0)
+        if arg == "--baseline":
+            baseline_file = args.pop(0)
+        elif arg == "--runs":
+            only = args.pop(0).split(",")
+        elif arg == "--dyn-tolerance":
+            dyn_tolerance = float(args.pop(0))
+        elif arg == "--time-tolerance":
+            time_tolerance = float(args.pop(0))
+        elif arg == "--min-ms":
+            min_ms = float(args.pop(0))
+        elif arg == "--repeat":
+            repeat = int(args.pop(0))
+        elif arg == "--timeout":
+            timeout = float(args.pop(0))
+        elif arg == "--interp":
+            interp = args.pop(0)
+        elif arg == "--local":
+            interp, parser = local_interp(), local_parser()
+        elif arg == "--update":
+            update = True
+        else:
+            print(f"unknown option {arg}", file=sys.stderr)
+            print(USAGE)
+            sys.exit(1)
+
+    extract, benchmarks, runs = load_config(config_file)
+    if only:
+        unknown = [run for run in only if run not in runs]
+        if unknown:
+            print(f"unknown run(s) {', '.join(unknown)}; available: {', '.join(runs)}", file=sys.stderr)
+            sys.exit(1)
+        # The first run stays in as the reference output.
+        first = next(iter(runs))
+        runs = {run: runs[run] for run in runs if run in only or run == first}
+    bench_files = sorted(glob.glob(benchmarks))
+    if not bench_files:
+        print(f"no benchmarks match {benchmarks!r}", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    current = run_suite(bench_files, runs, extract, timeout, repeat, interp, parser)
+    print(f"{len(bench_files)} benchmarks x {len(runs)} runs in {time.perf_counter() - start:.2f} s",
+          file=sys.stderr)
+
+    if mode == "check":
+        with open(baseline_file, "r") as f:
+            baseline = json.load(f)["runs"]
+        regressions, improvements = compare(baseline, current, dyn_tolerance, time_tolerance, min_ms)
+        report(baseline, current, regressions, improvements)
+        if regressions:
+            sys.exit(1)
+        if not update:
+            return
+        # Keep baseline entries for runs and benchmarks this check did not cover.
+        for run, benches in baseline.items():
+            for name, entry in benches.items():
+                current.setdefault(run, {}).setdefault(name, entry)
+    with open(baseline_file, "w") as f:
+        json.dump({"extract": extract, "benchmarks": benchmarks, "runs": current}, f, indent=2)
+    print(f"baseline written to {baseline_file}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()